@@ -26,6 +26,34 @@ options:
       - A dict of filters to apply. Each dict item consists of a filter key and a filter value. See U(http://docs.aws.amazon.com/AWSEC2/latest/APIReference/API_DescribeInstances.html) for possible filters.
     required: false
     default: null
+  regions:
+    description:
+      - A list of regions to query instead of I(region). The regions are queried concurrently and
+        their instances returned in one list. Use C(all) to query every region that DescribeRegions
+        returns for these credentials in the partition of I(region) (C(us-east-1) when not set);
+        C(all) can't be combined with other regions.
+        Regions failing with C(OptInRequired) are skipped with a warning, as are regions expanded
+        from C(all) failing with C(AuthFailure) (the credentials already passed DescribeRegions).
+        The module fails when every region was skipped.
+    required: false
+    default: null
+    version_added: "2.2"
+  fields:
+    description:
+      - Only return these attributes of each instance, for example C(id), C(state) and C(tags).
+        By default all attributes are returned.
+      - Only the boto objects are converted page by page; the returned facts of all instances of
+        all regions are still held in memory together, so use I(fields) to keep them small for
+        large inventories.
+    required: false
+    default: null
+    version_added: "2.2"
+  page_size:
+    description:
+      - The number of instances to request per describe call. Instances are converted page by page.
+    required: false
+    default: 500
+    version_added: "2.2"
 author:
     - "Michael Schuett (@michaeljs1990)"
 extends_documentation_fragment:
@@ -50,6 +78,20 @@ EXAMPLES = '''
     filters:
       instance-id: i-123456
 
+# Gather the id, state and tags of the running instances in several regions
+- ec2_remote_facts:
+    regions:
+      - us-east-1
+      - eu-west-1
+      - ap-southeast-2
+    fields:
+      - id
+      - region
+      - state
+      - tags
+    filters:
+      instance-state-name: running
+
 # Gather facts about all instances in vpc-123456 that are t2.small type
 - ec2_remote_facts:
     filters:
@@ -58,6 +100,8 @@ EXAMPLES = '''
 
 '''
 
+import threading
+
 try:
     import boto.ec2
     from boto.exception import BotoServerError
@@ -65,27 +109,31 @@ try:
 except ImportError:
     HAS_BOTO = False
 
-def get_instance_info(instance):
-
-    # Get groups
+def get_groups(instance):
     groups = []
     for group in instance.groups:
         groups.append({ 'id': group.id, 'name': group.name }.copy())
+    return groups
+
 
-    # Get interfaces
+def get_interfaces(instance):
     interfaces = []
     for interface in instance.interfaces:
         interfaces.append({ 'id': interface.id, 'mac_address': interface.mac_address }.copy())
+    return interfaces
 
+
+def get_source_dest_check(instance):
     # If an instance is terminated, sourceDestCheck is no longer returned
     try:
-        source_dest_check = instance.sourceDestCheck
+        return instance.sourceDestCheck
     except AttributeError:
-        source_dest_check = None
+        return None
+
 
-    # Get block device mapping
+def get_block_device_mapping(instance):
+    bdm_dict = []
     try:
-        bdm_dict = []
         bdm = getattr(instance, 'block_device_mapping')
         for device_name in bdm.keys():
             bdm_dict.append({
@@ -97,66 +145,168 @@ def get_instance_info(instance):
             })
     except AttributeError:
         pass
+    return bdm_dict
+
 
-    instance_info = { 'id': instance.id,
-                    'kernel': instance.kernel,
-                    'instance_profile': instance.instance_profile,
-                    'root_device_type': instance.root_device_type,
-                    'private_dns_name': instance.private_dns_name,
-                    'public_dns_name': instance.public_dns_name,
-                    'ebs_optimized': instance.ebs_optimized,
-                    'client_token': instance.client_token,
-                    'virtualization_type': instance.virtualization_type,
-                    'architecture': instance.architecture,
-                    'ramdisk': instance.ramdisk,
-                    'tags': instance.tags,
-                    'key_name': instance.key_name,
-                    'source_destination_check': source_dest_check,
-                    'image_id': instance.image_id,
-                    'groups': groups,
-                    'interfaces': interfaces,
-                    'spot_instance_request_id': instance.spot_instance_request_id,
-                    'requester_id': instance.requester_id,
-                    'monitoring_state': instance.monitoring_state,
-                    'placement': {
-                                  'tenancy': instance._placement.tenancy,
-                                  'zone': instance._placement.zone
-                                 },
-                    'ami_launch_index': instance.ami_launch_index,
-                    'launch_time': instance.launch_time,
-                    'hypervisor': instance.hypervisor,
-                    'region': instance.region.name,
-                    'persistent': instance.persistent,
-                    'private_ip_address': instance.private_ip_address,
-                    'state': instance._state.name,
-                    'vpc_id': instance.vpc_id,
-                    'block_device_mapping': bdm_dict,
-                  }
+# how each returned attribute is read from a boto instance
+INSTANCE_FIELDS = {
+    'id': lambda instance: instance.id,
+    'kernel': lambda instance: instance.kernel,
+    'instance_profile': lambda instance: instance.instance_profile,
+    'root_device_type': lambda instance: instance.root_device_type,
+    'private_dns_name': lambda instance: instance.private_dns_name,
+    'public_dns_name': lambda instance: instance.public_dns_name,
+    'ebs_optimized': lambda instance: instance.ebs_optimized,
+    'client_token': lambda instance: instance.client_token,
+    'virtualization_type': lambda instance: instance.virtualization_type,
+    'architecture': lambda instance: instance.architecture,
+    'ramdisk': lambda instance: instance.ramdisk,
+    'tags': lambda instance: instance.tags,
+    'key_name': lambda instance: instance.key_name,
+    'source_destination_check': get_source_dest_check,
+    'image_id': lambda instance: instance.image_id,
+    'groups': get_groups,
+    'interfaces': get_interfaces,
+    'spot_instance_request_id': lambda instance: instance.spot_instance_request_id,
+    'requester_id': lambda instance: instance.requester_id,
+    'monitoring_state': lambda instance: instance.monitoring_state,
+    'placement': lambda instance: {
+        'tenancy': instance._placement.tenancy,
+        'zone': instance._placement.zone
+    },
+    'ami_launch_index': lambda instance: instance.ami_launch_index,
+    'launch_time': lambda instance: instance.launch_time,
+    'hypervisor': lambda instance: instance.hypervisor,
+    'region': lambda instance: instance.region.name,
+    'persistent': lambda instance: instance.persistent,
+    'private_ip_address': lambda instance: instance.private_ip_address,
+    'state': lambda instance: instance._state.name,
+    'vpc_id': lambda instance: instance.vpc_id,
+    'block_device_mapping': get_block_device_mapping,
+}
+
+
+def get_instance_info(instance, fields=None):
+
+    if fields is None:
+        fields = INSTANCE_FIELDS.keys()
+
+    instance_info = {}
+    for field in fields:
+        instance_info[field] = INSTANCE_FIELDS[field](instance)
 
     return instance_info
 
 
-def list_ec2_instances(connection, module):
+def list_ec2_instances(connection, filters=None, fields=None, page_size=None):
+    """ Return the facts of the matching instances, one page at a time
+
+    Each page of boto instances is converted and dropped before the next
+    describe call. """
 
-    filters = module.params.get("filters")
     instance_dict_array = []
+    next_token = None
+    while True:
+        # get_only_instances pages internally, so walk the reservations
+        reservations = connection.get_all_reservations(filters=filters, max_results=page_size,
+                                                       next_token=next_token)
+        for reservation in reservations:
+            for instance in reservation.instances:
+                instance_dict_array.append(get_instance_info(instance, fields))
+        next_token = reservations.next_token
+        if not next_token:
+            break
+
+    return instance_dict_array
+
+
+def get_all_regions(module, region, aws_connect_params):
+    """ Regions DescribeRegions returns for these credentials, in the partition of region """
 
     try:
-        all_instances = connection.get_only_instances(filters=filters)
-    except BotoServerError as e:
-        module.fail_json(msg=e.message)
+        connection = connect_to_aws(boto.ec2, region or 'us-east-1', **aws_connect_params)
+        return [r.name for r in connection.get_all_regions()]
+    except BotoServerError, e:
+        module.fail_json(msg="Failed to describe regions: %s" % e.message)
+    except (boto.exception.NoAuthHandlerFound, AnsibleAWSError), e:
+        module.fail_json(msg=str(e))
+
+
+# errors of regions that are not enabled for the credentials; AuthFailure
+# is also what bad credentials give, so it is only skipped for regions
+# from DescribeRegions, which already accepted the credentials
+SKIPPED_REGION_ERRORS = ('OptInRequired',)
+SKIPPED_EXPANDED_REGION_ERRORS = ('AuthFailure', 'OptInRequired')
+
 
-    for instance in all_instances:
-        instance_dict_array.append(get_instance_info(instance))
+def list_regions_instances(module, regions, aws_connect_params, expanded=False, **kwargs):
+    """ Query several regions concurrently, each with its own connection
 
-    module.exit_json(instances=instance_dict_array)
+    Returns the instances and a warning for each region skipped because it
+    is not enabled for these credentials. expanded tells the regions came
+    from DescribeRegions rather than the task.
+    """
+
+    if expanded:
+        skipped_errors = SKIPPED_EXPANDED_REGION_ERRORS
+    else:
+        skipped_errors = SKIPPED_REGION_ERRORS
+
+    results = {}
+    errors = []
+    warnings = []
+    lock = threading.Lock()
+
+    def work(region):
+        try:
+            connection = connect_to_aws(boto.ec2, region, **aws_connect_params)
+            instances = list_ec2_instances(connection, **kwargs)
+        except BotoServerError, e:
+            lock.acquire()
+            if e.error_code in skipped_errors:
+                warnings.append('Skipped region %s: %s' % (region, e.error_code))
+            else:
+                errors.append('%s: %s' % (region, e.message or str(e)))
+            lock.release()
+            return
+        except Exception, e:
+            lock.acquire()
+            errors.append('%s: %s' % (region, getattr(e, 'message', None) or str(e)))
+            lock.release()
+            return
+        lock.acquire()
+        results[region] = instances
+        lock.release()
+
+    threads = []
+    for region in regions:
+        thread = threading.Thread(target=work, args=(region,))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        module.fail_json(msg='Failed to gather instances: %s' % '; '.join(sorted(errors)))
+    if not results:
+        module.fail_json(msg='Failed to gather instances, every region was skipped: %s'
+                         % '; '.join(sorted(warnings)))
+
+    instance_dict_array = []
+    for region in regions:
+        instance_dict_array.extend(results.get(region, []))
+    return instance_dict_array, sorted(warnings)
 
 
 def main():
     argument_spec = ec2_argument_spec()
     argument_spec.update(
         dict(
-            filters = dict(default=None, type='dict')
+            filters = dict(default=None, type='dict'),
+            regions = dict(default=None, type='list'),
+            fields = dict(default=None, type='list'),
+            page_size = dict(default=500, type='int'),
         )
     )
 
@@ -165,7 +315,33 @@ def main():
     if not HAS_BOTO:
         module.fail_json(msg='boto required for this module')
 
+    fields = module.params.get('fields')
+    if fields:
+        unknown = [field for field in fields if field not in INSTANCE_FIELDS]
+        if unknown:
+            module.fail_json(msg="Unsupported fields: %s, choose from %s" % (', '.join(unknown),
+                             ', '.join(sorted(INSTANCE_FIELDS))))
+
+    page_size = module.params.get('page_size')
+    if not 5 <= page_size <= 1000:
+        module.fail_json(msg="page_size must be between 5 and 1000")
+
+    kwargs = dict(filters=module.params.get('filters'), fields=fields, page_size=page_size)
+
     region, ec2_url, aws_connect_params = get_aws_connection_info(module)
+    regions = module.params.get('regions')
+
+    if regions:
+        if 'all' in regions and len(regions) > 1:
+            module.fail_json(msg="regions: all can't be combined with other regions")
+        expanded = regions == ['all']
+        if expanded:
+            regions = get_all_regions(module, region, aws_connect_params)
+        instances, warnings = list_regions_instances(module, regions, aws_connect_params,
+                                                     expanded=expanded, **kwargs)
+        if warnings:
+            module.exit_json(instances=instances, warnings=warnings)
+        module.exit_json(instances=instances)
 
     if region:
         try:
@@ -175,7 +351,14 @@ def main():
     else:
         module.fail_json(msg="region must be specified")
 
-    list_ec2_instances(connection, module)
+    try:
+        instances = list_ec2_instances(connection, **kwargs)
+    except BotoServerError, e:
+        module.fail_json(msg=e.message)
+    except TypeError, e:
+        module.fail_json(msg="Failed to describe instances, boto may be too old: %s" % str(e))
+
+    module.exit_json(instances=instances)
 
 # import module snippets
 from ansible.module_utils.basic import *
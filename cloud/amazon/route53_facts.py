@@ -47,6 +47,7 @@ options:
   max_items:
     description:
       - Maximum number of items to return for various get/list requests
+      - With I(all_pages), the maximum number of items to return across all pages.
     required: false
   next_marker:
     description:
@@ -67,6 +68,7 @@ options:
   type:
     description:
       - The type of DNS record
+      - With I(all_pages), only record sets of this type are returned.
     required: false
     choices: [ 'A', 'CNAME', 'MX', 'AAAA', 'TXT', 'PTR', 'SRV', 'SPF', 'NS' ]
   dns_name:
@@ -112,6 +114,35 @@ options:
         'tags',
         ]
     default: 'list'
+  all_pages:
+    description:
+      - Follow the pagination of the list requests for hosted zones, health checks and record sets
+        and return the items of all pages in one result instead of a single page. Items are streamed
+        page by page into the result, which gets C(IsTruncated) and C(Count) keys.
+      - When I(max_items) truncates the result, it also gets C(NextMarker) for hosted zones and
+        health checks, to pass as I(next_marker), or C(NextRecordName), C(NextRecordType) and
+        C(NextRecordIdentifier) for record sets, to pass C(NextRecordName) as I(start_record_name)
+        (record sets of that name listed before are returned again).
+    required: false
+    default: false
+    version_added: "2.2"
+  subdomain:
+    description:
+      - "Used with query: record_sets and I(all_pages). Only return the record sets of this name and
+        the names below it. Route53 lists names in order of their reversed labels, so listing starts
+        at this name and stops at the first name sorting after all the names below it, without reading
+        the rest of the zone."
+    required: false
+    version_added: "2.2"
+  compact:
+    description:
+      - "Used with query: record_sets and I(all_pages). Return C(ResourceRecordSets) as a dict of
+        parallel lists, one per field (C(Name), C(Type), C(TTL), C(Values), C(AliasTarget),
+        C(SetIdentifier), C(Weight), C(Region), C(Failover), C(HealthCheckId)), instead of one dict
+        per record set. This keeps the result of very large zones small."
+    required: false
+    default: false
+    version_added: "2.2"
 author: Karen Cheng(@Etherdaemon)
 extends_documentation_fragment: aws
 '''
@@ -138,6 +169,16 @@ EXAMPLES = '''
     max_items: 20
   register: record_sets
 
+- name: List all TXT records below dev.example.com in a large zone
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    all_pages: true
+    subdomain: dev.example.com
+    type: TXT
+    compact: true
+  register: record_sets
+
 - name: List first 20 health checks
   route53_facts:
     query: health_check
@@ -173,6 +214,88 @@ except ImportError:
     HAS_BOTO3 = False
 
 
+# fields of the compact record set output
+RECORD_SET_COLUMNS = ('Name', 'Type', 'TTL', 'Values', 'AliasTarget', 'SetIdentifier',
+                      'Weight', 'Region', 'Failover', 'HealthCheckId')
+
+
+def paginate(client, operation, key, params, starting_token=None):
+    """ Yield the items under key of all pages of a list operation """
+    pagination_config = dict()
+    if starting_token:
+        pagination_config['StartingToken'] = starting_token
+    paginator = client.get_paginator(operation)
+    for page in paginator.paginate(PaginationConfig=pagination_config, **params):
+        for item in page[key]:
+            yield item
+
+
+def compact_record_set(record_set):
+    values = [record['Value'] for record in record_set.get('ResourceRecords', [])]
+    alias_target = record_set.get('AliasTarget')
+    if alias_target:
+        alias_target = alias_target['DNSName']
+    row = dict(record_set, Values=values, AliasTarget=alias_target)
+    return [row.get(column) for column in RECORD_SET_COLUMNS]
+
+
+def collect_items(module, items, key, compact=False, resume=None):
+    """ Gather streamed items into a result, honouring max_items
+
+    resume gives the keys to continue from the first item left out """
+    limit = None
+    if module.params.get('max_items'):
+        limit = int(module.params.get('max_items'))
+
+    if compact:
+        collected = dict((column, []) for column in RECORD_SET_COLUMNS)
+    else:
+        collected = []
+    count = 0
+    truncated = False
+    next_item = None
+    for item in items:
+        if limit is not None and count >= limit:
+            truncated = True
+            next_item = item
+            break
+        count += 1
+        if compact:
+            for column, value in zip(RECORD_SET_COLUMNS, compact_record_set(item)):
+                collected[column].append(value)
+        else:
+            collected.append(item)
+
+    results = dict(IsTruncated=truncated, Count=count)
+    if truncated and resume is not None:
+        results.update(resume(next_item))
+    results[key] = collected
+    return results
+
+
+def resume_marker(item):
+    # the marker of hosted zones and health checks is the id of the first
+    # item of the next page, without the /hostedzone/ prefix
+    return dict(NextMarker=item['Id'].split('/')[-1])
+
+
+def resume_record_set(record_set):
+    resume = dict(NextRecordName=record_set['Name'], NextRecordType=record_set['Type'])
+    if record_set.get('SetIdentifier'):
+        resume['NextRecordIdentifier'] = record_set['SetIdentifier']
+    return resume
+
+
+def in_subdomain(name, subdomain):
+    name = name.rstrip('.').lower()
+    return name == subdomain or name.endswith('.' + subdomain)
+
+
+def reversed_name(name):
+    # Route53 lists record sets ordered by their labels in reverse
+    return '.'.join(reversed(name.rstrip('.').lower().split('.')))
+
+
 def get_hosted_zone(client, module):
     params = dict()
 
@@ -205,6 +328,13 @@ def reusable_delegation_set_details(client, module):
 def list_hosted_zones(client, module):
     params = dict()
 
+    if module.params.get('all_pages'):
+        if module.params.get('delegation_set_id'):
+            params['DelegationSetId'] = module.params.get('delegation_set_id')
+        items = paginate(client, 'list_hosted_zones', 'HostedZones', params,
+                         starting_token=module.params.get('next_marker'))
+        return collect_items(module, items, 'HostedZones', resume=resume_marker)
+
     if module.params.get('max_items'):
         params['MaxItems'] = module.params.get('max_items')
 
@@ -298,6 +428,11 @@ def get_resource_tags(client, module):
 def list_health_checks(client, module):
     params = dict()
 
+    if module.params.get('all_pages'):
+        items = paginate(client, 'list_health_checks', 'HealthChecks', params,
+                         starting_token=module.params.get('next_marker'))
+        return collect_items(module, items, 'HealthChecks', resume=resume_marker)
+
     if module.params.get('max_items'):
         params['MaxItems'] = module.params.get('max_items')
 
@@ -316,6 +451,9 @@ def record_sets_details(client, module):
     else:
         module.fail_json(msg="Hosted Zone Id is required")
 
+    if module.params.get('all_pages'):
+        return all_record_sets(client, module, params)
+
     if module.params.get('max_items'):
         params['MaxItems'] = module.params.get('max_items')
 
@@ -331,6 +469,36 @@ def record_sets_details(client, module):
     return results
 
 
+def all_record_sets(client, module, params):
+    record_type = module.params.get('type')
+    subdomain = module.params.get('subdomain')
+    if subdomain:
+        subdomain = subdomain.rstrip('.').lower()
+        # start_record_name resumes a truncated listing of the subdomain
+        params['StartRecordName'] = module.params.get('start_record_name') or subdomain
+    elif module.params.get('start_record_name'):
+        params['StartRecordName'] = module.params.get('start_record_name')
+
+    if subdomain:
+        # Names below the subdomain all sort before this; siblings such as
+        # dev-api under dev can sort in between, so only stop past it
+        last = reversed_name(subdomain) + '.'
+
+    def record_sets():
+        for record_set in paginate(client, 'list_resource_record_sets', 'ResourceRecordSets', params):
+            if subdomain and not in_subdomain(record_set['Name'], subdomain):
+                name = reversed_name(record_set['Name'])
+                if name > last and not name.startswith(last):
+                    break
+                continue
+            if record_type and record_set['Type'] != record_type:
+                continue
+            yield record_set
+
+    return collect_items(module, record_sets(), 'ResourceRecordSets',
+                         compact=module.params.get('compact'), resume=resume_record_set)
+
+
 def health_check_details(client, module):
     health_check_invocations = {
         'list': list_health_checks,
@@ -396,6 +564,9 @@ def main():
             'count',
             'tags',
         ], default='list'),
+        all_pages=dict(type='bool', default=False),
+        subdomain=dict(),
+        compact=dict(type='bool', default=False),
         )
     )
 
@@ -25,6 +25,9 @@ options:
   force:
     description:
       - When trying to delete a bucket, delete all keys in the bucket first (an s3 bucket must be empty for a successful deletion)
+      - Keys, including all object versions and delete markers, are removed with multi-object delete requests of up
+        to 1000 keys, several of them at a time while the bucket is still being listed. Progress is logged on the
+        managed host and the number of deleted keys is returned as C(deleted_keys).
     required: false
     default: no
     choices: [ 'yes', 'no' ]
@@ -98,6 +101,8 @@ EXAMPLES = '''
 
 import xml.etree.ElementTree as ET
 import urlparse
+import threading
+import Queue
 
 try:
     import boto.ec2
@@ -258,11 +263,107 @@ def create_bucket(connection, module, location):
 
     module.exit_json(changed=changed, name=bucket.name, versioning=versioning_status, requester_pays=requester_pays_status, policy=current_policy, tags=current_tags_dict)
     
-def destroy_bucket(connection, module):
+# Maximum number of keys in one multi-object delete request
+DELETE_BATCH_SIZE = 1000
+# Number of delete requests in flight while emptying a bucket
+DELETE_WORKERS = 8
+# Log progress every this many deleted keys
+DELETE_PROGRESS_INTERVAL = 100000
+
+def delete_batch(bucket, batch):
+    """ Delete a list of (key name, version id) pairs, returning the errors """
+    try:
+        result = bucket.delete_keys(batch, quiet=True)
+        return ['%s: %s' % (error.key, error.message) for error in result.errors]
+    except S3ResponseError, e:
+        if e.status not in (400, 405, 501):
+            raise
+    # S3 stand-ins without the multi-object delete API
+    for name, version_id in batch:
+        bucket.delete_key(name, version_id=version_id)
+    return []
+
+def empty_bucket(module, connect, name, versions=True):
+    """ Delete every key of a bucket and return how many were deleted
+
+    The listing is streamed into batches of DELETE_BATCH_SIZE keys that
+    DELETE_WORKERS threads, each with its own connection, delete with
+    multi-object delete requests. With versions, all object versions and
+    delete markers are removed too. """
+
+    batches = Queue.Queue(maxsize=DELETE_WORKERS * 2)
+    lock = threading.Lock()
+    progress = {'deleted': 0, 'errors': []}
+
+    def work():
+        try:
+            bucket = connect().get_bucket(name, validate=False)
+        except Exception, e:
+            bucket = None
+            lock.acquire()
+            progress['errors'].append(str(e))
+            lock.release()
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if bucket is None or progress['errors']:
+                # drain the queue so the listing never blocks
+                continue
+            try:
+                errors = delete_batch(bucket, batch)
+            except Exception, e:
+                errors = [str(e)]
+            lock.acquire()
+            try:
+                progress['errors'].extend(errors)
+                before = progress['deleted']
+                progress['deleted'] += len(batch) - len(errors)
+                if before // DELETE_PROGRESS_INTERVAL != progress['deleted'] // DELETE_PROGRESS_INTERVAL:
+                    module.log("s3_bucket: deleted %d keys from %s" % (progress['deleted'], name))
+            finally:
+                lock.release()
+
+    threads = []
+    for i in range(DELETE_WORKERS):
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    try:
+        bucket = connect().get_bucket(name, validate=False)
+        if versions:
+            listing = bucket.list_versions()
+        else:
+            listing = bucket.list()
+        batch = []
+        for key in listing:
+            if progress['errors']:
+                break
+            batch.append((key.name, getattr(key, 'version_id', None)))
+            if len(batch) == DELETE_BATCH_SIZE:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+    finally:
+        for thread in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+
+    if progress['errors']:
+        module.fail_json(msg="Failed to delete %d key(s) from bucket %s" % (len(progress['errors']), name),
+                         errors=progress['errors'][:100], deleted_keys=progress['deleted'])
+    return progress['deleted']
+
+def destroy_bucket(connection, module, connect=None, versions=True):
     
     force = module.params.get("force")
     name = module.params.get("name")
     changed = False
+    deleted_keys = 0
     
     try:
         bucket = connection.get_bucket(name)
@@ -276,8 +377,7 @@ def destroy_bucket(connection, module):
     if force:
         try:
             # Empty the bucket
-            for key in bucket.list():
-                key.delete()
+            deleted_keys = empty_bucket(module, connect or (lambda: connection), name, versions)
                 
         except BotoServerError, e:
             module.fail_json(msg=e.message)
@@ -288,7 +388,7 @@ def destroy_bucket(connection, module):
     except S3ResponseError, e:
         module.fail_json(msg=e.message)
         
-    module.exit_json(changed=changed)
+    module.exit_json(changed=changed, deleted_keys=deleted_keys)
 
 def is_fakes3(s3_url):
     """ Return True if s3_url has scheme fakes3:// """
@@ -344,12 +444,12 @@ def main():
     if not s3_url and 'S3_URL' in os.environ:
         s3_url = os.environ['S3_URL']
 
-    # Look at s3_url and tweak connection settings
-    # if connecting to Walrus or fakes3
-    try:
+    def connect():
+        # Look at s3_url and tweak connection settings
+        # if connecting to Walrus or fakes3
         if is_fakes3(s3_url):
             fakes3 = urlparse.urlparse(s3_url)
-            connection = S3Connection(
+            return S3Connection(
                 is_secure=fakes3.scheme == 'fakes3s',
                 host=fakes3.hostname,
                 port=fakes3.port,
@@ -358,13 +458,15 @@ def main():
             )
         elif is_walrus(s3_url):
             walrus = urlparse.urlparse(s3_url).hostname
-            connection = boto.connect_walrus(walrus, **aws_connect_params)
-        else:
-            connection = boto.s3.connect_to_region(location, is_secure=True, calling_format=OrdinaryCallingFormat(), **aws_connect_params)
-            # use this as fallback because connect_to_region seems to fail in boto + non 'classic' aws accounts in some cases
-            if connection is None:
-                connection = boto.connect_s3(**aws_connect_params)
+            return boto.connect_walrus(walrus, **aws_connect_params)
+        connection = boto.s3.connect_to_region(location, is_secure=True, calling_format=OrdinaryCallingFormat(), **aws_connect_params)
+        # use this as fallback because connect_to_region seems to fail in boto + non 'classic' aws accounts in some cases
+        if connection is None:
+            connection = boto.connect_s3(**aws_connect_params)
+        return connection
 
+    try:
+        connection = connect()
     except boto.exception.NoAuthHandlerFound, e:
         module.fail_json(msg='No Authentication Handler found: %s ' % str(e))
     except Exception, e:
@@ -378,7 +480,8 @@ def main():
     if state == 'present':
         create_bucket(connection, module, location)
     elif state == 'absent':
-        destroy_bucket(connection, module)
+        # fakes3 has no versioning, so only plain keys are listed there
+        destroy_bucket(connection, module, connect, versions=not is_fakes3(s3_url))
 
 from ansible.module_utils.basic import *
 from ansible.module_utils.ec2 import *
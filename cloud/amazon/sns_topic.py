@@ -66,6 +66,17 @@ options:
         Blame Amazon."
     required: False
     default: True
+  arn_cache:
+    description:
+      - Path of a JSON file caching topic ARNs between tasks. Topics are
+        always looked up directly by the ARN built from the account id of
+        the credentials (from STS GetCallerIdentity); a cached ARN or the
+        account id of another cached topic saves that call. All topics in
+        the account are only listed when the account id can't be found.
+        Use one cache file per AWS account.
+    required: False
+    default: None
+    version_added: "2.2"
 extends_documentation_fragment: aws
 requirements: [ "boto" ]
 """
@@ -122,13 +133,15 @@ sns_topic:
       attributes_set: []
 '''
 
+import os
 import sys
-import time
 import json
 import re
+import tempfile
 
 try:
     import boto.sns
+    import boto.sts
     from boto.exception import BotoServerError
     HAS_BOTO = True
 except ImportError:
@@ -149,6 +162,7 @@ class SnsTopicManager(object):
                  purge_subscriptions,
                  check_mode,
                  region,
+                 arn_cache=None,
                  **aws_connect_params):
 
         self.region = region
@@ -170,7 +184,10 @@ class SnsTopicManager(object):
         self.topic_created = False
         self.topic_deleted = False
         self.arn_topic = None
+        self.topic_attributes = None
         self.attributes_set = []
+        self.arn_cache = arn_cache
+        self.arn_cache_entries = self._read_arn_cache()
 
     def _get_boto_connection(self):
         try:
@@ -194,8 +211,126 @@ class SnsTopicManager(object):
         return [t['TopicArn'] for t in topics]
 
 
+    def _read_arn_cache(self):
+        if not self.arn_cache or not os.path.exists(self.arn_cache):
+            return {}
+        try:
+            f = open(self.arn_cache)
+            try:
+                entries = json.load(f)
+            finally:
+                f.close()
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+
+    def _write_arn_cache(self):
+        # atomically replace the cache, an unwritable cache is ignored
+        if not self.arn_cache or self.check_mode:
+            return
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.arn_cache)))
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(self.arn_cache_entries, f, indent=2, sort_keys=True)
+            finally:
+                f.close()
+            os.rename(tmp, self.arn_cache)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+    def _cache_key(self):
+        return '%s:%s' % (self.region, self._topic_name())
+
+
+    def _topic_name(self):
+        if self.name.startswith('arn:'):
+            return self.name.split(':')[-1]
+        return self.name
+
+
+    def _partition(self):
+        if self.region.startswith('cn-'):
+            return 'aws-cn'
+        if self.region.startswith('us-gov-'):
+            return 'aws-us-gov'
+        return 'aws'
+
+
+    def _cached_account_id(self):
+        # every topic of an account shares the account id part of its ARN
+        for arn in self.arn_cache_entries.values():
+            parts = arn.split(':')
+            if len(parts) == 6 and parts[1] == self._partition():
+                return parts[4]
+        return None
+
+
+    def _caller_account_id(self):
+        # the account id of the credentials, None if STS won't tell
+        try:
+            sts = connect_to_aws(boto.sts, self.region, **self.aws_connect_params)
+            response = sts.make_request('GetCallerIdentity', {}, '/', 'POST')
+            body = response.read()
+        except (BotoServerError, AnsibleAWSError, boto.exception.NoAuthHandlerFound):
+            return None
+        if response.status != 200:
+            return None
+        match = re.search(r'<Account>(\d+)</Account>', body)
+        if match:
+            return match.group(1)
+        return None
+
+
+    def _get_topic_attributes(self, arn):
+        """ Return the attributes of a topic, or None if it does not exist """
+        try:
+            response = self.connection.get_topic_attributes(arn)
+        except BotoServerError, err:
+            if err.status == 404 or err.error_code == 'NotFound':
+                return None
+            self.module.fail_json(msg=err.message)
+        return response['GetTopicAttributesResponse']['GetTopicAttributesResult']['Attributes']
+
+
     def _arn_topic_lookup(self):
-        # topic names cannot have colons, so this captures the full topic name
+        """ Return the ARN of the topic, or None if it does not exist
+
+        A given ARN, a cached ARN or an ARN built from the account id of the
+        credentials is checked with a single GetTopicAttributes call. Only
+        when no account id can be found are all topics in the account
+        listed. """
+        # a given or built ARN is authoritative, a cached one may be stale
+        authoritative = None
+        candidates = []
+        if self.name.startswith('arn:'):
+            authoritative = self.name
+        else:
+            cached = self.arn_cache_entries.get(self._cache_key())
+            if cached:
+                candidates.append(cached)
+            account_id = self._cached_account_id() or self._caller_account_id()
+            if account_id:
+                authoritative = 'arn:%s:sns:%s:%s:%s' % (self._partition(), self.region, account_id, self.name)
+        if authoritative and authoritative not in candidates:
+            candidates.append(authoritative)
+
+        for arn in candidates:
+            attributes = self._get_topic_attributes(arn)
+            if attributes is not None:
+                self.topic_attributes = attributes
+                return arn
+        if authoritative:
+            return None
+
+        # last resort, topic names cannot have colons, so this captures the
+        # full topic name
         all_topics = self._get_all_topics()
         lookup_topic = ':%s' % self.name
         for topic in all_topics:
@@ -207,17 +342,19 @@ class SnsTopicManager(object):
         self.changed = True
         self.topic_created = True
         if not self.check_mode:
-            self.connection.create_topic(self.name)
-            self.arn_topic = self._arn_topic_lookup()
-            while not self.arn_topic:
-                time.sleep(3)
-                self.arn_topic = self._arn_topic_lookup()
+            try:
+                response = self.connection.create_topic(self._topic_name())
+            except BotoServerError, err:
+                self.module.fail_json(msg=err.message)
+            self.arn_topic = response['CreateTopicResponse']['CreateTopicResult']['TopicArn']
 
 
     def _set_topic_attrs(self):
-        topic_attributes = self.connection.get_topic_attributes(self.arn_topic) \
-            ['GetTopicAttributesResponse'] ['GetTopicAttributesResult'] \
-            ['Attributes']
+        topic_attributes = self.topic_attributes
+        if topic_attributes is None:
+            topic_attributes = self.connection.get_topic_attributes(self.arn_topic) \
+                ['GetTopicAttributesResponse'] ['GetTopicAttributesResult'] \
+                ['Attributes']
 
         if self.display_name and self.display_name != topic_attributes['DisplayName']:
             self.changed = True
@@ -260,26 +397,29 @@ class SnsTopicManager(object):
                 break
 
     def _set_topic_subs(self):
-        subscriptions_existing_list = []
+        # subscriptions are indexed by (protocol, canonical endpoint)
+        subscriptions_existing_keys = set()
         desired_subscriptions = [(sub['protocol'],
             self._canonicalize_endpoint(sub['protocol'], sub['endpoint'])) for sub in
             self.subscriptions]
+        desired_subscriptions_keys = set(desired_subscriptions)
 
-        if self.subscriptions_existing:
-            for sub in self.subscriptions_existing:
-                sub_key = (sub['Protocol'], sub['Endpoint'])
-                subscriptions_existing_list.append(sub_key)
-                if self.purge_subscriptions and sub_key not in desired_subscriptions and \
-                    sub['SubscriptionArn'] != 'PendingConfirmation':
-                    self.changed = True
-                    self.subscriptions_deleted.append(sub_key)
-                    if not self.check_mode:
-                        self.connection.unsubscribe(sub['SubscriptionArn'])
+        for sub in self.subscriptions_existing:
+            sub_key = (sub['Protocol'],
+                self._canonicalize_endpoint(sub['Protocol'], sub['Endpoint']))
+            subscriptions_existing_keys.add(sub_key)
+            if self.purge_subscriptions and sub_key not in desired_subscriptions_keys and \
+                sub['SubscriptionArn'] != 'PendingConfirmation':
+                self.changed = True
+                self.subscriptions_deleted.append(sub_key)
+                if not self.check_mode:
+                    self.connection.unsubscribe(sub['SubscriptionArn'])
 
         for (protocol, endpoint) in desired_subscriptions:
-            if (protocol, endpoint) not in subscriptions_existing_list:
+            if (protocol, endpoint) not in subscriptions_existing_keys:
+                subscriptions_existing_keys.add((protocol, endpoint))
                 self.changed = True
-                self.subscriptions_added.append(sub)
+                self.subscriptions_added.append((protocol, endpoint))
                 if not self.check_mode:
                     self.connection.subscribe(self.arn_topic, protocol, endpoint)
 
@@ -306,6 +446,11 @@ class SnsTopicManager(object):
         self.arn_topic = self._arn_topic_lookup()
         if not self.arn_topic:
             self._create_topic()
+        if not self.arn_topic:
+            # check mode, the topic would be created
+            return
+        self.arn_cache_entries[self._cache_key()] = self.arn_topic
+        self._write_arn_cache()
         self._set_topic_attrs()
         self._get_topic_subs()
         self._set_topic_subs()
@@ -317,6 +462,8 @@ class SnsTopicManager(object):
            if self.subscriptions_existing:
                self._delete_subscriptions()
            self._delete_topic()
+        if self.arn_cache_entries.pop(self._cache_key(), None):
+            self._write_arn_cache()
 
 
     def get_info(self):
@@ -353,6 +500,7 @@ def main():
             delivery_policy=dict(type='dict', required=False),
             subscriptions=dict(default=[], type='list', required=False),
             purge_subscriptions=dict(type='bool', default=True),
+            arn_cache=dict(type='path', required=False),
         )
     )
 
@@ -385,6 +533,7 @@ def main():
                                 purge_subscriptions,
                                 check_mode,
                                 region,
+                                arn_cache=module.params.get('arn_cache'),
                                 **aws_connect_params)
 
     if state == 'present':
@@ -37,7 +37,16 @@ options:
   name:
     description:
       - Name of the queue.
-    required: true
+      - Required unless I(queues) is given.
+    required: false
+  queues:
+    description:
+      - A list of queues to manage with a single connection, instead of I(name).
+      - Each item is either a queue name or a dict with a C(name) key and any of the queue attribute options
+        below, which override the module-level values for that queue.
+    required: false
+    default: null
+    version_added: "2.2"
   default_visibility_timeout:
     description:
       - The default visibility timeout in seconds.
@@ -69,6 +78,12 @@ options:
     required: false
     default: null
     version_added: "2.1"
+  redrive_policy:
+    description:
+      - The json dict redrive policy to attach to the queue, for example its dead letter queue.
+    required: false
+    default: null
+    version_added: "2.2"
 extends_documentation_fragment:
     - aws
     - ec2
@@ -86,6 +101,19 @@ EXAMPLES = '''
     receive_message_wait_time: 20
     policy: "{{ json_dict }}"
 
+# Create or update several SQS queues at once
+- sqs_queue:
+    region: ap-southeast-2
+    receive_message_wait_time: 20
+    queues:
+      - my-queue
+      - name: my-slow-queue
+        default_visibility_timeout: 600
+      - name: my-queue-with-dlq
+        redrive_policy:
+          maxReceiveCount: 5
+          deadLetterTargetArn: arn:aws:sqs:ap-southeast-2:123456789012:my-dead-letters
+
 # Delete SQS queue
 - sqs_queue:
     name: my-queue
@@ -102,132 +130,147 @@ except ImportError:
     HAS_BOTO = False
 
 
-def create_or_update_sqs_queue(connection, module):
-    queue_name = module.params.get('name')
+# (module option, SQS attribute) pairs of the managed queue attributes
+QUEUE_ATTRIBUTES = [
+    ('default_visibility_timeout', 'VisibilityTimeout'),
+    ('message_retention_period', 'MessageRetentionPeriod'),
+    ('maximum_message_size', 'MaximumMessageSize'),
+    ('delivery_delay', 'DelaySeconds'),
+    ('receive_message_wait_time', 'ReceiveMessageWaitTimeSeconds'),
+    ('policy', 'Policy'),
+    ('redrive_policy', 'RedrivePolicy'),
+]
 
-    queue_attributes = dict(
-        default_visibility_timeout=module.params.get('default_visibility_timeout'),
-        message_retention_period=module.params.get('message_retention_period'),
-        maximum_message_size=module.params.get('maximum_message_size'),
-        delivery_delay=module.params.get('delivery_delay'),
-        receive_message_wait_time=module.params.get('receive_message_wait_time'),
-        policy=module.params.get('policy'),
-    )
+# attributes holding JSON documents, compared with sorted keys
+JSON_ATTRIBUTES = ('Policy', 'RedrivePolicy')
 
+
+def create_or_update_sqs_queue(connection, queue_name, queue_attributes, region=None, check_mode=False):
     result = dict(
-        region=module.params.get('region'),
+        region=region,
         name=queue_name,
     )
     result.update(queue_attributes)
 
-    try:
-        queue = connection.get_queue(queue_name)
-        if queue:
-            # Update existing
-            result['changed'] = update_sqs_queue(queue, check_mode=module.check_mode, **queue_attributes)
+    queue = connection.get_queue(queue_name)
+    if queue:
+        # Update existing
+        result['changed'] = update_sqs_queue(queue, check_mode=check_mode, **queue_attributes)
 
-        else:
-            # Create new
-            if not module.check_mode:
-                queue = connection.create_queue(queue_name)
-                update_sqs_queue(queue, **queue_attributes)
-            result['changed'] = True
-
-    except BotoServerError:
-        result['msg'] = 'Failed to create/update sqs queue due to error: ' + traceback.format_exc()
-        module.fail_json(**result)
     else:
-        module.exit_json(**result)
-
-
-def update_sqs_queue(queue,
-                     check_mode=False,
-                     default_visibility_timeout=None,
-                     message_retention_period=None,
-                     maximum_message_size=None,
-                     delivery_delay=None,
-                     receive_message_wait_time=None,
-                     policy=None):
-    changed = False
-
-    changed = set_queue_attribute(queue, 'VisibilityTimeout', default_visibility_timeout,
-                                  check_mode=check_mode) or changed
-    changed = set_queue_attribute(queue, 'MessageRetentionPeriod', message_retention_period,
-                                  check_mode=check_mode) or changed
-    changed = set_queue_attribute(queue, 'MaximumMessageSize', maximum_message_size,
-                                  check_mode=check_mode) or changed
-    changed = set_queue_attribute(queue, 'DelaySeconds', delivery_delay,
-                                  check_mode=check_mode) or changed
-    changed = set_queue_attribute(queue, 'ReceiveMessageWaitTimeSeconds', receive_message_wait_time,
-                                  check_mode=check_mode) or changed
-    changed = set_queue_attribute(queue, 'Policy', policy,
-                                  check_mode=check_mode) or changed
-    return changed
-
-
-def set_queue_attribute(queue, attribute, value, check_mode=False):
-    if not value:
-        return False
+        # Create new
+        if not check_mode:
+            queue = connection.create_queue(queue_name)
+            update_sqs_queue(queue, existing={}, **queue_attributes)
+        result['changed'] = True
 
-    try:
-        existing_value = queue.get_attributes(attributes=attribute)[attribute]
-    except:
-        existing_value = ''
+    return result
 
+
+def normalize_attribute(attribute, value):
     # convert dict attributes to JSON strings (sort keys for comparing)
-    if attribute is 'Policy':
-        value = json.dumps(value, sort_keys=True)
-        if existing_value:
-            existing_value = json.dumps(json.loads(existing_value), sort_keys=True)
+    if attribute in JSON_ATTRIBUTES:
+        if isinstance(value, basestring):
+            value = value and json.loads(value) or {}
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def update_sqs_queue(queue, check_mode=False, existing=None, **queue_attributes):
+    """ Apply the given attributes to a queue in at most one request
+
+    The current attributes are fetched in a single call unless passed in
+    as existing, which is used for freshly created queues. """
+    if existing is None:
+        existing = queue.get_attributes('All')
+
+    changes = {}
+    for option, attribute in QUEUE_ATTRIBUTES:
+        value = queue_attributes.get(option)
+        if value is None:
+            continue
+        value = normalize_attribute(attribute, value)
+        existing_value = existing.get(attribute)
+        if existing_value is not None:
+            existing_value = normalize_attribute(attribute, existing_value)
+        if value != existing_value:
+            changes[attribute] = value
+
+    if changes and not check_mode:
+        set_queue_attributes(queue, changes)
+    return bool(changes)
+
+
+def set_queue_attributes(queue, attributes):
+    # boto only sets one attribute per request, SetQueueAttributes takes several
+    params = {}
+    for i, attribute in enumerate(sorted(attributes)):
+        params['Attribute.%d.Name' % (i + 1)] = attribute
+        params['Attribute.%d.Value' % (i + 1)] = attributes[attribute]
+    return queue.connection.get_status('SetQueueAttributes', params, queue.id, verb='POST')
+
+
+def delete_sqs_queue(connection, queue_name, region=None, check_mode=False):
+    result = dict(
+        region=region,
+        name=queue_name,
+    )
 
-    if str(value) != existing_value:
+    queue = connection.get_queue(queue_name)
+    if queue:
         if not check_mode:
-            queue.set_attribute(attribute, value)
-        return True
-
-    return False
+            connection.delete_queue(queue)
+        result['changed'] = True
 
+    else:
+        result['changed'] = False
 
-def delete_sqs_queue(connection, module):
-    queue_name = module.params.get('name')
+    return result
 
-    result = dict(
-        region=module.params.get('region'),
-        name=queue_name,
-    )
 
-    try:
-        queue = connection.get_queue(queue_name)
-        if queue:
-            if not module.check_mode:
-                connection.delete_queue(queue)
-            result['changed'] = True
+def get_queue_specs(module):
+    """ Return (name, attributes) for each queue the module manages """
+    defaults = dict((option, module.params.get(option)) for option, attribute in QUEUE_ATTRIBUTES)
+    if module.params.get('name'):
+        return [(module.params.get('name'), defaults)]
 
+    specs = []
+    for item in module.params.get('queues'):
+        if isinstance(item, dict):
+            item = item.copy()
+            name = item.pop('name', None)
+            unknown = [key for key in item if key not in defaults]
+            if unknown:
+                module.fail_json(msg='Unsupported queue option(s) %s for queue %s' % (', '.join(sorted(unknown)), name))
         else:
-            result['changed'] = False
-
-    except BotoServerError:
-        result['msg'] = 'Failed to delete sqs queue due to error: ' + traceback.format_exc()
-        module.fail_json(**result)
-    else:
-        module.exit_json(**result)
+            name, item = item, {}
+        if not name:
+            module.fail_json(msg='Every item in queues needs a name')
+        attributes = defaults.copy()
+        attributes.update(item)
+        specs.append((name, attributes))
+    return specs
 
 
 def main():
     argument_spec = ec2_argument_spec()
     argument_spec.update(dict(
         state=dict(default='present', choices=['present', 'absent']),
-        name=dict(required=True, type='str'),
+        name=dict(type='str'),
+        queues=dict(type='list'),
         default_visibility_timeout=dict(type='int'),
         message_retention_period=dict(type='int'),
         maximum_message_size=dict(type='int'),
         delivery_delay=dict(type='int'),
         receive_message_wait_time=dict(type='int'),
         policy=dict(type='dict', required=False),
+        redrive_policy=dict(type='dict', required=False),
     ))
 
     module = AnsibleModule(
         argument_spec=argument_spec,
+        mutually_exclusive=[['name', 'queues']],
+        required_one_of=[['name', 'queues']],
         supports_check_mode=True)
 
     if not HAS_BOTO:
@@ -244,10 +287,28 @@ def main():
         module.fail_json(msg=str(e))
 
     state = module.params.get('state')
-    if state == 'present':
-        create_or_update_sqs_queue(connection, module)
-    elif state == 'absent':
-        delete_sqs_queue(connection, module)
+    results = []
+    for queue_name, queue_attributes in get_queue_specs(module):
+        try:
+            if state == 'present':
+                result = create_or_update_sqs_queue(connection, queue_name, queue_attributes,
+                                                    region=region, check_mode=module.check_mode)
+            elif state == 'absent':
+                result = delete_sqs_queue(connection, queue_name,
+                                          region=region, check_mode=module.check_mode)
+        except BotoServerError:
+            if state == 'present':
+                action = 'create/update'
+            else:
+                action = 'delete'
+            module.fail_json(msg='Failed to %s sqs queue %s due to error: %s' % (action, queue_name, traceback.format_exc()),
+                             queues=results)
+        results.append(result)
+
+    if module.params.get('name'):
+        module.exit_json(**results[0])
+    module.exit_json(changed=any([result['changed'] for result in results]),
+                     region=region, queues=results)
 
 
 # import module snippets
@@ -35,6 +35,8 @@ description:
 notes:
   - This module supports check mode.
   - When using 'with_*' loops be aware that if you do not set a unique mark the block will be overwritten on each iteration.
+  - When managing many blocks in the same file, prefer the C(blocks) option over a loop;
+    the file is then scanned and rewritten only once.
 options:
   dest:
     aliases: [ name, destfile ]
@@ -100,6 +102,20 @@ options:
     description:
       - 'This flag indicates that filesystem links, if they exist, should be followed.'
     version_added: "2.1"
+  blocks:
+    required: false
+    default: null
+    version_added: "2.2"
+    description:
+      - A list of hashes, each describing one block with the keys C(marker),
+        C(block), C(state), C(insertafter) and C(insertbefore). Keys that are
+        not given default to the module level value, so every entry needs at
+        least a distinct C(marker).
+      - All marker pairs and insertion anchors are located in a single pass
+        over the file, and the file is written once. Unchanged regions are
+        copied as they are. Insertion anchors are matched against the
+        original file content, not against blocks added in the same run.
+      - Mutually exclusive with C(block).
 """
 
 EXAMPLES = r"""
@@ -144,12 +160,24 @@ EXAMPLES = r"""
       - { name: host1, ip: 10.10.1.10 }
       - { name: host2, ip: 10.10.1.11 }
       - { name: host3, ip: 10.10.1.12 }
+
+- name: Add the same mappings with a single rewrite of /etc/hosts
+  blockinfile:
+    dest: /etc/hosts
+    blocks:
+      - { marker: "# {mark} ANSIBLE MANAGED BLOCK host1", block: "10.10.1.10 host1" }
+      - { marker: "# {mark} ANSIBLE MANAGED BLOCK host2", block: "10.10.1.11 host2" }
+      - { marker: "# {mark} ANSIBLE MANAGED BLOCK host3", state: absent }
 """
 
 import re
 import os
+import shutil
 import tempfile
 
+# Read size used when copying unchanged regions in blocks mode
+COPY_BUFSIZE = 64 * 1024
+
 
 def write_changes(module, contents, dest):
 
@@ -158,6 +186,11 @@ def write_changes(module, contents, dest):
     f.write(contents)
     f.close()
 
+    validate_and_move(module, tmpfile, dest)
+
+
+def validate_and_move(module, tmpfile, dest):
+
     validate = module.params.get('validate', None)
     valid = not validate
     if validate:
@@ -185,6 +218,234 @@ def check_file_attrs(module, changed, message):
     return message, changed
 
 
+def block_specs(module, params):
+    """Expand the blocks option into one settings hash per block."""
+    specs = []
+    seen = {}
+    for item in params['blocks']:
+        if not isinstance(item, dict):
+            module.fail_json(msg='Each entry in blocks must be a hash: %s' % item)
+        spec = dict(marker=params['marker'], block='', state=params['state'],
+                    insertafter=params['insertafter'],
+                    insertbefore=params['insertbefore'])
+        for key, value in item.items():
+            if key == 'content':
+                key = 'block'
+            if key not in spec:
+                module.fail_json(msg='Unsupported key %s in blocks entry: %s' % (key, item))
+            spec[key] = value
+        if 'insertafter' in item and 'insertbefore' in item:
+            module.fail_json(msg='insertafter and insertbefore are mutually exclusive: %s' % item)
+        elif 'insertafter' in item:
+            spec['insertbefore'] = None
+        elif 'insertbefore' in item:
+            spec['insertafter'] = None
+        if spec['state'] not in ('present', 'absent'):
+            module.fail_json(msg='Invalid state %s in blocks entry: %s' % (spec['state'], item))
+        if spec['marker'] in seen:
+            module.fail_json(msg='Marker %s is used by more than one block' % spec['marker'])
+        seen[spec['marker']] = True
+
+        if spec['insertbefore'] is None and spec['insertafter'] is None:
+            spec['insertafter'] = 'EOF'
+        spec['insertre'] = None
+        if spec['insertafter'] not in (None, 'EOF'):
+            spec['insertre'] = spec['insertafter']
+        elif spec['insertbefore'] not in (None, 'BOF'):
+            spec['insertre'] = spec['insertbefore']
+
+        spec['marker0'] = re.sub(r'{mark}', 'BEGIN', spec['marker'])
+        spec['marker1'] = re.sub(r'{mark}', 'END', spec['marker'])
+        spec['text'] = ''
+        if spec['state'] == 'present' and spec['block']:
+            blocklines = [spec['marker0']] + spec['block'].splitlines() + [spec['marker1']]
+            spec['text'] = '\n'.join(blocklines) + '\n'
+        specs.append(spec)
+    return specs
+
+
+def scan_blocks(dest, specs):
+    """Find markers and insertion anchors of all specs in one pass.
+
+    Records the byte range of the last line starting with each marker
+    (preferring lines equal to it) in
+    spec['begin'] / spec['end'] and of the last line matching the
+    insertion regex in spec['anchor']. Only offsets are kept, so memory
+    use does not grow with the file. Returns the file size and whether
+    the file ends with a newline.
+    """
+    markers = {}
+    for spec in specs:
+        spec['begin'] = spec['end'] = spec['anchor'] = None
+        spec['begin_exact'] = spec['end_exact'] = False
+        for key, marker in (('begin', spec['marker0']), ('end', spec['marker1'])):
+            markers.setdefault(len(marker), {}).setdefault(marker, []).append((spec, key))
+    lengths = sorted(markers.keys())
+
+    anchors = {}
+    for spec in specs:
+        if spec['insertre'] is not None:
+            if spec['insertre'] not in anchors:
+                anchors[spec['insertre']] = (re.compile(spec['insertre']), [])
+            anchors[spec['insertre']][1].append(spec)
+    anchors = anchors.values()
+
+    offset = 0
+    last = ''
+    f = open(dest, 'rb')
+    try:
+        for raw in f:
+            stop = offset + len(raw)
+            line = raw.rstrip('\r\n')
+            for length in lengths:
+                if len(line) < length:
+                    break
+                hits = markers[length].get(line[:length])
+                if hits:
+                    exact = (len(line) == length)
+                    for spec, key in hits:
+                        # A marker that is a prefix of another block's
+                        # marker must not steal that block's lines
+                        if exact or not spec[key + '_exact']:
+                            spec[key] = (offset, stop)
+                            spec[key + '_exact'] = exact
+            for regex, owners in anchors:
+                if regex.search(line):
+                    for spec in owners:
+                        spec['anchor'] = (offset, stop)
+            offset = stop
+            last = raw
+    finally:
+        f.close()
+    return offset, last.endswith('\n')
+
+
+def plan_edits(module, dest, specs, size, newline):
+    """Turn scanned specs into sorted, non-overlapping byte range edits.
+
+    Each edit is (start, stop, sequence, text, spec); edits that would
+    leave the file unchanged are dropped.
+    """
+    edits = []
+    for sequence, spec in enumerate(specs):
+        text = spec['text']
+        if spec['begin'] is not None and spec['end'] is not None:
+            start = min(spec['begin'][0], spec['end'][0])
+            stop = max(spec['begin'][1], spec['end'][1])
+            if stop == size and not newline:
+                if text:
+                    text = text[:-1]
+                elif start > 0:
+                    start -= 1  # drop the newline ending the previous line
+        elif not text:
+            continue
+        else:
+            if spec['insertre'] is not None and spec['anchor'] is not None:
+                if spec['insertafter'] is not None:
+                    start = spec['anchor'][1]
+                else:
+                    start = spec['anchor'][0]
+            elif spec['insertre'] is None and spec['insertbefore'] is not None:
+                start = 0   # insertbefore=BOF
+            else:
+                start = size
+            stop = start
+            if start == size and size and not newline:
+                text = '\n' + text[:-1]
+        edits.append((start, stop, sequence, text, spec))
+    edits.sort()
+
+    changed = []
+    previous = 0
+    f = None
+    try:
+        for edit in edits:
+            start, stop, sequence, text, spec = edit
+            if start < previous:
+                module.fail_json(msg='Block %s overlaps another managed block' % spec['marker'])
+            previous = stop
+            if stop > start:
+                if f is None:
+                    f = open(dest, 'rb')
+                f.seek(start)
+                if f.read(stop - start) == text:
+                    continue
+            changed.append(edit)
+    finally:
+        if f is not None:
+            f.close()
+    return changed
+
+
+def write_edits(module, dest, edits):
+    """Write dest with edits applied, copying untouched byte ranges."""
+
+    tmpfd, tmpfile = tempfile.mkstemp()
+    out = os.fdopen(tmpfd, 'wb')
+    src = None
+    try:
+        if os.path.exists(dest):
+            src = open(dest, 'rb')
+        position = 0
+        for start, stop, sequence, text, spec in edits:
+            remaining = start - position
+            while remaining > 0:
+                chunk = src.read(min(remaining, COPY_BUFSIZE))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+            out.write(text)
+            if src is not None:
+                src.seek(stop)
+            position = stop
+        if src is not None:
+            shutil.copyfileobj(src, out, COPY_BUFSIZE)
+    finally:
+        out.close()
+        if src is not None:
+            src.close()
+
+    validate_and_move(module, tmpfile, dest)
+
+
+def manage_blocks(module, dest):
+    params = module.params
+    specs = block_specs(module, params)
+
+    if os.path.exists(dest):
+        size, newline = scan_blocks(dest, specs)
+        created = False
+    else:
+        if not module.boolean(params['create']):
+            module.fail_json(rc=257,
+                             msg='Destination %s does not exist !' % dest)
+        for spec in specs:
+            spec['begin'] = spec['end'] = spec['anchor'] = None
+        size, newline = 0, False
+        created = True
+
+    edits = plan_edits(module, dest, specs, size, newline)
+    inserted = len([e for e in edits if e[3]])
+    removed = len(edits) - inserted
+    changed = bool(edits)
+    if not changed:
+        msg = ''
+    elif created:
+        msg = 'File created'
+    else:
+        msg = '%d block(s) inserted or updated, %d removed' % (inserted, removed)
+
+    if changed and not module.check_mode:
+        if module.boolean(params['backup']) and os.path.exists(dest):
+            module.backup_local(dest)
+        write_edits(module, dest, edits)
+
+    msg, changed = check_file_attrs(module, changed, msg)
+    module.exit_json(changed=changed, msg=msg,
+                     blocks=[e[4]['marker'] for e in edits])
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -197,8 +458,10 @@ def main():
             create=dict(default=False, type='bool'),
             backup=dict(default=False, type='bool'),
             validate=dict(default=None, type='str'),
+            blocks=dict(default=None, type='list'),
         ),
-        mutually_exclusive=[['insertbefore', 'insertafter']],
+        mutually_exclusive=[['insertbefore', 'insertafter'],
+                            ['block', 'blocks']],
         add_file_common_args=True,
         supports_check_mode=True
     )
@@ -212,6 +475,9 @@ def main():
         module.fail_json(rc=256,
                          msg='Destination %s is a directory !' % dest)
 
+    if params['blocks'] is not None:
+        manage_blocks(module, dest)
+
     if not os.path.exists(dest):
         if not module.boolean(params['create']):
             module.fail_json(rc=257,
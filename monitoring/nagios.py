@@ -38,6 +38,9 @@ options:
   host:
     description:
       - Host to operate on in Nagios.
+      - Since 2.2 this may also be a list of hosts (or a comma separated
+        string), in which case the action is applied to every host and all
+        resulting commands are sent to the command file in one batch.
     required: false
     default: null
   cmdfile:
@@ -124,6 +127,10 @@ EXAMPLES = '''
 # unsilence all alerts
 - nagios: action=unsilence host={{ inventory_hostname }}
 
+# put the same services on a whole batch of hosts into downtime
+- nagios: action=downtime minutes=20 service=httpd,nfs
+          host={{ groups['webservers'] | join(',') }}
+
 # SHUT UP NAGIOS
 - nagios: action=silence_nagios
 
@@ -137,7 +144,13 @@ EXAMPLES = '''
 import ConfigParser
 import types
 import time
+import os
 import os.path
+import select
+
+# Writes to a FIFO of at most PIPE_BUF bytes are atomic, so commands are
+# grouped into chunks no larger than this. POSIX guarantees at least 512.
+PIPE_BUF = getattr(select, 'PIPE_BUF', 512)
 
 ######################################################################
 
@@ -198,7 +211,7 @@ def main():
             action=dict(required=True, default=None, choices=ACTION_CHOICES),
             author=dict(default='Ansible'),
             comment=dict(default='Scheduling downtime'),
-            host=dict(required=False, default=None),
+            host=dict(required=False, default=None, type='list'),
             servicegroup=dict(required=False, default=None),
             minutes=dict(default=30),
             cmdfile=dict(default=which_cmdfile()),
@@ -298,7 +311,7 @@ class Nagios(object):
         self.action = kwargs['action']
         self.author = kwargs['author']
         self.comment = kwargs['comment']
-        self.host = kwargs['host']
+        self.hosts = kwargs['host'] or []
         self.servicegroup = kwargs['servicegroup']
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
@@ -310,6 +323,7 @@ class Nagios(object):
             self.services = kwargs['services'].split(',')
 
         self.command_results = []
+        self._batch = None
 
     def _now(self):
         """
@@ -321,18 +335,79 @@ class Nagios(object):
     def _write_command(self, cmd):
         """
         Write the given command to the Nagios command file
+
+        While a batch is open (see `_begin_batch`) the command is only
+        queued and gets written by `_flush_batch`.
+        """
+
+        if self._batch is not None:
+            self._batch.append(cmd)
+            return True
+
+        self._write_commands([cmd])
+        return True
+
+    def _begin_batch(self):
+        """
+        Start queueing commands instead of writing them one at a time
+        """
+
+        if self._batch is None:
+            self._batch = []
+
+    def _flush_batch(self):
+        """
+        Write all queued commands and stop queueing
+        """
+
+        cmds = self._batch
+        self._batch = None
+        if cmds:
+            self._write_commands(cmds)
+
+    def _chunk_commands(self, cmds):
+        """
+        Group whole commands into chunks of at most PIPE_BUF bytes so that
+        each write to the FIFO is atomic. A single command larger than
+        PIPE_BUF gets a chunk of its own.
+        """
+
+        chunks = []
+        current = []
+        size = 0
+        for cmd in cmds:
+            if current and size + len(cmd) > PIPE_BUF:
+                chunks.append(''.join(current))
+                current = []
+                size = 0
+            current.append(cmd)
+            size += len(cmd)
+        if current:
+            chunks.append(''.join(current))
+        return chunks
+
+    def _write_commands(self, cmds):
+        """
+        Write the given commands to the Nagios command file, opening it
+        only once
         """
 
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            fd = os.open(self.cmdfile, os.O_WRONLY | os.O_APPEND)
+            try:
+                for chunk in self._chunk_commands(cmds):
+                    while chunk:
+                        written = os.write(fd, chunk)
+                        chunk = chunk[written:]
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
 
+        for cmd in cmds:
+            self.command_results.append(cmd.strip())
+
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment=None, start=None,
                     svc=None, fixed=1, trigger=0):
@@ -876,53 +951,67 @@ class Nagios(object):
         cmdstr = '%s %s%s' % (pre, cmd, post)
         self._write_command(cmdstr)
 
-    def act(self):
+    def act_on_host(self, host):
         """
-        Figure out what you want to do from ansible, and then do the
-        needful (at the earliest).
+        Perform the requested per-host action for a single host.
         """
         # host or service downtime?
         if self.action == 'downtime':
             if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
+                self.schedule_host_downtime(host, self.minutes)
             elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
+                self.schedule_host_svc_downtime(host, self.minutes)
             else:
-                self.schedule_svc_downtime(self.host,
+                self.schedule_svc_downtime(host,
                                            services=self.services,
                                            minutes=self.minutes)
-        elif self.action == "servicegroup_host_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
-        elif self.action == "servicegroup_service_downtime":
-            if self.servicegroup:
-                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            self.silence_host(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            self.unsilence_host(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
             if self.services == 'host':
-                self.enable_host_notifications(self.host)
+                self.enable_host_notifications(host)
             elif self.services == 'all':
-                self.enable_host_svc_notifications(self.host)
+                self.enable_host_svc_notifications(host)
             else:
-                self.enable_svc_notifications(self.host,
+                self.enable_svc_notifications(host,
                                               services=self.services)
 
         elif self.action == 'disable_alerts':
             if self.services == 'host':
-                self.disable_host_notifications(self.host)
+                self.disable_host_notifications(host)
             elif self.services == 'all':
-                self.disable_host_svc_notifications(self.host)
+                self.disable_host_svc_notifications(host)
             else:
-                self.disable_svc_notifications(self.host,
+                self.disable_svc_notifications(host,
                                                services=self.services)
+
+    def act(self):
+        """
+        Figure out what you want to do from ansible, and then do the
+        needful (at the earliest).
+        """
+        # everything generated by this action is written in one go
+        self._begin_batch()
+
+        if self.action in ['downtime', 'silence', 'unsilence',
+                           'enable_alerts', 'disable_alerts']:
+            for host in self.hosts:
+                self.act_on_host(host)
+
+        elif self.action == "servicegroup_host_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+        elif self.action == "servicegroup_service_downtime":
+            if self.servicegroup:
+                self.schedule_servicegroup_svc_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
+
         elif self.action == 'silence_nagios':
             self.silence_nagios()
 
@@ -937,6 +1026,8 @@ class Nagios(object):
             self.module.fail_json(msg="unknown action specified: '%s'" % \
                                       self.action)
 
+        self._flush_batch()
+
         self.module.exit_json(nagios_commands=self.command_results,
                               changed=True)
 
@@ -99,6 +99,43 @@ options:
         default: null
         choices: []
         aliases: []
+    fields:
+        description:
+            - List of attribute names to fetch for each object, such as
+              C(destination) or C(member). Only the matching attribute getters
+              are called, which avoids one iControl round trip per unwanted
+              attribute. By default every attribute is fetched. Not applicable
+              for the certificate, key and software fact categories.
+        required: false
+        default: null
+        version_added: "2.2"
+    workers:
+        description:
+            - Number of concurrent iControl sessions used to collect facts.
+              With more than one, the object lists of all included categories
+              and then all of their attribute getters are fetched in parallel,
+              each worker using its own session. Capped at 16.
+        required: false
+        default: 1
+        version_added: "2.2"
+    cache_dir:
+        description:
+            - Directory in which to cache collected facts, one file per
+              device and fact selection. Each file records the device's
+              configuration change marker (the C(Configsync.LocalConfigTime)
+              DB variable); when a later run finds the marker unchanged, the
+              cached facts are reused instead of being collected again.
+              Caching is disabled when not set.
+            - Only configuration attributes are cached. Status attributes
+              that change without a configuration change (object and member
+              status, media, failover and sync state, uptime, ...) are
+              fetched from the device on every run and merged into the
+              cached facts; the C(software) category is never cached. The
+              C(cached) result lists the categories whose configuration
+              attributes came from the cache.
+        required: false
+        default: null
+        version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -118,6 +155,25 @@ EXAMPLES = '''
       password=mysecret
       include=interface,vlan
 
+  - name: Collect selected virtual server and pool attributes in parallel
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=virtual_server,pool,node
+      fields=destination,default_pool_name,member,object_status
+      workers=8
+
+  - name: Collect BIG-IP facts, reusing the last result if the config is unchanged
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      include=virtual_server,pool
+      cache_dir=~/.ansible/bigip_facts
+
 '''
 
 try:
@@ -128,9 +184,16 @@ except ImportError:
 else:
     bigsuds_found = True
 
+import copy
 import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import threading
 import traceback
 import re
+import Queue
 
 # ===========================================
 # bigip_facts module specific support methods.
@@ -1373,6 +1436,12 @@ class SystemInfo(object):
         return self.api.System.SystemInfo.get_uptime()
 
 
+def project_fields(all_fields, fields):
+    """Restrict a category's attribute getters to the requested fields."""
+    if not fields:
+        return all_fields
+    return [field for field in all_fields if field in fields]
+
 def generate_dict(api_obj, fields):
     result_dict = {}
     lists = []
@@ -1386,10 +1455,15 @@ def generate_dict(api_obj, fields):
             else:
                 lists.append(api_response)
                 supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
-            temp = {}
-            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
-            result_dict[j] = temp
+        result_dict = assemble_dict(api_obj.get_list(), supported_fields, lists)
+    return result_dict
+
+def assemble_dict(names, supported_fields, lists):
+    result_dict = {}
+    for i, j in enumerate(names):
+        temp = {}
+        temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
+        result_dict[j] = temp
     return result_dict
 
 def generate_simple_dict(api_obj, fields):
@@ -1403,137 +1477,150 @@ def generate_simple_dict(api_obj, fields):
             result_dict[field] = api_response
     return result_dict
 
-def generate_interface_dict(f5, regex):
+INTERFACE_FIELDS = ['active_media', 'actual_flow_control', 'bundle_state',
+                    'description', 'dual_media_state', 'enabled_state', 'if_index',
+                    'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
+                    'mac_address', 'media', 'media_option', 'media_option_sfp',
+                    'media_sfp', 'media_speed', 'media_status', 'mtu',
+                    'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
+                    'sflow_poll_interval', 'sflow_poll_interval_global',
+                    'sfp_media_state', 'stp_active_edge_port_state',
+                    'stp_enabled_state', 'stp_link_type',
+                    'stp_protocol_detection_reset_state']
+
+def generate_interface_dict(f5, regex, fields=None):
     interfaces = Interfaces(f5.get_api(), regex)
-    fields = ['active_media', 'actual_flow_control', 'bundle_state',
-              'description', 'dual_media_state', 'enabled_state', 'if_index',
-              'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
-              'mac_address', 'media', 'media_option', 'media_option_sfp',
-              'media_sfp', 'media_speed', 'media_status', 'mtu',
-              'phy_master_slave_mode', 'prefer_sfp_state', 'flow_control',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sfp_media_state', 'stp_active_edge_port_state',
-              'stp_enabled_state', 'stp_link_type',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
-
-def generate_self_ip_dict(f5, regex):
+    return generate_dict(interfaces, project_fields(INTERFACE_FIELDS, fields))
+
+SELF_IP_FIELDS = ['address', 'allow_access_list', 'description',
+                  'enforced_firewall_policy', 'floating_state', 'fw_rule',
+                  'netmask', 'staged_firewall_policy', 'traffic_group',
+                  'vlan', 'is_traffic_group_inherited']
+
+def generate_self_ip_dict(f5, regex, fields=None):
     self_ips = SelfIPs(f5.get_api(), regex)
-    fields = ['address', 'allow_access_list', 'description',
-              'enforced_firewall_policy', 'floating_state', 'fw_rule',
-              'netmask', 'staged_firewall_policy', 'traffic_group',
-              'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    return generate_dict(self_ips, project_fields(SELF_IP_FIELDS, fields))
 
-def generate_trunk_dict(f5, regex):
+TRUNK_FIELDS = ['active_lacp_state', 'configured_member_count', 'description',
+                'distribution_hash_option', 'interface', 'lacp_enabled_state',
+                'lacp_timeout_option', 'link_selection_policy', 'media_speed',
+                'media_status', 'operational_member_count', 'stp_enabled_state',
+                'stp_protocol_detection_reset_state']
+
+def generate_trunk_dict(f5, regex, fields=None):
     trunks = Trunks(f5.get_api(), regex)
-    fields = ['active_lacp_state', 'configured_member_count', 'description',
-              'distribution_hash_option', 'interface', 'lacp_enabled_state',
-              'lacp_timeout_option', 'link_selection_policy', 'media_speed',
-              'media_status', 'operational_member_count', 'stp_enabled_state',
-              'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
-
-def generate_vlan_dict(f5, regex):
+    return generate_dict(trunks, project_fields(TRUNK_FIELDS, fields))
+
+VLAN_FIELDS = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
+               'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
+               'failsafe_timeout', 'if_index', 'learning_mode',
+               'mac_masquerade_address', 'member', 'mtu',
+               'sflow_poll_interval', 'sflow_poll_interval_global',
+               'sflow_sampling_rate', 'sflow_sampling_rate_global',
+               'source_check_state', 'true_mac_address', 'vlan_id']
+
+def generate_vlan_dict(f5, regex, fields=None):
     vlans = Vlans(f5.get_api(), regex)
-    fields = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
-              'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
-              'failsafe_timeout', 'if_index', 'learning_mode',
-              'mac_masquerade_address', 'member', 'mtu',
-              'sflow_poll_interval', 'sflow_poll_interval_global',
-              'sflow_sampling_rate', 'sflow_sampling_rate_global',
-              'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
-
-def generate_vs_dict(f5, regex):
+    return generate_dict(vlans, project_fields(VLAN_FIELDS, fields))
+
+VIRTUAL_SERVER_FIELDS = ['actual_hardware_acceleration', 'authentication_profile',
+                         'auto_lasthop', 'bw_controller_policy', 'clone_pool',
+                         'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
+                         'default_pool_name', 'description', 'destination',
+                         'enabled_state', 'enforced_firewall_policy',
+                         'fallback_persistence_profile', 'fw_rule', 'gtm_score',
+                         'last_hop_pool', 'nat64_state', 'object_status',
+                         'persistence_profile', 'profile', 'protocol',
+                         'rate_class', 'rate_limit', 'rate_limit_destination_mask',
+                         'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
+                         'rule', 'security_log_profile', 'snat_pool', 'snat_type',
+                         'source_address', 'source_address_translation_lsn_pool',
+                         'source_address_translation_snat_pool',
+                         'source_address_translation_type', 'source_port_behavior',
+                         'staged_firewall_policy', 'translate_address_state',
+                         'translate_port_state', 'type', 'vlan', 'wildmask']
+
+def generate_vs_dict(f5, regex, fields=None):
     virtual_servers = VirtualServers(f5.get_api(), regex)
-    fields = ['actual_hardware_acceleration', 'authentication_profile',
-              'auto_lasthop', 'bw_controller_policy', 'clone_pool',
-              'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
-              'default_pool_name', 'description', 'destination',
-              'enabled_state', 'enforced_firewall_policy',
-              'fallback_persistence_profile', 'fw_rule', 'gtm_score',
-              'last_hop_pool', 'nat64_state', 'object_status',
-              'persistence_profile', 'profile', 'protocol',
-              'rate_class', 'rate_limit', 'rate_limit_destination_mask',
-              'rate_limit_mode', 'rate_limit_source_mask', 'related_rule',
-              'rule', 'security_log_profile', 'snat_pool', 'snat_type',
-              'source_address', 'source_address_translation_lsn_pool',
-              'source_address_translation_snat_pool',
-              'source_address_translation_type', 'source_port_behavior',
-              'staged_firewall_policy', 'translate_address_state',
-              'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
-
-def generate_pool_dict(f5, regex):
+    return generate_dict(virtual_servers, project_fields(VIRTUAL_SERVER_FIELDS, fields))
+
+POOL_FIELDS = ['action_on_service_down', 'active_member_count',
+               'aggregate_dynamic_ratio', 'allow_nat_state',
+               'allow_snat_state', 'client_ip_tos', 'client_link_qos',
+               'description', 'gateway_failsafe_device',
+               'ignore_persisted_weight_state', 'lb_method', 'member',
+               'minimum_active_member', 'minimum_up_member',
+               'minimum_up_member_action', 'minimum_up_member_enabled_state',
+               'monitor_association', 'monitor_instance', 'object_status',
+               'profile', 'queue_depth_limit',
+               'queue_on_connection_limit_state', 'queue_time_limit',
+               'reselect_tries', 'server_ip_tos', 'server_link_qos',
+               'simple_timeout', 'slow_ramp_time']
+
+def generate_pool_dict(f5, regex, fields=None):
     pools = Pools(f5.get_api(), regex)
-    fields = ['action_on_service_down', 'active_member_count',
-              'aggregate_dynamic_ratio', 'allow_nat_state',
-              'allow_snat_state', 'client_ip_tos', 'client_link_qos',
-              'description', 'gateway_failsafe_device',
-              'ignore_persisted_weight_state', 'lb_method', 'member',
-              'minimum_active_member', 'minimum_up_member',
-              'minimum_up_member_action', 'minimum_up_member_enabled_state',
-              'monitor_association', 'monitor_instance', 'object_status',
-              'profile', 'queue_depth_limit',
-              'queue_on_connection_limit_state', 'queue_time_limit',
-              'reselect_tries', 'server_ip_tos', 'server_link_qos',
-              'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
-
-def generate_device_dict(f5, regex):
+    return generate_dict(pools, project_fields(POOL_FIELDS, fields))
+
+DEVICE_FIELDS = ['active_modules', 'base_mac_address', 'blade_addresses',
+                 'build', 'chassis_id', 'chassis_type', 'comment',
+                 'configsync_address', 'contact', 'description', 'edition',
+                 'failover_state', 'hostname', 'inactive_modules', 'location',
+                 'management_address', 'marketing_name', 'multicast_address',
+                 'optional_modules', 'platform_id', 'primary_mirror_address',
+                 'product', 'secondary_mirror_address', 'software_version',
+                 'timelimited_modules', 'timezone', 'unicast_addresses']
+
+def generate_device_dict(f5, regex, fields=None):
     devices = Devices(f5.get_api(), regex)
-    fields = ['active_modules', 'base_mac_address', 'blade_addresses',
-              'build', 'chassis_id', 'chassis_type', 'comment',
-              'configsync_address', 'contact', 'description', 'edition',
-              'failover_state', 'hostname', 'inactive_modules', 'location',
-              'management_address', 'marketing_name', 'multicast_address',
-              'optional_modules', 'platform_id', 'primary_mirror_address',
-              'product', 'secondary_mirror_address', 'software_version',
-              'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
-
-def generate_device_group_dict(f5, regex):
+    return generate_dict(devices, project_fields(DEVICE_FIELDS, fields))
+
+DEVICE_GROUP_FIELDS = ['all_preferred_active', 'autosync_enabled_state','description',
+                       'device', 'full_load_on_sync_state',
+                       'incremental_config_sync_size_maximum',
+                       'network_failover_enabled_state', 'sync_status', 'type']
+
+def generate_device_group_dict(f5, regex, fields=None):
     device_groups = DeviceGroups(f5.get_api(), regex)
-    fields = ['all_preferred_active', 'autosync_enabled_state','description',
-              'device', 'full_load_on_sync_state',
-              'incremental_config_sync_size_maximum',
-              'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    return generate_dict(device_groups, project_fields(DEVICE_GROUP_FIELDS, fields))
+
+TRAFFIC_GROUP_FIELDS = ['auto_failback_enabled_state', 'auto_failback_time',
+                        'default_device', 'description', 'ha_load_factor',
+                        'ha_order', 'is_floating', 'mac_masquerade_address',
+                        'unit_id']
 
-def generate_traffic_group_dict(f5, regex):
+def generate_traffic_group_dict(f5, regex, fields=None):
     traffic_groups = TrafficGroups(f5.get_api(), regex)
-    fields = ['auto_failback_enabled_state', 'auto_failback_time',
-              'default_device', 'description', 'ha_load_factor',
-              'ha_order', 'is_floating', 'mac_masquerade_address',
-              'unit_id']
-    return generate_dict(traffic_groups, fields)
+    return generate_dict(traffic_groups, project_fields(TRAFFIC_GROUP_FIELDS, fields))
+
+RULE_FIELDS = ['definition', 'description', 'ignore_vertification',
+               'verification_status']
 
-def generate_rule_dict(f5, regex):
+def generate_rule_dict(f5, regex, fields=None):
     rules = Rules(f5.get_api(), regex)
-    fields = ['definition', 'description', 'ignore_vertification',
-              'verification_status']
-    return generate_dict(rules, fields)
+    return generate_dict(rules, project_fields(RULE_FIELDS, fields))
 
-def generate_node_dict(f5, regex):
+NODE_FIELDS = ['address', 'connection_limit', 'description', 'dynamic_ratio',
+               'monitor_instance', 'monitor_rule', 'monitor_status',
+               'object_status', 'rate_limit', 'ratio', 'session_status']
+
+def generate_node_dict(f5, regex, fields=None):
     nodes = Nodes(f5.get_api(), regex)
-    fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
-              'monitor_instance', 'monitor_rule', 'monitor_status',
-              'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    return generate_dict(nodes, project_fields(NODE_FIELDS, fields))
+
+VIRTUAL_ADDRESS_FIELDS = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
+                          'description', 'enabled_state', 'icmp_echo_state',
+                          'is_floating_state', 'netmask', 'object_status',
+                          'route_advertisement_state', 'traffic_group']
 
-def generate_virtual_address_dict(f5, regex):
+def generate_virtual_address_dict(f5, regex, fields=None):
     virtual_addresses = VirtualAddresses(f5.get_api(), regex)
-    fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
-              'description', 'enabled_state', 'icmp_echo_state',
-              'is_floating_state', 'netmask', 'object_status',
-              'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    return generate_dict(virtual_addresses, project_fields(VIRTUAL_ADDRESS_FIELDS, fields))
 
-def generate_address_class_dict(f5, regex):
+ADDRESS_CLASS_FIELDS = ['address_class', 'description']
+
+def generate_address_class_dict(f5, regex, fields=None):
     address_classes = AddressClasses(f5.get_api(), regex)
-    fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    return generate_dict(address_classes, project_fields(ADDRESS_CLASS_FIELDS, fields))
 
 def generate_certificate_dict(f5, regex):
     certificates = Certificates(f5.get_api(), regex)
@@ -1543,40 +1630,42 @@ def generate_key_dict(f5, regex):
     keys = Keys(f5.get_api(), regex)
     return dict(zip(keys.get_list(), keys.get_key_list()))
 
-def generate_client_ssl_profile_dict(f5, regex):
+CLIENT_SSL_PROFILE_FIELDS = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
+                             'authenticate_once_state', 'ca_file', 'cache_size',
+                             'cache_timeout', 'certificate_file', 'chain_file',
+                             'cipher_list', 'client_certificate_ca_file', 'crl_file',
+                             'default_profile', 'description',
+                             'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
+                             'forward_proxy_ca_passphrase',
+                             'forward_proxy_certificate_extension_include',
+                             'forward_proxy_certificate_lifespan',
+                             'forward_proxy_enabled_state',
+                             'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
+                             'key_file', 'modssl_emulation_state', 'passphrase',
+                             'peer_certification_mode', 'profile_mode',
+                             'renegotiation_maximum_record_delay', 'renegotiation_period',
+                             'renegotiation_state', 'renegotiation_throughput',
+                             'retain_certificate_state', 'secure_renegotiation_mode',
+                             'server_name', 'session_ticket_state', 'sni_default_state',
+                             'sni_require_state', 'ssl_option', 'strict_resume_state',
+                             'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
+
+def generate_client_ssl_profile_dict(f5, regex, fields=None):
     profiles = ProfileClientSSL(f5.get_api(), regex)
-    fields = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
-              'authenticate_once_state', 'ca_file', 'cache_size',
-              'cache_timeout', 'certificate_file', 'chain_file',
-              'cipher_list', 'client_certificate_ca_file', 'crl_file',
-              'default_profile', 'description',
-              'forward_proxy_ca_certificate_file', 'forward_proxy_ca_key_file',
-              'forward_proxy_ca_passphrase',
-              'forward_proxy_certificate_extension_include',
-              'forward_proxy_certificate_lifespan',
-              'forward_proxy_enabled_state',
-              'forward_proxy_lookup_by_ipaddr_port_state', 'handshake_timeout',
-              'key_file', 'modssl_emulation_state', 'passphrase',
-              'peer_certification_mode', 'profile_mode',
-              'renegotiation_maximum_record_delay', 'renegotiation_period',
-              'renegotiation_state', 'renegotiation_throughput',
-              'retain_certificate_state', 'secure_renegotiation_mode',
-              'server_name', 'session_ticket_state', 'sni_default_state',
-              'sni_require_state', 'ssl_option', 'strict_resume_state',
-              'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
-
-def generate_system_info_dict(f5):
+    return generate_dict(profiles, project_fields(CLIENT_SSL_PROFILE_FIELDS, fields))
+
+SYSTEM_INFO_FIELDS = ['base_mac_address',
+                      'blade_temperature', 'chassis_slot_information',
+                      'globally_unique_identifier', 'group_id',
+                      'hardware_information',
+                      'marketing_name',
+                      'product_information', 'pva_version', 'system_id',
+                      'system_information', 'time',
+                      'time_zone', 'uptime']
+
+def generate_system_info_dict(f5, fields=None):
     system_info = SystemInfo(f5.get_api())
-    fields = ['base_mac_address',
-              'blade_temperature', 'chassis_slot_information',
-              'globally_unique_identifier', 'group_id',
-              'hardware_information',
-              'marketing_name',
-              'product_information', 'pva_version', 'system_id',
-              'system_information', 'time',
-              'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    return generate_simple_dict(system_info, project_fields(SYSTEM_INFO_FIELDS, fields))
 
 def generate_software_list(f5):
     software = Software(f5.get_api())
@@ -1584,6 +1673,345 @@ def generate_software_list(f5):
     return software_list
 
 
+# Categories built by generate_dict: list class and attribute getters
+LIST_FACTS = dict(
+    interface=(Interfaces, INTERFACE_FIELDS),
+    self_ip=(SelfIPs, SELF_IP_FIELDS),
+    trunk=(Trunks, TRUNK_FIELDS),
+    vlan=(Vlans, VLAN_FIELDS),
+    virtual_server=(VirtualServers, VIRTUAL_SERVER_FIELDS),
+    pool=(Pools, POOL_FIELDS),
+    device=(Devices, DEVICE_FIELDS),
+    device_group=(DeviceGroups, DEVICE_GROUP_FIELDS),
+    traffic_group=(TrafficGroups, TRAFFIC_GROUP_FIELDS),
+    rule=(Rules, RULE_FIELDS),
+    node=(Nodes, NODE_FIELDS),
+    virtual_address=(VirtualAddresses, VIRTUAL_ADDRESS_FIELDS),
+    address_class=(AddressClasses, ADDRESS_CLASS_FIELDS),
+    client_ssl_profile=(ProfileClientSSL, CLIENT_SSL_PROFILE_FIELDS),
+)
+
+UNSUPPORTED = object()
+
+# Upper bound on concurrent iControl sessions opened by one task
+MAX_WORKERS = 16
+
+# DB variable used to detect configuration changes for the facts cache
+CONFIG_MARKER_VARIABLE = 'Configsync.LocalConfigTime'
+
+# Attributes with operational state that changes without a configuration
+# change; they are left out of the facts cache and fetched on every run
+OPERATIONAL_FIELDS = dict(
+    interface=['active_media', 'actual_flow_control', 'media_status'],
+    trunk=['active_lacp_state', 'media_speed', 'media_status', 'operational_member_count'],
+    virtual_server=['actual_hardware_acceleration', 'object_status'],
+    pool=['active_member_count', 'monitor_instance', 'object_status'],
+    device=['failover_state'],
+    device_group=['sync_status'],
+    node=['monitor_instance', 'monitor_status', 'object_status', 'session_status'],
+    virtual_address=['object_status'],
+    system_info=['blade_temperature', 'time', 'uptime'],
+)
+
+# Categories that are operational as a whole and never cached
+UNCACHED_INCLUDES = ('software',)
+
+
+class SessionPool(object):
+    """Bounded pool of worker threads for iControl calls.
+
+    Every worker opens its own F5 connection with its own session, so the
+    active folder and recursive query state set by one worker do not
+    affect the others, and no bigsuds client is shared between threads.
+
+    Attributes:
+        tasks: Queue of (key, function, result queue) items.
+        workers: The worker threads.
+    """
+
+    def __init__(self, connect, size):
+        self.tasks = Queue.Queue()
+        self.workers = []
+        for i in range(size):
+            worker = threading.Thread(target=self._work, args=(connect,))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def _work(self, connect):
+        f5 = None
+        error = None
+        try:
+            f5 = connect()
+        except Exception, e:
+            error = (e, traceback.format_exc())
+        while True:
+            item = self.tasks.get()
+            if item is None:
+                break
+            key, func, results = item
+            if f5 is None:
+                results.put((key, None, error))
+                continue
+            try:
+                results.put((key, func(f5), None))
+            except Exception, e:
+                results.put((key, None, (e, traceback.format_exc())))
+
+    def map(self, tasks):
+        """Run (key, function) tasks; each function receives the worker's
+        F5 object. Returns {key: result}, or raises the first failure."""
+        results = Queue.Queue()
+        for key, func in tasks:
+            self.tasks.put((key, func, results))
+        collected = {}
+        failure = None
+        for i in range(len(tasks)):
+            key, value, error = results.get()
+            if error is not None and failure is None:
+                failure = error
+            collected[key] = value
+        if failure is not None:
+            raise FactCollectionError(*failure)
+        return collected
+
+    def close(self):
+        for worker in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+
+
+class FactCollectionError(Exception):
+    """A worker task failed; keeps the worker's traceback."""
+
+    def __init__(self, error, trace):
+        Exception.__init__(self, str(error))
+        self.trace = trace
+
+
+def connect_worker(server, user, password, validate_certs, server_port):
+    f5 = F5(server, user, password, True, validate_certs, server_port)
+    f5.set_active_folder("/")
+    f5.enable_recursive_query_state()
+    return f5
+
+def fetch_field(api_obj, field):
+    """Task calling one attribute getter of api_obj with the worker's API.
+
+    Unsupported getters return the UNSUPPORTED marker instead of failing."""
+    def task(f5):
+        obj = copy.copy(api_obj)
+        obj.api = f5.get_api()
+        try:
+            return getattr(obj, "get_" + field)()
+        except (MethodNotFound, WebFault):
+            return UNSUPPORTED
+    return task
+
+def select_fields(name, fields, field_map=None):
+    """Fields to fetch for a category: its entry in field_map, if any,
+    otherwise the module-wide fields projection."""
+    if field_map and name in field_map:
+        return field_map[name]
+    return fields
+
+def collect_facts_concurrently(pool, include, regex, fields, field_map=None):
+    """Collect the included categories on the session pool.
+
+    All category lists are fetched concurrently first, then every
+    attribute getter of every category is run concurrently.
+    """
+    tasks = []
+    for name in include:
+        if name in LIST_FACTS:
+            cls = LIST_FACTS[name][0]
+            tasks.append((name, lambda f5, cls=cls: cls(f5.get_api(), regex)))
+        elif name == 'system_info':
+            tasks.append((name, lambda f5: SystemInfo(f5.get_api())))
+        elif name == 'certificate':
+            tasks.append((name, lambda f5: generate_certificate_dict(f5, regex)))
+        elif name == 'key':
+            tasks.append((name, lambda f5: generate_key_dict(f5, regex)))
+        elif name == 'software':
+            tasks.append((name, lambda f5: generate_software_list(f5)))
+    objects = pool.map(tasks)
+
+    facts = {}
+    tasks = []
+    for name, obj in objects.items():
+        if name in LIST_FACTS:
+            if not obj.get_list():
+                facts[name] = {}
+                continue
+            category_fields = project_fields(LIST_FACTS[name][1], select_fields(name, fields, field_map))
+        elif name == 'system_info':
+            category_fields = project_fields(SYSTEM_INFO_FIELDS, select_fields(name, fields, field_map))
+        else:
+            facts[name] = obj
+            continue
+        for field in category_fields:
+            tasks.append(((name, field), fetch_field(obj, field)))
+    responses = pool.map(tasks)
+
+    for name, obj in objects.items():
+        if name in facts:
+            continue
+        supported_fields = []
+        lists = []
+        for (category, field), response in responses.items():
+            if category == name and response is not UNSUPPORTED:
+                supported_fields.append(field)
+                lists.append(response)
+        if name == 'system_info':
+            facts[name] = dict(zip(supported_fields, lists))
+        else:
+            facts[name] = assemble_dict(obj.get_list(), supported_fields, lists)
+    return facts
+
+def collect_facts(f5, include, regex, fields, field_map=None):
+    """Collect the included categories one after the other on f5."""
+    facts = {}
+    saved_active_folder = f5.get_active_folder()
+    saved_recursive_query_state = f5.get_recursive_query_state()
+    if saved_active_folder != "/":
+        f5.set_active_folder("/")
+    if saved_recursive_query_state != "STATE_ENABLED":
+        f5.enable_recursive_query_state()
+
+    if 'interface' in include:
+        facts['interface'] = generate_interface_dict(f5, regex, select_fields('interface', fields, field_map))
+    if 'self_ip' in include:
+        facts['self_ip'] = generate_self_ip_dict(f5, regex, select_fields('self_ip', fields, field_map))
+    if 'trunk' in include:
+        facts['trunk'] = generate_trunk_dict(f5, regex, select_fields('trunk', fields, field_map))
+    if 'vlan' in include:
+        facts['vlan'] = generate_vlan_dict(f5, regex, select_fields('vlan', fields, field_map))
+    if 'virtual_server' in include:
+        facts['virtual_server'] = generate_vs_dict(f5, regex, select_fields('virtual_server', fields, field_map))
+    if 'pool' in include:
+        facts['pool'] = generate_pool_dict(f5, regex, select_fields('pool', fields, field_map))
+    if 'device' in include:
+        facts['device'] = generate_device_dict(f5, regex, select_fields('device', fields, field_map))
+    if 'device_group' in include:
+        facts['device_group'] = generate_device_group_dict(f5, regex, select_fields('device_group', fields, field_map))
+    if 'traffic_group' in include:
+        facts['traffic_group'] = generate_traffic_group_dict(f5, regex, select_fields('traffic_group', fields, field_map))
+    if 'rule' in include:
+        facts['rule'] = generate_rule_dict(f5, regex, select_fields('rule', fields, field_map))
+    if 'node' in include:
+        facts['node'] = generate_node_dict(f5, regex, select_fields('node', fields, field_map))
+    if 'virtual_address' in include:
+        facts['virtual_address'] = generate_virtual_address_dict(f5, regex, select_fields('virtual_address', fields, field_map))
+    if 'address_class' in include:
+        facts['address_class'] = generate_address_class_dict(f5, regex, select_fields('address_class', fields, field_map))
+    if 'software' in include:
+        facts['software'] = generate_software_list(f5)
+    if 'certificate' in include:
+        facts['certificate'] = generate_certificate_dict(f5, regex)
+    if 'key' in include:
+        facts['key'] = generate_key_dict(f5, regex)
+    if 'client_ssl_profile' in include:
+        facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex, select_fields('client_ssl_profile', fields, field_map))
+    if 'system_info' in include:
+        facts['system_info'] = generate_system_info_dict(f5, select_fields('system_info', fields, field_map))
+
+    # restore saved state
+    if saved_active_folder and saved_active_folder != "/":
+        f5.set_active_folder(saved_active_folder)
+    if saved_recursive_query_state and \
+       saved_recursive_query_state != "STATE_ENABLED":
+        f5.set_recursive_query_state(saved_recursive_query_state)
+    return facts
+
+def get_config_marker(f5):
+    """Return the device's configuration change marker, or None.
+
+    The local config time DB variable changes whenever the running
+    configuration is modified or loaded, and is read with a single call.
+    """
+    try:
+        response = f5.get_api().Management.DBVariable.query([CONFIG_MARKER_VARIABLE])
+    except (MethodNotFound, WebFault):
+        return None
+    if not response:
+        return None
+    return response[0]['value']
+
+def facts_cache_path(cache_dir, server, server_port, include, fact_filter, fields):
+    """Cache file for one device, folder and fact selection."""
+    key = json.dumps([server, server_port, "/", sorted(include), fact_filter, sorted(fields or [])])
+    return os.path.join(cache_dir, 'bigip_facts-%s-%s.json' % (server, hashlib.sha1(key).hexdigest()))
+
+def read_facts_cache(path, marker):
+    """Cached facts if the file exists and was stored for marker."""
+    if marker is None or not os.path.exists(path):
+        return None
+    try:
+        f = open(path)
+        try:
+            data = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return None
+    if data.get('marker') != marker:
+        return None
+    return data.get('facts')
+
+def write_facts_cache(module, path, marker, facts):
+    # Facts may include key passphrases, so keep the file private
+    cache_dir = os.path.dirname(path)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, 0700)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+    f = os.fdopen(fd, 'w')
+    try:
+        json.dump({'marker': marker, 'facts': facts}, f, default=str)
+    finally:
+        f.close()
+    os.chmod(tmp_path, 0600)
+    module.atomic_move(tmp_path, path)
+
+def live_fields(name, fields):
+    """Operational fields of a category that the fields option selects."""
+    return [field for field in OPERATIONAL_FIELDS.get(name, [])
+            if not fields or field in fields]
+
+def split_cacheable(facts):
+    """The configuration part of facts, without operational fields."""
+    cacheable = {}
+    for name, value in facts.items():
+        if name in UNCACHED_INCLUDES:
+            continue
+        operational = OPERATIONAL_FIELDS.get(name, [])
+        if name == 'system_info':
+            value = dict([(k, v) for k, v in value.items() if k not in operational])
+        elif operational:
+            value = dict([(key, dict([(k, v) for k, v in attrs.items() if k not in operational]))
+                          for key, attrs in value.items()])
+        cacheable[name] = value
+    return cacheable
+
+def merge_live_facts(cached, live):
+    """Overlay freshly collected operational fields on cached facts.
+
+    Returns None when a category's objects differ from the cached ones,
+    in which case the cache cannot be used.
+    """
+    for name, value in live.items():
+        if name in UNCACHED_INCLUDES or name not in cached:
+            cached[name] = value
+        elif name == 'system_info':
+            cached[name].update(value)
+        elif set(value.keys()) != set(cached[name].keys()):
+            return None
+        else:
+            for key, attrs in value.items():
+                cached[name][key].update(attrs)
+    return cached
+
+
 def main():
     module = AnsibleModule(
         argument_spec = dict(
@@ -1592,8 +2020,12 @@ def main():
             password = dict(type='str', required=True),
             validate_certs = dict(default='yes', type='bool'),
             session = dict(type='bool', default=False),
+            server_port = dict(type='int', default=443),
             include = dict(type='list', required=True),
             filter = dict(type='str', required=False),
+            fields = dict(type='list', required=False),
+            workers = dict(type='int', default=1),
+            cache_dir = dict(type='path', required=False),
         )
     )
 
@@ -1607,6 +2039,9 @@ def main():
     validate_certs = module.params['validate_certs']
     session = module.params['session']
     fact_filter = module.params['filter']
+    fields = module.params['fields']
+    workers = module.params['workers']
+    cache_dir = module.params['cache_dir']
 
     if validate_certs:
         import ssl
@@ -1627,64 +2062,52 @@ def main():
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
 
-    try:
-        facts = {}
+    if workers < 1:
+        module.fail_json(msg="workers must be at least 1")
 
-        if len(include) > 0:
+    try:
+        def collect(names, field_map=None):
+            if len(names) == 0:
+                return {}
+            if workers > 1:
+                pool = SessionPool(lambda: connect_worker(server, user, password, validate_certs, server_port),
+                                   min(workers, MAX_WORKERS))
+                try:
+                    return collect_facts_concurrently(pool, names, regex, fields, field_map)
+                finally:
+                    pool.close()
             f5 = F5(server, user, password, session, validate_certs, server_port)
-            saved_active_folder = f5.get_active_folder()
-            saved_recursive_query_state = f5.get_recursive_query_state()
-            if saved_active_folder != "/":
-                f5.set_active_folder("/")
-            if saved_recursive_query_state != "STATE_ENABLED":
-                f5.enable_recursive_query_state()
-
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
-
-            # restore saved state
-            if saved_active_folder and saved_active_folder != "/":
-                f5.set_active_folder(saved_active_folder)
-            if saved_recursive_query_state and \
-               saved_recursive_query_state != "STATE_ENABLED":
-                f5.set_recursive_query_state(saved_recursive_query_state)
-
-        result = {'ansible_facts': facts}
-
+            return collect_facts(f5, names, regex, fields, field_map)
+
+        facts = None
+        cached = []
+        marker = None
+        cacheable = [name for name in include if name not in UNCACHED_INCLUDES]
+
+        if len(cacheable) > 0 and cache_dir:
+            cache_path = facts_cache_path(cache_dir, server, server_port, cacheable, fact_filter, fields)
+            marker = get_config_marker(F5(server, user, password, False, validate_certs, server_port))
+            cached_facts = read_facts_cache(cache_path, marker)
+            if cached_facts is not None:
+                # Configuration attributes come from the cache; only the
+                # operational ones are fetched, categories without any
+                # cost no calls at all
+                field_map = dict([(name, live_fields(name, fields)) for name in cacheable])
+                live = [name for name in include
+                        if name in UNCACHED_INCLUDES or field_map.get(name)]
+                facts = merge_live_facts(cached_facts, collect(live, field_map))
+                if facts is not None:
+                    cached = [name for name in include if name in cacheable]
+
+        if facts is None:
+            facts = collect(include)
+            if cache_dir and marker is not None:
+                write_facts_cache(module, cache_path, marker, split_cacheable(facts))
+
+        result = {'ansible_facts': facts, 'cached': cached}
+
+    except FactCollectionError, e:
+        module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, e.trace))
     except Exception, e:
         module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
 
@@ -70,18 +70,22 @@ options:
     description:
       - Wait until the server reports a status of 'UP' when `state=enabled`, or
         status of 'MAINT' when `state=disabled`.
+      - All matching backends are polled together, with a delay that starts at
+        half a second and doubles up to C(wait_interval).
     required: false
     default: false
     version_added: "2.0"
   wait_interval:
     description:
-      - Number of seconds to wait between retries.
+      - Maximum number of seconds to wait between retries.
     required: false
     default: 5
     version_added: "2.0"
   wait_retries:
     description:
       - Number of times to check for status after changing the state.
+        Together with C(wait_interval) this bounds the total waiting time
+        to C(wait_retries) * C(wait_interval) seconds.
     required: false
     default: 25
     version_added: "2.0"
@@ -137,9 +141,14 @@ from string import Template
 
 DEFAULT_SOCKET_LOCATION="/var/run/haproxy.sock"
 RECV_SIZE = 1024
+SOCKET_TIMEOUT = 30
+PROMPT = '> '
+BATCH_SIZE = 8192
+STAT_TYPE_SERVER = 4
 ACTION_CHOICES = ['enabled', 'disabled']
 WAIT_RETRIES=25
 WAIT_INTERVAL=5
+WAIT_MIN_INTERVAL=0.5
 
 ######################################################################
 class TimeoutException(Exception):
@@ -171,27 +180,131 @@ class HAProxy(object):
         self.wait_retries = self.module.params['wait_retries']
         self.wait_interval = self.module.params['wait_interval']
         self.command_results = {}
+        self.client = None
+        self.stats_before = None
 
-    def execute(self, cmd, timeout=200, capture_output=True):
+    def connect(self):
         """
-        Executes a HAProxy command by sending a message to a HAProxy's local
-        UNIX socket and waiting up to 'timeout' milliseconds for the response.
+        Open the session used for all commands of this run. The socket is
+        switched to interactive 'prompt' mode so that it stays open between
+        commands; HAProxy versions without it close the connection, in which
+        case every command falls back to its own connection.
         """
         self.client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.client.connect(self.socket)
-        self.client.sendall('%s\n' % cmd)
+        self.client.settimeout(SOCKET_TIMEOUT)
+        try:
+            self.client.connect(self.socket)
+            self.client.sendall('prompt\n')
+            response = self.read_response()
+        except socket.error:
+            # e.g. the socket is gone while HAProxy reloads
+            e = get_exception()
+            self.client.close()
+            self.client = None
+            self.module.fail_json(msg="Failed to connect to HAProxy socket %s: %s" % (self.socket, str(e)))
+        if response is None:
+            self.client.close()
+            self.client = None
+
+
+    def close(self):
+        """
+        Leave interactive mode and close the session, if any.
+        """
+        if self.client is not None:
+            try:
+                self.client.sendall('quit\n')
+            except socket.error:
+                pass
+            self.client.close()
+            self.client = None
+
+
+    def read_response(self):
+        """
+        Read the output of one interactive command, up to the next prompt.
+        Returns None if the connection was closed instead.
+        """
         result = ''
-        buf = ''
-        buf = self.client.recv(RECV_SIZE)
-        while buf:
-            result += buf
+        while not (result == PROMPT or result.endswith('\n' + PROMPT)):
             buf = self.client.recv(RECV_SIZE)
+            if not buf:
+                return None
+            result += buf
+        return result[:-len(PROMPT)]
+
+
+    def execute_in_session(self, cmd):
+        """
+        Run one command in the persistent session. Returns None if the
+        session was closed by HAProxy.
+        """
+        try:
+            self.client.sendall('%s\n' % cmd)
+            return self.read_response()
+        except socket.error:
+            return None
+
+
+    def execute(self, cmd, timeout=200, capture_output=True):
+        """
+        Executes a HAProxy command by sending a message to a HAProxy's local
+        UNIX socket and waiting up to 'timeout' milliseconds for the response.
+        The persistent session is used when one is open.
+        """
+        result = None
+        if self.client is not None:
+            result = self.execute_in_session(cmd)
+            if result is None:
+                # HAProxy drops sessions idle for longer than its 'stats timeout',
+                # e.g. while waiting for a status; reconnect once and resend
+                self.client.close()
+                self.client = None
+                self.connect()
+                if self.client is not None:
+                    result = self.execute_in_session(cmd)
+                    if result is None:
+                        self.client.close()
+                        self.client = None
+                        self.module.fail_json(msg="HAProxy closed the socket while running '%s'" % cmd)
+        if result is None:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(self.socket)
+            except socket.error:
+                e = get_exception()
+                client.close()
+                self.module.fail_json(msg="Failed to connect to HAProxy socket %s: %s" % (self.socket, str(e)))
+            client.sendall('%s\n' % cmd)
+            result = ''
+            buf = ''
+            buf = client.recv(RECV_SIZE)
+            while buf:
+                result += buf
+                buf = client.recv(RECV_SIZE)
+            client.close()
         if capture_output:
             self.capture_command_output(cmd, result.strip())
-        self.client.close()
         return result
 
 
+    def execute_batch(self, cmds):
+        """
+        Run many commands with as few round trips as possible, by joining
+        them with ';' into lines of at most BATCH_SIZE characters.
+        """
+        line = ''
+        for cmd in cmds:
+            if line and len(line) + len(cmd) + 2 > BATCH_SIZE:
+                self.execute(line)
+                line = ''
+            if line:
+                line += '; '
+            line += cmd
+        if line:
+            self.execute(line)
+
+
     def capture_command_output(self, cmd, output):
         """
         Capture the output for a command
@@ -204,67 +317,110 @@ class HAProxy(object):
         self.command_results['output'].append(output)
 
 
-    def discover_all_backends(self):
+    def get_stats(self, iid=None, obj_type=None):
+        """
+        Take one 'show stat' snapshot, optionally filtered by proxy id and
+        object type. Returns the rows in HAProxy's order together with an
+        index of them by (pxname, svname).
+        """
+        cmd = 'show stat'
+        if iid is not None:
+            cmd += ' %s %s -1' % (iid, obj_type)
+        data = self.execute(cmd, 200, False).lstrip('# ')
+        rows = list(csv.DictReader(data.splitlines()))
+        index = {}
+        for row in rows:
+            index[(row['pxname'], row['svname'])] = row
+        return rows, index
+
+
+    def discover_all_backends(self, stats=None):
         """
         Discover all entries with svname = 'BACKEND' and return a list of their corresponding
         pxnames
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        return map(lambda d: d['pxname'], filter(lambda d: d['svname'] == 'BACKEND', r))
+        if stats is None:
+            stats = self.get_stats()
+        return [d['pxname'] for d in stats[0] if d['svname'] == 'BACKEND']
 
 
     def execute_for_backends(self, cmd, pxname, svname, wait_for_status = None):
         """
         Run some command on the specified backends. If no backends are provided they will
-        be discovered automatically (all backends)
+        be discovered automatically (all backends). The commands for all
+        backends are sent in batches and waited for together.
         """
+        stats = self.stats_before
+
         # Discover backends if none are given
         if pxname is None:
-            backends = self.discover_all_backends()
+            backends = self.discover_all_backends(stats)
         else:
             backends = [pxname]
 
-        # Run the command for each requested backend
+        cmds = []
         for backend in backends:
             # Fail when backends were not found
-            state = self.get_state_for(backend, svname)
-            if (self.fail_on_not_found or self.wait) and state is None:
+            if (self.fail_on_not_found or self.wait) and (backend, svname) not in stats[1]:
                 self.module.fail_json(msg="The specified backend '%s/%s' was not found!" % (backend, svname))
+            cmds.append(Template(cmd).substitute(pxname = backend, svname = svname))
 
-            self.execute(Template(cmd).substitute(pxname = backend, svname = svname))
-            if self.wait:
-                self.wait_until_status(backend, svname, wait_for_status)
+        self.execute_batch(cmds)
+        if self.wait:
+            self.wait_until_status(backends, svname, wait_for_status)
 
 
-    def get_state_for(self, pxname, svname):
+    def get_state_for(self, pxname, svname, stats=None):
         """
         Find the state of specific services. When pxname is not set, get all backends for a specific host.
         Returns a list of dictionaries containing the status and weight for those services.
+        An existing snapshot from get_stats can be passed in to avoid another 'show stat'.
         """
-        data = self.execute('show stat', 200, False).lstrip('# ')
-        r = csv.DictReader(data.splitlines())
-        state = map(lambda d: { 'status': d['status'], 'weight': d['weight'] }, filter(lambda d: (pxname is None or d['pxname'] == pxname) and d['svname'] == svname, r))
+        if stats is None:
+            stats = self.get_stats()
+        if pxname is not None:
+            rows = [stats[1].get((pxname, svname))]
+        else:
+            rows = [d for d in stats[0] if d['svname'] == svname]
+        state = [{ 'status': d['status'], 'weight': d['weight'] } for d in rows if d is not None]
         return state or None
 
 
-    def wait_until_status(self, pxname, svname, status):
+    def wait_until_status(self, pxnames, svname, status):
         """
-        Wait for a service to reach the specified status. Try RETRIES times
-        with INTERVAL seconds of sleep in between. If the service has not reached
-        the expected status in that time, the module will fail. If the service was 
-        not found, the module will fail.
+        Wait for services to reach the specified status. Polls a 'show stat'
+        limited to servers (and to a single proxy when possible) with a delay
+        growing from WAIT_MIN_INTERVAL up to INTERVAL seconds, for at most
+        RETRIES * INTERVAL seconds. If a service has not reached the expected
+        status in that time, the module will fail. If the service was not
+        found, the module will fail.
         """
-        for i in range(1, self.wait_retries):
-            state = self.get_state_for(pxname, svname)
-
-            # We can assume there will only be 1 element in state because both svname and pxname are always set when we get here
-            if state[0]['status'] == status:
+        pending = dict([(pxname, True) for pxname in pxnames])
+        iids = dict([(self.stats_before[1][(pxname, svname)]['iid'], True) for pxname in pxnames])
+        iid = -1
+        if len(iids) == 1:
+            iid = list(iids.keys())[0]
+
+        deadline = time.time() + self.wait_retries * self.wait_interval
+        delay = min(WAIT_MIN_INTERVAL, self.wait_interval)
+        while True:
+            index = self.get_stats(iid, STAT_TYPE_SERVER)[1]
+            for pxname in list(pending.keys()):
+                row = index.get((pxname, svname))
+                if row is None:
+                    self.module.fail_json(msg="The specified backend '%s/%s' was not found!" % (pxname, svname))
+                if row['status'] == status:
+                    del pending[pxname]
+            if not pending:
                 return True
-            else:
-                time.sleep(self.wait_interval)
+            if time.time() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, self.wait_interval)
 
-        self.module.fail_json(msg="server %s/%s not status '%s' after %d retries. Aborting." % (pxname, svname, status, self.wait_retries))
+        self.module.fail_json(msg="server(s) %s not status '%s' after %d seconds. Aborting." % (
+            ', '.join(['%s/%s' % (pxname, svname) for pxname in pending]), status,
+            self.wait_retries * self.wait_interval))
 
 
     def enabled(self, host, backend, weight):
@@ -295,8 +451,11 @@ class HAProxy(object):
         """
         Figure out what you want to do from ansible, and then do it.
         """
+        self.connect()
+
         # Get the state before the run
-        state_before = self.get_state_for(self.backend, self.host)
+        self.stats_before = self.get_stats()
+        state_before = self.get_state_for(self.backend, self.host, self.stats_before)
         self.command_results['state_before'] = state_before
 
         # toggle enable/disbale server
@@ -310,6 +469,7 @@ class HAProxy(object):
         # Get the state after the run
         state_after = self.get_state_for(self.backend, self.host)
         self.command_results['state_after'] = state_after
+        self.close()
 
         # Report change status
         if state_before != state_after:
@@ -346,6 +506,7 @@ def main():
 
 # import module snippets
 from ansible.module_utils.basic import *
+from ansible.module_utils.pycompat24 import get_exception
 
 main()
 
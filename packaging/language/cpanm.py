@@ -84,6 +84,16 @@ options:
     required: false
     default: null
     version_added: "2.1"
+  names:
+    description:
+      - A list of Perl modules to manage in one go, as an alternative to I(name). Each item is either a module
+        name or a dict with C(name) and an optional minimum C(version); I(version) applies to items without one.
+      - The installed modules and their versions are found by a single perl process, which looks for the
+        module files in @INC (and I(locallib)) and reads their $VERSION without loading them, and all missing
+        or outdated modules are installed with a single cpanm run.
+    required: false
+    default: null
+    version_added: "2.2"
 notes:
    - Please note that U(http://search.cpan.org/dist/App-cpanminus/bin/cpanm, cpanm) must be installed on the remote host.
 author: "Franck Cuny (@franckcuny)"
@@ -114,28 +124,108 @@ EXAMPLES = '''
 # install Dancer if it's not already installed
 # OR the installed version is older than version 1.0
 - cpanm: name=Dancer version=1.0
+
+# install the modules of a Perl stack that are missing or too old, with one cpanm run
+- cpanm:
+    locallib: /srv/webapps/my_app/extlib
+    names:
+      - Dancer
+      - { name: Plack, version: 1.0030 }
+      - DBD::Pg
 '''
 
-def _is_package_installed(module, name, locallib, cpanm, version):
-    cmd = ""
+import pipes
+import re
+
+# Reports, for every (module, minimum version) pair in @ARGV, whether the
+# module file can be found in @INC and its $VERSION is recent enough. The
+# version is parsed from the file, so the module and its dependencies are
+# never compiled.
+INSTALLED_SCRIPT = r"""
+use strict;
+use ExtUtils::MakeMaker;
+use version;
+while (my ($name, $min) = splice(@ARGV, 0, 2)) {
+    (my $file = "$name.pm") =~ s{::}{/}g;
+    my ($dir) = grep { !ref($_) && -f "$_/$file" } @INC;
+    if (!defined $dir) {
+        print "$name\tmissing\t\n";
+        next;
+    }
+    my $v = MM->parse_version("$dir/$file");
+    $v = '' if !defined $v || $v eq 'undef';
+    my $ok = 1;
+    if (length $min) {
+        $ok = eval { length $v && version->parse($v) >= version->parse($min) } ? 1 : 0;
+    }
+    print "$name\t", ($ok ? "ok" : "old"), "\t$v\n";
+}
+"""
+
+MODULE_NAME_RE = re.compile(r'^[A-Za-z_]\w*(::\w+)*$')
+
+
+def _installed_modules(module, modules, locallib):
+    """
+    Check a list of (name, minimum version) pairs with a single perl process.
+    Returns the set of pairs that are installed in a recent enough version.
+    Names that are not module names (e.g. distribution paths) are never
+    reported as installed.
+    """
+    checked = []
+    args = []
+    for name, version in modules:
+        if MODULE_NAME_RE.match(name):
+            checked.append((name, version))
+            args.extend([name, version or ''])
+    if not args:
+        return set()
+
+    cmd = [module.get_bin_path('perl', True)]
     if locallib:
-        os.environ["PERL5LIB"] = "%s/lib/perl5" % locallib
-    cmd = "%s perl -e ' use %s" % (cmd, name)
-    if version:
-       cmd = "%s %s;'" % (cmd, version)
-    else:
-       cmd = "%s;'" % cmd
+        cmd.append('-Mlib=%s/lib/perl5' % locallib)
+    cmd.extend(['-e', INSTALLED_SCRIPT] + args)
     res, stdout, stderr = module.run_command(cmd, check_rc=False)
-    if res == 0:
-       return True
-    else:
-       return False
+    if res != 0:
+        module.fail_json(msg="unable to query installed Perl modules: %s" % stderr, cmd=cmd)
+
+    # perl answers one line per pair, in order
+    installed = set()
+    for pair, line in zip(checked, stdout.splitlines()):
+        fields = line.split('\t')
+        if len(fields) == 3 and fields[0] == pair[0] and fields[1] == 'ok':
+            installed.add(pair)
+    return installed
+
+
+def _is_package_installed(module, name, locallib, cpanm, version):
+    if not name:
+        return False
+    return (name, version) in _installed_modules(module, [(name, version)], locallib)
+
+
+def _parse_names(module, names, version):
+    """Turn the names option into a list of (name, minimum version) pairs."""
+    modules = []
+    for item in names:
+        if isinstance(item, dict):
+            if not item.get('name'):
+                module.fail_json(msg="each item of names needs a name", item=item)
+            item_version = item.get('version', version)
+            if item_version is not None:
+                item_version = str(item_version)
+            modules.append((item['name'], item_version))
+        else:
+            modules.append((item, version))
+    return modules
 
 def _build_cmd_line(name, from_path, notest, locallib, mirror, mirror_only, installdeps, cpanm, use_sudo):
     # this code should use "%s" like everything else and just return early but not fixing all of it now.
     # don't copy stuff like this
     if from_path:
         cmd = cpanm + " " + from_path
+    elif isinstance(name, list):
+        cmd = cpanm + " " + " ".join(pipes.quote(n) for n in name)
     else:
         cmd = cpanm + " " + name
 
@@ -179,11 +269,13 @@ def main():
         system_lib=dict(default=False, type='bool', aliases=['use_sudo']),
         version=dict(default=None, required=False),
         executable=dict(required=False, type='path'),
+        names=dict(default=None, required=False, type='list'),
     )
 
     module = AnsibleModule(
         argument_spec=arg_spec,
-        required_one_of=[['name', 'from_path']],
+        required_one_of=[['name', 'from_path', 'names']],
+        mutually_exclusive=[['names', 'name'], ['names', 'from_path']],
     )
 
     cpanm       = _get_cpanm_path(module)
@@ -196,9 +288,27 @@ def main():
     installdeps = module.params['installdeps']
     use_sudo    = module.params['system_lib']
     version     = module.params['version']
+    names       = module.params['names']
 
     changed   = False
 
+    if names:
+        modules = _parse_names(module, names, version)
+        installed = _installed_modules(module, modules, locallib)
+        missing = []
+        for n, v in modules:
+            if (n, v) not in installed and n not in missing:
+                missing.append(n)
+        if missing:
+            cmd = _build_cmd_line(missing, None, notest, locallib, mirror, mirror_only, installdeps, cpanm, use_sudo)
+            rc_cpanm, out_cpanm, err_cpanm = module.run_command(cmd, check_rc=False)
+            if rc_cpanm != 0:
+                module.fail_json(msg=err_cpanm, cmd=cmd, missing=missing)
+            # cpanm reports every module it did not need to touch
+            if (err_cpanm + out_cpanm).count('is up to date') < len(missing):
+                changed = True
+        module.exit_json(changed=changed, binary=cpanm, names=[n for n, v in modules], missing=missing)
+
     installed = _is_package_installed(module, name, locallib, cpanm, version)
 
     if not installed:
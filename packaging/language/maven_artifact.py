@@ -23,11 +23,22 @@ __author__ = 'cschmidt'
 
 from lxml import etree
 import os
+import base64
+import email.utils
+import errno
 import hashlib
+import shutil
+import socket
+import stat
+import ssl
 import sys
 import posixpath
+import tempfile
+import threading
 from ansible.module_utils.basic import *
 from ansible.module_utils.urls import *
+from ansible.module_utils.six.moves import http_client, queue
+from ansible.module_utils.six.moves.urllib.request import getproxies
 try:
     import boto3
     HAS_BOTO = True
@@ -108,6 +119,55 @@ options:
         default: 'yes'
         choices: ['yes', 'no']
         version_added: "1.9.3"
+    artifacts:
+        description:
+            - A list of artifacts to download in one task, as an alternative to I(artifact_id). Each item is a dict
+              with the keys C(group_id), C(artifact_id), C(version), C(classifier), C(extension) and C(dest). Keys
+              that are left out are taken from the module options of the same name, so e.g. I(group_id) can be
+              given once for all items.
+            - Without C(dest), an item is written as C(artifact_id-version[-classifier].extension) into the
+              directory given by I(dest).
+            - Repository metadata is fetched once per group and artifact, and the artifacts are downloaded
+              concurrently over kept-alive connections.
+        required: false
+        default: null
+        version_added: "2.2"
+    workers:
+        description:
+            - Number of artifacts from I(artifacts) downloaded at the same time.
+        required: false
+        default: 4
+        version_added: "2.2"
+    local_repository:
+        description:
+            - A local repository directory with the usual maven layout, such as C(~/.m2/repository), that is shared
+              between tasks. Artifacts are downloaded into it and hardlinked (or copied, across filesystems) to
+              their I(dest), and an artifact already present there with a matching checksum is not downloaded
+              again.
+        required: false
+        default: null
+        version_added: "2.2"
+    checksum_algorithm:
+        description:
+            - The checksum file published next to the artifact (C(.md5), C(.sha1) or C(.sha256)) that downloads
+              are verified against. The checksum is computed while the artifact is written, and a download that
+              does not match is discarded. Artifacts without such a checksum file are downloaded unverified,
+              and an existing copy is kept when its size matches the C(Content-Length) of a C(HEAD) request
+              and it is not older than the C(Last-Modified) date the repository reports.
+            - When stamps are kept (see I(stamp_directory)), the size, mtime, inode and checksum of every verified
+              file, including I(dest), are recorded so later runs find an unchanged file without reading it again.
+        required: false
+        default: md5
+        choices: ['md5', 'sha1', 'sha256']
+        version_added: "2.2"
+    stamp_directory:
+        description:
+            - Directory owned by the module in which checksum stamps are kept, one file per artifact path.
+              Defaults to C(.stamps) inside I(local_repository). Without either, no stamps are written and an
+              existing I(dest) is read in full to compare its checksum.
+        required: false
+        default: null
+        version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -122,6 +182,17 @@ EXAMPLES = '''
 
 # Download a WAR File to the Tomcat webapps directory to be deployed
 - maven_artifact: group_id=com.company artifact_id=web-app extension=war repository_url=https://repo.company.com/maven dest=/var/lib/tomcat7/webapps/web-app.war
+
+# Download the libraries of a service in one go, reusing the local maven repository
+- maven_artifact:
+    repository_url: https://repo.company.com/maven
+    local_repository: /var/cache/maven/repository
+    group_id: com.company
+    dest: /opt/service/lib/
+    artifacts:
+      - { artifact_id: service-core, version: 1.4.2 }
+      - { artifact_id: service-api, version: 1.4.2 }
+      - { group_id: junit, artifact_id: junit, version: 4.11 }
 '''
 
 class Artifact(object):
@@ -191,17 +262,121 @@ class Artifact(object):
             return None
 
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+HTTP_TIMEOUT = 30
+MAX_WORKERS = 16
+ARTIFACT_KEYS = ['group_id', 'artifact_id', 'version', 'classifier', 'extension', 'dest']
+
+
+class ConnectionPool(object):
+    """
+    Keep-alive HTTP(S) connections, one per host and thread, so that many
+    requests to the same repository do not each pay for a new TCP and TLS
+    handshake. A response has to be read completely before the next request
+    is sent by the same thread.
+
+    Only plain GETs are sent this way; redirects, authentication challenges,
+    proxies and unverified TLS are left to fetch_url.
+    """
+
+    def __init__(self, validate_certs=True, timeout=HTTP_TIMEOUT):
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def handles(self, url, method='GET'):
+        scheme = urlparse.urlparse(url).scheme
+        if method != 'GET' or scheme not in ('http', 'https'):
+            return False
+        if getproxies().get(scheme):
+            return False
+        if scheme == 'https':
+            return self.validate_certs and hasattr(ssl, 'create_default_context')
+        return True
+
+    def _connection(self, scheme, netloc, fresh=False):
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        key = (scheme, netloc)
+        if fresh and key in connections:
+            connections.pop(key).close()
+        if key not in connections:
+            if scheme == 'https':
+                connections[key] = http_client.HTTPSConnection(netloc, timeout=self.timeout,
+                                                               context=ssl.create_default_context())
+            else:
+                connections[key] = http_client.HTTPConnection(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _send(self, url, headers):
+        parsed = urlparse.urlparse(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        for attempt in (False, True):
+            conn = self._connection(parsed.scheme, parsed.netloc, fresh=attempt)
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn.getresponse()
+            except (http_client.HTTPException, socket.error):
+                # the server may have closed an idle kept-alive connection
+                if attempt:
+                    raise
+
+    def get(self, url, headers=None):
+        """
+        GET url. Returns the response and its status and reason; only a 200
+        response is left unread.
+        """
+        response = self._send(url, dict(headers or {}))
+        if response.status != 200:
+            response.read()
+        return response, response.status, response.reason
+
+
 class MavenDownloader:
-    def __init__(self, module, base="http://repo1.maven.org/maven2"):
+    def __init__(self, module, base="http://repo1.maven.org/maven2", local_repository=None, checksum_algorithm="md5",
+                 stamp_directory=None):
         self.module = module
         if base.endswith("/"):
             base = base.rstrip("/")
         self.base = base
         self.user_agent = "Maven Artifact Downloader/1.0"
+        self.local_repository = local_repository
+        self.stamp_directory = stamp_directory
+        self.checksum_algorithm = checksum_algorithm
+        self.pool = ConnectionPool(validate_certs=module.params.get('validate_certs', True))
+        self._metadata = {}
+        self._metadata_locks = {}
+        self._checksums = {}
+        self._lock = threading.Lock()
+        # read once, os.umask can't be queried without setting it and the
+        # workers share the process
+        self.umask = os.umask(0)
+        os.umask(self.umask)
+
+    def _get_metadata(self, path):
+        # resolving latest or snapshot versions of many artifacts only
+        # fetches each maven-metadata.xml once
+        url = self.base + path
+        self._lock.acquire()
+        try:
+            lock = self._metadata_locks.setdefault(url, threading.Lock())
+        finally:
+            self._lock.release()
+
+        lock.acquire()
+        try:
+            if url not in self._metadata:
+                self._metadata[url] = self._request(url, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
+            return self._metadata[url]
+        finally:
+            lock.release()
 
     def _find_latest_version_available(self, artifact):
         path = "/%s/maven-metadata.xml" % (artifact.path(False))
-        xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
+        xml = self._get_metadata(path)
         v = xml.xpath("/metadata/versioning/versions/version[last()]/text()")
         if v:
             return v[0]
@@ -212,7 +387,7 @@ class MavenDownloader:
 
         if artifact.is_snapshot():
             path = "/%s/maven-metadata.xml" % (artifact.path())
-            xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
+            xml = self._get_metadata(path)
             timestamp = xml.xpath("/metadata/versioning/snapshot/timestamp/text()")[0]
             buildNumber = xml.xpath("/metadata/versioning/snapshot/buildNumber/text()")[0]
             return self._uri_for_artifact(artifact, artifact.version.replace("SNAPSHOT", timestamp + "-" + buildNumber))
@@ -229,47 +404,168 @@ class MavenDownloader:
 
         return posixpath.join(self.base, artifact.path(), artifact.artifact_id + "-" + version + "." + artifact.extension)
 
-    def _request(self, url, failmsg, f):
+    def _request(self, url, failmsg, f, missing_ok=False, method='GET'):
         url_to_use = url
+        headers = {'User-Agent': self.user_agent}
         parsed_url = urlparse.urlparse(url)
         if parsed_url.scheme=='s3':
                 parsed_url = urlparse.urlparse(url)
                 bucket_name = parsed_url.netloc[:parsed_url.netloc.find('.')]
                 key_name = parsed_url.path[1:]
                 client = boto3.client('s3',aws_access_key_id=self.module.params.get('username', ''), aws_secret_access_key=self.module.params.get('password', ''))
-                url_to_use = client.generate_presigned_url('get_object',Params={'Bucket':bucket_name,'Key':key_name},ExpiresIn=10)
+                client_method = 'get_object'
+                if method == 'HEAD':
+                    client_method = 'head_object'
+                url_to_use = client.generate_presigned_url(client_method,Params={'Bucket':bucket_name,'Key':key_name},ExpiresIn=10)
+        elif self.module.params.get('username'):
+            credentials = '%s:%s' % (self.module.params['username'], self.module.params.get('password') or '')
+            if not isinstance(credentials, bytes):
+                credentials = credentials.encode('utf-8')
+            headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+        if self.pool.handles(url_to_use, method):
+            response, status, reason = self.pool.get(url_to_use, headers)
+            if status == 200:
+                return f(response)
+            if status == 404 and missing_ok:
+                return None
+            # redirects, authentication challenges and errors are fetch_url's
 
         # Hack to add parameters in the way that fetch_url expects
         self.module.params['url_username'] = self.module.params.get('username', '')
         self.module.params['url_password'] = self.module.params.get('password', '')
         self.module.params['http_agent'] = self.module.params.get('user_agent', None)
 
-        response, info = fetch_url(self.module, url_to_use)
+        response, info = fetch_url(self.module, url_to_use, method=method)
+        if info['status'] == 404 and missing_ok:
+            return None
         if info['status'] != 200:
             raise ValueError(failmsg + " because of " + info['msg'] + "for URL " + url_to_use)
         else:
             return f(response)
 
 
-    def download(self, artifact, filename=None):
-        filename = artifact.get_filename(filename)
+    def fetch(self, artifact, dest, report_hook=None):
+        """
+        Make dest hold the artifact, resolving latest and snapshot versions.
+        Returns whether dest was changed and the resolved artifact.
+        """
         if not artifact.version or artifact.version == "latest":
             artifact = Artifact(artifact.group_id, artifact.artifact_id, self._find_latest_version_available(artifact),
                                 artifact.classifier, artifact.extension)
 
         url = self.find_uri_for_artifact(artifact)
-        if not self.verify_md5(filename, url + ".md5"):
-            response = self._request(url, "Failed to download artifact " + str(artifact), lambda r: r)
-            if response:
-                f = open(filename, 'w')
-                # f.write(response.read())
-                self._write_chunks(response, f, report_hook=self.chunk_report)
+        algorithm = self.checksum_algorithm
+        cached = None
+        if self.local_repository:
+            cached = os.path.join(self.local_repository, artifact.path(), posixpath.basename(url))
+
+        # the checksum file is only needed up front when there is a local
+        # copy to compare; repositories without checksum files still work
+        remote = None
+        head = None
+        if os.path.exists(dest) or (cached and os.path.exists(cached)):
+            remote = self._remote_checksum(url + "." + algorithm)
+            if remote is None:
+                # nothing to compare checksums with; go by what a HEAD
+                # request tells about the artifact
+                head = self._remote_head(url)
+        if self._is_current(dest, remote, head):
+            return False, artifact
+
+        if cached:
+            if not self._is_current(cached, remote, head):
+                self._download_to(url, artifact, cached, remote, report_hook)
+            self._link(cached, dest)
+        else:
+            self._download_to(url, artifact, dest, remote, report_hook)
+        return True, artifact
+
+    def _is_current(self, file, checksum, head):
+        """
+        Does file hold the artifact? Compared by checksum when the repository
+        publishes one, else by the (size, last modified) of head.
+        """
+        if not os.path.exists(file):
+            return False
+        if checksum is not None:
+            return self._local_checksum(file, self.checksum_algorithm) == checksum
+        if head is None:
+            return False
+        size, modified = head
+        st = os.stat(file)
+        return st.st_size == size and (modified is None or modified <= st.st_mtime)
+
+    def _download_to(self, url, artifact, filename, checksum, report_hook=None):
+        # write next to the destination and rename, so that an interrupted
+        # or corrupted download never replaces the artifact
+        directory = self._makedirs(filename)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filename))
+        digest = hashlib.new(self.checksum_algorithm)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                self._request(url, "Failed to download artifact " + str(artifact),
+                              lambda r: self._write_chunks(r, f, report_hook=report_hook, digest=digest))
+            finally:
                 f.close()
-                return True
-            else:
-                return False
+            if checksum is None:
+                checksum = self._remote_checksum(url + "." + self.checksum_algorithm)
+            if checksum is not None and digest.hexdigest() != checksum:
+                raise ValueError("Checksum mismatch for artifact %s: expected %s %s, got %s"
+                                 % (artifact, self.checksum_algorithm, checksum, digest.hexdigest()))
+            self._set_mode(tmp, filename)
+            os.rename(tmp, filename)
+        except:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._remember_checksum(filename, self.checksum_algorithm, digest.hexdigest())
+
+    def _set_mode(self, tmp, filename):
+        # mkstemp and copyfile leave their own mode; give tmp the mode of the
+        # file it replaces, or what a plain open() would under the umask
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except OSError:
+            mode = 0o666 & ~self.umask
+        os.chmod(tmp, mode)
+
+    def _makedirs(self, filename):
+        # several workers may create the same directory at once
+        directory = os.path.dirname(os.path.abspath(filename))
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        return directory
+
+    def _link(self, source, dest):
+        """
+        Hardlink source to dest, replacing dest atomically. Falls back to a
+        copy when the two are not on the same filesystem.
+        """
+        if os.path.exists(dest) and os.path.samefile(source, dest):
+            return
+        self._makedirs(dest)
+        tmp = '%s.%d.%d.tmp' % (dest, os.getpid(), threading.current_thread().ident)
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+            self._set_mode(tmp, dest)
+        try:
+            os.rename(tmp, dest)
+        except OSError:
+            os.unlink(tmp)
+            raise
+        checksum = self._checksums.get((os.path.realpath(source), self.checksum_algorithm))
+        if checksum:
+            self._remember_checksum(dest, self.checksum_algorithm, checksum)
         else:
-            return True
+            self._checksums.pop((os.path.realpath(dest), self.checksum_algorithm), None)
 
     def chunk_report(self, bytes_so_far, chunk_size, total_size):
         percent = float(bytes_so_far) / total_size
@@ -280,9 +576,19 @@ class MavenDownloader:
         if bytes_so_far >= total_size:
             sys.stdout.write('\n')
 
-    def _write_chunks(self, response, file, chunk_size=8192, report_hook=None):
-        total_size = response.info().getheader('Content-Length').strip()
-        total_size = int(total_size)
+    def _header(self, response, name):
+        if hasattr(response, 'getheader'):
+            return response.getheader(name)
+        return response.info().getheader(name)
+
+    def _content_length(self, response):
+        total_size = self._header(response, 'Content-Length')
+        if total_size:
+            return int(total_size.strip())
+        return None
+
+    def _write_chunks(self, response, file, chunk_size=DOWNLOAD_CHUNK_SIZE, report_hook=None, digest=None):
+        total_size = self._content_length(response)
         bytes_so_far = 0
 
         while 1:
@@ -293,26 +599,192 @@ class MavenDownloader:
                 break
 
             file.write(chunk)
-            if report_hook:
+            if digest is not None:
+                digest.update(chunk)
+            if report_hook and total_size:
                 report_hook(bytes_so_far, chunk_size, total_size)
 
         return bytes_so_far
 
-    def verify_md5(self, file, remote_md5):
-        if not os.path.exists(file):
-            return False
-        else:
-            local_md5 = self._local_md5(file)
-            remote = self._request(remote_md5, "Failed to download MD5", lambda r: r.read())
-            return local_md5 == remote
-
-    def _local_md5(self, file):
-        md5 = hashlib.md5()
-        f = open(file, 'rb')
-        for chunk in iter(lambda: f.read(8192), ''):
-            md5.update(chunk)
-        f.close()
-        return md5.hexdigest()
+    def _remote_checksum(self, url):
+        """
+        Checksum published at url, or None if the repository has no
+        checksum file for the artifact.
+        """
+        remote = self._request(url, "Failed to download checksum", lambda r: r.read(), missing_ok=True)
+        if remote is None or not remote.strip():
+            return None
+        # checksum files may carry the file name after the digest
+        return remote.strip().split()[0].lower().decode('ascii', 'replace')
+
+    def _remote_head(self, url):
+        """
+        Size and Last-Modified time of the artifact at url from a HEAD
+        request; None if the repository does not report a size.
+        """
+        def parse(response):
+            response.read()
+            size = self._content_length(response)
+            if size is None:
+                return None
+            modified = self._header(response, 'Last-Modified')
+            if modified:
+                modified = email.utils.parsedate_tz(modified)
+            if modified:
+                modified = email.utils.mktime_tz(modified)
+            return size, modified or None
+
+        return self._request(url, "Failed to check artifact", parse, missing_ok=True, method='HEAD')
+
+    def _local_checksum(self, file, algorithm):
+        """
+        Checksum of a local file. It is taken from its stamp when size, mtime
+        and inode still match, and only computed otherwise.
+        """
+        key = (os.path.realpath(file), algorithm)
+        if key in self._checksums:
+            return self._checksums[key]
+
+        checksum = None
+        stamped = self.stamp_directory is not None
+        if stamped:
+            checksum = read_stamp(self.stamp_directory, file, algorithm)
+        if checksum is None:
+            digest = hashlib.new(algorithm)
+            f = open(file, 'rb')
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+            f.close()
+            checksum = digest.hexdigest()
+            if stamped:
+                write_stamp(self.stamp_directory, file, algorithm, checksum)
+        self._checksums[key] = checksum
+        return checksum
+
+    def _remember_checksum(self, file, algorithm, checksum):
+        self._checksums[(os.path.realpath(file), algorithm)] = checksum
+        if self.stamp_directory is not None:
+            write_stamp(self.stamp_directory, file, algorithm, checksum)
+
+
+def stamp_path(stamp_directory, file):
+    # stamps are keyed by the path of the file, never kept next to it
+    path = os.path.realpath(file)
+    if not isinstance(path, bytes):
+        path = path.encode('utf-8')
+    key = hashlib.sha1(path).hexdigest()
+    return os.path.join(stamp_directory, key + ".stamp")
+
+
+def read_stamp(stamp_directory, file, algorithm):
+    """
+    Return the checksum recorded in the stamp of file if the stamp was
+    written for the file as it is now, None otherwise.
+    """
+    try:
+        f = open(stamp_path(stamp_directory, file))
+        try:
+            fields = f.read().split()
+        finally:
+            f.close()
+        st = os.stat(file)
+    except (IOError, OSError):
+        return None
+    if len(fields) == 5 and fields[:4] == [str(st.st_size), repr(st.st_mtime), str(st.st_ino), algorithm]:
+        return fields[4]
+    return None
+
+
+def write_stamp(stamp_directory, file, algorithm, checksum):
+    """
+    Record size, mtime, inode and checksum of file, so later runs can tell
+    it is unchanged without reading it. Failing to do so is not an error.
+    """
+    stamp = stamp_path(stamp_directory, file)
+    tmp = None
+    try:
+        if not os.path.isdir(stamp_directory):
+            try:
+                os.makedirs(stamp_directory)
+            except OSError:
+                if not os.path.isdir(stamp_directory):
+                    raise
+        st = os.stat(file)
+        fd, tmp = tempfile.mkstemp(dir=stamp_directory, prefix=os.path.basename(stamp))
+        f = os.fdopen(fd, 'w')
+        try:
+            f.write("%d %r %d %s %s\n" % (st.st_size, st.st_mtime, st.st_ino, algorithm, checksum))
+        finally:
+            f.close()
+        os.rename(tmp, stamp)
+    except (IOError, OSError):
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def artifact_filename(artifact):
+    if artifact.classifier:
+        return "%s-%s-%s.%s" % (artifact.artifact_id, artifact.version, artifact.classifier, artifact.extension)
+    return "%s-%s.%s" % (artifact.artifact_id, artifact.version, artifact.extension)
+
+
+def download_artifacts(module, downloader, items, workers):
+    """
+    Download all items of the artifacts option using a pool of worker
+    threads. Returns the list of per-artifact results.
+    """
+    defaults = dict((key, module.params[key]) for key in ARTIFACT_KEYS)
+    jobs = queue.Queue()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            module.fail_json(msg="each item of artifacts must be a dict", item=item)
+        spec = dict(defaults)
+        spec.update(item)
+        try:
+            artifact = Artifact(spec['group_id'], spec['artifact_id'], spec['version'] and str(spec['version']),
+                                spec['classifier'], spec['extension'])
+        except ValueError as e:
+            module.fail_json(msg=e.args[0], item=item)
+        jobs.put((index, artifact, spec['dest']))
+
+    results = [None] * len(items)
+    errors = []
+
+    def work():
+        while True:
+            try:
+                index, artifact, dest = jobs.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if not artifact.version or artifact.version == "latest":
+                    artifact = Artifact(artifact.group_id, artifact.artifact_id,
+                                        downloader._find_latest_version_available(artifact),
+                                        artifact.classifier, artifact.extension)
+                if not dest:
+                    raise ValueError("no dest given")
+                dest = os.path.expanduser(dest)
+                if dest.endswith(os.sep) or os.path.isdir(dest):
+                    dest = os.path.join(dest, artifact_filename(artifact))
+                changed, artifact = downloader.fetch(artifact, dest)
+                results[index] = dict(group_id=artifact.group_id, artifact_id=artifact.artifact_id,
+                                      version=artifact.version, classifier=artifact.classifier,
+                                      extension=artifact.extension, dest=dest, changed=changed)
+            except Exception as e:
+                errors.append("%s: %s" % (artifact, e))
+
+    threads = []
+    for i in range(max(1, min(workers, len(items)))):
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        module.fail_json(msg="Unable to download %d artifact(s)" % len(errors), errors=errors)
+    return results
 
 
 def main():
@@ -329,7 +801,13 @@ def main():
             state = dict(default="present", choices=["present","absent"]), # TODO - Implement a "latest" state
             dest = dict(type="path", default=None),
             validate_certs = dict(required=False, default=True, type='bool'),
-        )
+            artifacts = dict(type='list', default=None),
+            workers = dict(type='int', default=4),
+            local_repository = dict(type='path', default=None),
+            checksum_algorithm = dict(default='md5', choices=['md5', 'sha1', 'sha256']),
+            stamp_directory = dict(type='path', default=None),
+        ),
+        required_one_of = [['artifact_id', 'artifacts']],
     )
 
 
@@ -353,34 +831,38 @@ def main():
         repository_url = "http://repo1.maven.org/maven2"
 
     #downloader = MavenDownloader(module, repository_url, repository_username, repository_password)
-    downloader = MavenDownloader(module, repository_url)
+    stamp_directory = module.params["stamp_directory"]
+    if not stamp_directory and module.params["local_repository"]:
+        stamp_directory = os.path.join(module.params["local_repository"], ".stamps")
+    downloader = MavenDownloader(module, repository_url, module.params["local_repository"],
+                                 module.params["checksum_algorithm"], stamp_directory)
+
+    if module.params["artifacts"]:
+        workers = min(module.params["workers"], MAX_WORKERS)
+        results = download_artifacts(module, downloader, module.params["artifacts"], workers)
+        changed = [r for r in results if r['changed']]
+        module.exit_json(state=state, artifacts=results, repository_url=repository_url, changed=bool(changed))
 
     try:
         artifact = Artifact(group_id, artifact_id, version, classifier, extension)
     except ValueError as e:
         module.fail_json(msg=e.args[0])
 
-    prev_state = "absent"
     if os.path.isdir(dest):
         dest = posixpath.join(dest, artifact_id + "-" + version + "." + extension)
-    if os.path.lexists(dest) and downloader.verify_md5(dest, downloader.find_uri_for_artifact(artifact) + '.md5'):
-        prev_state = "present"
-    else:
-        path = os.path.dirname(dest)
-        if not os.path.exists(path):
-            os.makedirs(path)
-
-    if prev_state == "present":
-        module.exit_json(dest=dest, state=state, changed=False)
 
+    # fetch checks the existing file against the remote checksum first and
+    # only downloads when they differ
     try:
-        if downloader.download(artifact, dest):
-            module.exit_json(state=state, dest=dest, group_id=group_id, artifact_id=artifact_id, version=version, classifier=classifier, extension=extension, repository_url=repository_url, changed=True)
-        else:
-            module.fail_json(msg="Unable to download the artifact")
+        changed, artifact = downloader.fetch(artifact, dest, report_hook=downloader.chunk_report)
     except ValueError as e:
         module.fail_json(msg=e.args[0])
 
+    if not changed:
+        module.exit_json(dest=dest, state=state, changed=False)
+
+    module.exit_json(state=state, dest=dest, group_id=group_id, artifact_id=artifact_id, version=version, classifier=classifier, extension=extension, repository_url=repository_url, changed=True)
+
 
 
 if __name__ == '__main__':
@@ -74,6 +74,27 @@ options:
     required: false
     default: present
     choices: [ "present", "absent", "latest" ]
+  packages:
+    description:
+      - A list of node.js libraries to manage in one go, as an alternative to
+        I(name). Each item is either a string, C(name) or C(name@version), or
+        a dict with C(name) and optionally C(version) keys.
+      - The installed state of all of them is taken from a single
+        C(npm ls --json --depth=0) and the missing ones are installed with a
+        single npm invocation.
+      - An exact requested version must match the installed one, other
+        versions (ranges, tags) only require the library to be installed.
+    required: false
+    default: null
+    version_added: "2.2"
+  tree_cache:
+    description:
+      - Path of a file used to cache the parsed C(npm ls) output. The cache
+        is reused as long as C(package.json), C(package-lock.json) and
+        C(node_modules) in the install location have not been modified.
+    required: false
+    default: null
+    version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -95,6 +116,14 @@ description: Install "coffee-script" node.js package from custom registry.
 description: Install packages based on package.json.
 - npm: path=/app/location
 
+description: Install a set of CLI tools globally with a single npm run.
+- npm:
+    global: yes
+    packages:
+      - bower
+      - grunt-cli@1.2.0
+      - { name: gulp, version: 3.9.1 }
+
 description: Update packages based on package.json to their latest version.
 - npm: path=/app/location state=latest
 
@@ -103,6 +132,8 @@ description: Install packages based on package.json using the npm installed with
 '''
 
 import os
+import re
+import tempfile
 
 try:
     import json
@@ -113,6 +144,38 @@ except ImportError:
         # Let snippet from module_utils/basic.py return a proper error in this case
         pass
 
+# a version that names one release, as opposed to a range or a tag
+EXACT_VERSION = re.compile(r'^v?\d+\.\d+\.\d+(-[0-9A-Za-z.-]+)?$')
+
+
+def package_target(name, version):
+    if version:
+        return '%s@%s' % (name, version)
+    return name
+
+
+def parse_packages(module, packages):
+    """Turn the packages option into a list of (name, version) tuples"""
+    parsed = []
+    for package in packages:
+        if isinstance(package, dict):
+            if not package.get('name'):
+                module.fail_json(msg='each item of packages needs a name', package=package)
+            version = package.get('version')
+            if version is not None:
+                version = str(version)
+            parsed.append((package['name'], version))
+        else:
+            # keep the leading @ of scoped packages as part of the name
+            package = str(package)
+            parts = package[1:].split('@', 1)
+            name = package[0] + parts[0]
+            if len(parts) == 2 and parts[1]:
+                parsed.append((name, parts[1]))
+            else:
+                parsed.append((name, None))
+    return parsed
+
 
 class Npm(object):
     def __init__(self, module, **kwargs):
@@ -124,6 +187,8 @@ class Npm(object):
         self.registry = kwargs['registry']
         self.production = kwargs['production']
         self.ignore_scripts = kwargs['ignore_scripts']
+        self.packages = kwargs.get('packages') or []
+        self.tree_cache = kwargs.get('tree_cache')
 
         if kwargs['executable']:
             self.executable = kwargs['executable'].split(' ')
@@ -135,7 +200,7 @@ class Npm(object):
         else:
             self.name_version = self.name
 
-    def _exec(self, args, run_in_check_mode=False, check_rc=True):
+    def _exec(self, args, run_in_check_mode=False, check_rc=True, targets=None):
         if not self.module.check_mode or (self.module.check_mode and run_in_check_mode):
             cmd = self.executable + args
 
@@ -145,7 +210,9 @@ class Npm(object):
                 cmd.append('--production')
             if self.ignore_scripts:
                 cmd.append('--ignore-scripts')
-            if self.name:
+            if targets is not None:
+                cmd.extend(targets)
+            elif self.name:
                 cmd.append(self.name_version)
             if self.registry:
                 cmd.append('--registry')
@@ -164,17 +231,73 @@ class Npm(object):
             return out
         return ''
 
-    def list(self):
-        cmd = ['list', '--json']
+    def _tree_cache_key(self):
+        """Describe what the cached tree depends on: the install location,
+        the options affecting npm ls and the mtimes of the files npm changes
+        whenever the installed set changes"""
+        if self.glbl:
+            root = os.path.dirname(self._exec(['root'], True, False, targets=[]).strip())
+        else:
+            root = self.path
+        stamps = []
+        for entry in ('package.json', 'package-lock.json', 'node_modules'):
+            try:
+                stamps.append(repr(os.stat(os.path.join(root, entry)).st_mtime))
+            except OSError:
+                stamps.append(None)
+        return [root, self.glbl, self.production, self.name and self.name_version, stamps]
+
+    def _ls(self):
+        """Parsed output of npm ls for the top level libraries, reused from
+        tree_cache while the install location is unchanged"""
+        key = None
+        if self.tree_cache:
+            key = self._tree_cache_key()
+            try:
+                f = open(self.tree_cache)
+                try:
+                    cached = json.load(f)
+                finally:
+                    f.close()
+                if cached.get('key') == key:
+                    return cached['tree']
+            except (IOError, ValueError):
+                pass
+
+        data = json.loads(self._exec(['list', '--json', '--depth=0'], True, False) or '{}')
+        tree = {}
+        for dep, info in data.get('dependencies', {}).items():
+            tree[dep] = dict(version=info.get('version'),
+                             missing=bool(info.get('missing')),
+                             invalid=bool(info.get('invalid')))
+
+        if key is not None:
+            self._write_tree_cache(key, tree)
+        return tree
+
+    def _write_tree_cache(self, key, tree):
+        cache_dir = os.path.dirname(os.path.abspath(self.tree_cache))
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=cache_dir)
+            f = os.fdopen(fd, 'w')
+            try:
+                json.dump(dict(key=key, tree=tree), f)
+            finally:
+                f.close()
+            os.rename(tmp, self.tree_cache)
+        except (IOError, OSError):
+            # the cache is only an optimisation
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
 
+    def list(self):
         installed = list()
         missing = list()
-        data = json.loads(self._exec(cmd, True, False))
-        if 'dependencies' in data:
-            for dep in data['dependencies']:
-                if 'missing' in data['dependencies'][dep] and data['dependencies'][dep]['missing']:
-                    missing.append(dep)
-                elif 'invalid' in data['dependencies'][dep] and data['dependencies'][dep]['invalid']:
+        tree = self._ls()
+        if tree:
+            for dep in tree:
+                if tree[dep]['missing'] or tree[dep]['invalid']:
                     missing.append(dep)
                 else:
                     installed.append(dep)
@@ -186,6 +309,30 @@ class Npm(object):
 
         return installed, missing
 
+    def list_packages(self):
+        """Return the names of packages that are installed, whatever their
+        version, and the name@version targets that need to be installed"""
+        tree = self._ls()
+        installed = list()
+        missing = list()
+        for name, version in self.packages:
+            info = tree.get(name)
+            if info is not None and not info['missing']:
+                installed.append(name)
+            if (info is None or info['missing'] or info['invalid'] or
+                    (version and EXACT_VERSION.match(version) and info['version'] != version)):
+                missing.append(package_target(name, version))
+        return installed, missing
+
+    def install_packages(self, targets):
+        return self._exec(['install'], targets=targets)
+
+    def update_packages(self, names):
+        return self._exec(['update'], targets=names)
+
+    def uninstall_packages(self, names):
+        return self._exec(['uninstall'], targets=names)
+
     def install(self):
         return self._exec(['install'])
 
@@ -218,10 +365,13 @@ def main():
         registry=dict(default=None),
         state=dict(default='present', choices=['present', 'absent', 'latest']),
         ignore_scripts=dict(default=False, type='bool'),
+        packages=dict(default=None, type='list'),
+        tree_cache=dict(default=None, type='path'),
     )
     arg_spec['global'] = dict(default='no', type='bool')
     module = AnsibleModule(
         argument_spec=arg_spec,
+        mutually_exclusive=[['name', 'packages'], ['version', 'packages']],
         supports_check_mode=True
     )
 
@@ -234,17 +384,37 @@ def main():
     registry = module.params['registry']
     state = module.params['state']
     ignore_scripts = module.params['ignore_scripts']
+    packages = module.params['packages']
+    tree_cache = module.params['tree_cache']
 
     if not path and not glbl:
         module.fail_json(msg='path must be specified when not using global')
-    if state == 'absent' and not name:
+    if state == 'absent' and not (name or packages):
         module.fail_json(msg='uninstalling a package is only available for named packages')
+    if packages:
+        packages = parse_packages(module, packages)
 
     npm = Npm(module, name=name, path=path, version=version, glbl=glbl, production=production, \
-              executable=executable, registry=registry, ignore_scripts=ignore_scripts)
+              executable=executable, registry=registry, ignore_scripts=ignore_scripts, \
+              packages=packages, tree_cache=tree_cache)
 
     changed = False
-    if state == 'present':
+    if packages:
+        installed, missing = npm.list_packages()
+        if state == 'absent':
+            if installed:
+                changed = True
+                npm.uninstall_packages(installed)
+        else:
+            if missing:
+                changed = True
+                npm.install_packages(missing)
+            if state == 'latest':
+                outdated = [dep for dep in npm.list_outdated() if dep in installed]
+                if outdated:
+                    changed = True
+                    npm.update_packages(outdated)
+    elif state == 'present':
         installed, missing = npm.list()
         if len(missing):
             changed = True
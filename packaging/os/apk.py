@@ -97,22 +97,81 @@ def update_package_db(module):
     else:
         module.fail_json(msg="could not update package db")
 
-def query_package(module, name):
-    cmd = "%s -v info --installed %s" % (APK_PATH, name)
+APK_INSTALLED_DB = '/lib/apk/db/installed'
+
+def parse_installed_db(db):
+    """Read the installed database and return a dict mapping every package
+    name, and every name it provides, to the installed package name"""
+    installed = {}
+    name = None
+    for line in db:
+        if line.startswith('P:'):
+            name = line[2:].strip()
+            installed[name] = name
+        elif line.startswith('p:') and name:
+            for provided in line[2:].split():
+                installed.setdefault(re.split('[=<>~]', provided)[0], name)
+        elif not line.strip():
+            name = None
+    return installed
+
+def query_installed(module):
+    """Return the installed index, read from the installed database when
+    available and from a single apk info otherwise"""
+    if os.path.exists(APK_INSTALLED_DB):
+        try:
+            db = open(APK_INSTALLED_DB)
+            try:
+                return parse_installed_db(db)
+            finally:
+                db.close()
+        except IOError:
+            pass
+
+    installed = {}
+    cmd = "%s info -v" % (APK_PATH)
     rc, stdout, stderr = module.run_command(cmd, check_rc=False)
-    if rc == 0:
-        return True
-    else:
-        return False
+    if rc != 0:
+        module.fail_json(msg="failed to list installed packages", stderr=stderr)
+    for line in stdout.split('\n'):
+        match = re.match('^(.+)-[^-]+-r\d+$', line.strip())
+        if match:
+            installed[match.group(1)] = match.group(1)
+    return installed
 
-def query_latest(module, name):
-    cmd = "%s version %s" % (APK_PATH, name)
+def query_outdated(module):
+    """Return the set of installed package names that have an upgrade
+    candidate, from a single apk version"""
+    outdated = set()
+    cmd = "%s version -l '<'" % (APK_PATH)
     rc, stdout, stderr = module.run_command(cmd, check_rc=False)
-    search_pattern = "(%s)-[\d\.\w]+-[\d\w]+\s+(.)\s+[\d\.\w]+-[\d\w]+\s+" % (name)
-    match = re.search(search_pattern, stdout)
-    if match and match.group(2) == "<":
-        return False
-    return True
+    for line in stdout.split('\n'):
+        match = re.match('^(.+)-[^-\s]+-r\d+\s+<\s', line)
+        if match:
+            outdated.add(match.group(1))
+    return outdated
+
+def plan_packages(module, names, state):
+    """Decide in memory which of the requested packages need to be added,
+    upgraded or deleted. Returns (add, upgrade, delete)"""
+    installed = query_installed(module)
+    outdated = set()
+    if state == 'latest':
+        outdated = query_outdated(module)
+
+    add = []
+    upgrade = False
+    delete = []
+    for name in names:
+        if state == 'absent':
+            if name in installed:
+                delete.append(name)
+        elif name not in installed:
+            add.append(name)
+        elif installed[name] in outdated:
+            add.append(name)
+            upgrade = True
+    return add, upgrade, delete
 
 def upgrade_packages(module):
     if module.check_mode:
@@ -127,14 +186,8 @@ def upgrade_packages(module):
     module.exit_json(changed=True, msg="upgraded packages")
 
 def install_packages(module, names, state):
-    upgrade = False
-    uninstalled = []
-    for name in names:
-        if not query_package(module, name):
-            uninstalled.append(name)
-        elif state == 'latest' and not query_latest(module, name):
-            upgrade = True
-    if not uninstalled and not upgrade:
+    uninstalled, upgrade, delete = plan_packages(module, names, state)
+    if not uninstalled:
         module.exit_json(changed=False, msg="package(s) already installed")
     names = " ".join(uninstalled)
     if upgrade:
@@ -153,10 +206,7 @@ def install_packages(module, names, state):
     module.exit_json(changed=True, msg="installed %s package(s)" % (names))
 
 def remove_packages(module, names):
-    installed = []
-    for name in names:
-        if query_package(module, name):
-            installed.append(name)
+    add, upgrade, installed = plan_packages(module, names, 'absent')
     if not installed:
         module.exit_json(changed=False, msg="package(s) already removed")
     names = " ".join(installed)
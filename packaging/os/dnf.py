@@ -41,6 +41,58 @@ options:
     required: false
     default: null
 
+  list_names:
+    description:
+      - Only list packages whose name matches one of these shell-style globs.
+    required: false
+    default: null
+    version_added: "2.2"
+
+  list_repos:
+    description:
+      - Only list packages from these repositories.
+    required: false
+    default: null
+    version_added: "2.2"
+
+  list_arches:
+    description:
+      - Only list packages of these architectures.
+    required: false
+    default: null
+    version_added: "2.2"
+
+  list_newest:
+    description:
+      - Only list the newest version of every package name and architecture.
+    required: false
+    default: "no"
+    choices: ["yes", "no"]
+    version_added: "2.2"
+
+  list_fields:
+    description:
+      - Only return these fields for every listed package, any of C(name),
+        C(arch), C(epoch), C(release), C(version), C(repo) and C(nevra).
+    required: false
+    default: null
+    version_added: "2.2"
+
+  list_offset:
+    description:
+      - Number of matching packages to skip, in name order. When set, or with
+        I(list_limit), the total number of matches is returned as C(total).
+    required: false
+    default: 0
+    version_added: "2.2"
+
+  list_limit:
+    description:
+      - Return at most this many packages, in name order.
+    required: false
+    default: null
+    version_added: "2.2"
+
   state:
     description:
       - Whether to install (C(present), C(latest)), or remove (C(absent)) a package.
@@ -82,7 +134,20 @@ options:
     choices: ["yes", "no"]
     aliases: []
 
-notes: []
+  metadata_expire:
+    description:
+      - Maximum age in seconds of the cached repository metadata before it is
+        refreshed, overriding the C(metadata_expire) setting of every enabled
+        repository for this run. C(-1) never refreshes a cache that exists.
+    required: false
+    default: null
+    version_added: "2.2"
+
+notes:
+  - Remote repository metadata is only loaded when it is needed. C(state=absent)
+    works from the installed packages alone, and C(state=present) first checks
+    the installed packages and exits without loading any repository when all
+    of them are already there.
 # informational: requirements for nodes
 requirements:
   - "python >= 2.6"
@@ -111,9 +176,15 @@ EXAMPLES = '''
 - name: install nginx rpm from a local file
   dnf: name=/usr/local/src/nginx-release-centos-6-0.el6.ngx.noarch.rpm state=present
 
+- name: list the first 100 available python packages of EPEL, names and versions only
+  dnf: list=available list_names=python-* list_repos=epel list_newest=yes list_fields=name,version list_limit=100
+
 - name: install the 'Development tools' package group
   dnf: name="@Development tools" state=present
 
+- name: install Apache, trusting repository metadata up to an hour old
+  dnf: name=httpd state=present metadata_expire=3600
+
 '''
 import os
 
@@ -158,7 +229,7 @@ def _configure_base(module, base, conf_file, disable_gpg_check):
     conf.read()
 
 
-def _specify_repositories(base, disablerepo, enablerepo):
+def _specify_repositories(base, disablerepo, enablerepo, metadata_expire=None):
     """Enable and disable repositories matching the provided patterns."""
     base.read_all_repos()
     repos = base.repos
@@ -173,18 +244,65 @@ def _specify_repositories(base, disablerepo, enablerepo):
         for repo in repos.get_matching(repo_pattern):
             repo.enable()
 
+    # Trust cached metadata for as long as asked to
+    if metadata_expire is not None:
+        for repo in repos.iter_enabled():
+            repo.metadata_expire = metadata_expire
+
+
+def _base(module, conf_file, disable_gpg_check, disablerepo, enablerepo,
+          metadata_expire=None, load_available_repos=True):
+    """Return a fully configured dnf Base object.
 
-def _base(module, conf_file, disable_gpg_check, disablerepo, enablerepo):
-    """Return a fully configured dnf Base object."""
+    With load_available_repos=False only the installed packages (the system
+    repository) are loaded into the sack.
+    """
     base = dnf.Base()
     _configure_base(module, base, conf_file, disable_gpg_check)
-    _specify_repositories(base, disablerepo, enablerepo)
-    base.fill_sack()
+    _specify_repositories(base, disablerepo, enablerepo, metadata_expire)
+    base.fill_sack(load_system_repo=True,
+                   load_available_repos=load_available_repos)
     return base
 
 
-def _package_dict(package):
-    """Return a dictionary of information for the package."""
+def _is_installed(base, pkg_spec):
+    """Return whether a package matching the spec is installed."""
+    installed = subject.Subject(pkg_spec).get_best_query(base.sack).installed()
+    return bool(installed)
+
+
+def _needs_available_repos(module, base, state, names):
+    """Decide from the installed packages alone whether the repository
+    metadata is needed, exiting early when there is nothing to do."""
+    if names == ['*'] or state == 'latest':
+        return True
+
+    pkg_specs, group_specs, filenames = cli.commands.parse_spec_group_file(
+        names)
+    if group_specs:
+        # groups are only known from the repository comps data
+        return True
+
+    if state in ['absent', 'removed']:
+        # removals are resolved against the installed packages only
+        return False
+
+    if filenames:
+        return True
+    for pkg_spec in pkg_specs:
+        if not _is_installed(base, pkg_spec):
+            return True
+    module.exit_json(msg="Nothing to do")
+
+
+PACKAGE_FIELDS = ['name', 'arch', 'epoch', 'release', 'version', 'repo', 'nevra']
+
+
+def _package_dict(package, fields=None):
+    """Return a dictionary of information for the package.
+
+    When fields is given, only those keys are returned.
+    """
     # NOTE: This no longer contains the 'dnfstate' field because it is
     # already known based on the query type.
     result = {
@@ -194,34 +312,67 @@ def _package_dict(package):
         'release': package.release,
         'version': package.version,
         'repo': package.repoid}
-    result['nevra'] = '{epoch}:{name}-{version}-{release}.{arch}'.format(
-        **result)
+    if fields is None or 'nevra' in fields:
+        result['nevra'] = '{epoch}:{name}-{version}-{release}.{arch}'.format(
+            **result)
 
+    if fields is not None:
+        result = dict((field, result[field]) for field in fields)
     return result
 
 
-def list_items(module, base, command):
-    """List package info based on the command."""
+def _filter_packages(query, names=None, repos=None, arches=None,
+                     newest=False):
+    """Narrow down a package query in the sack rather than in Python."""
+    if names:
+        query = query.filter(name__glob=names)
+    if repos:
+        query = query.filter(reponame=repos)
+    if arches:
+        query = query.filter(arch=arches)
+    if newest:
+        query = query.latest()
+    return query
+
+
+def list_items(module, base, command, names=None, repos=None, arches=None,
+               newest=False, fields=None, offset=0, limit=None):
+    """List package info based on the command.
+
+    Packages are filtered by the sack query, and only the requested page
+    of them is turned into dictionaries.
+    """
     # Rename updates to upgrades
     if command == 'updates':
         command = 'upgrades'
 
-    # Return the corresponding packages
-    if command in ['installed', 'upgrades', 'available']:
-        results = [
-            _package_dict(package)
-            for package in getattr(base.sack.query(), command)()]
     # Return the enabled repository ids
-    elif command in ['repos', 'repositories']:
+    if command in ['repos', 'repositories']:
         results = [
             {'repoid': repo.id, 'state': 'enabled'}
             for repo in base.repos.iter_enabled()]
+        module.exit_json(results=results)
+
+    # Return the corresponding packages
+    if command in ['installed', 'upgrades', 'available']:
+        packages = getattr(base.sack.query(), command)()
     # Return any matching packages
     else:
         packages = subject.Subject(command).get_best_query(base.sack)
-        results = [_package_dict(package) for package in packages]
+    packages = _filter_packages(packages, names, repos, arches, newest)
+
+    response = {}
+    if offset or limit is not None:
+        packages = sorted(packages)
+        response['total'] = len(packages)
+        if limit is not None:
+            packages = packages[offset:offset + limit]
+        else:
+            packages = packages[offset:]
 
-    module.exit_json(results=results)
+    response['results'] = [
+        _package_dict(package, fields) for package in packages]
+    module.exit_json(**response)
 
 
 def _mark_package_install(module, base, pkg_spec):
@@ -325,6 +476,14 @@ def main():
             list=dict(),
             conf_file=dict(default=None, type='path'),
             disable_gpg_check=dict(default=False, type='bool'),
+            metadata_expire=dict(default=None, type='int'),
+            list_names=dict(default=None, type='list'),
+            list_repos=dict(default=None, type='list'),
+            list_arches=dict(default=None, type='list'),
+            list_newest=dict(default=False, type='bool'),
+            list_fields=dict(default=None, type='list'),
+            list_offset=dict(default=0, type='int'),
+            list_limit=dict(default=None, type='int'),
         ),
         required_one_of=[['name', 'list']],
         mutually_exclusive=[['name', 'list']],
@@ -333,18 +492,37 @@ def main():
 
     _fail_if_no_dnf(module)
     if params['list']:
+        if params['list_fields']:
+            unknown = set(params['list_fields']) - set(PACKAGE_FIELDS)
+            if unknown:
+                module.fail_json(
+                    msg="Unknown list_fields: %s" % ', '.join(sorted(unknown)))
+        if params['list_offset'] < 0 or (params['list_limit'] or 0) < 0:
+            module.fail_json(msg="list_offset and list_limit cannot be negative")
+        # installed packages are listed from the rpmdb alone
         base = _base(
             module, params['conf_file'], params['disable_gpg_check'],
-            params['disablerepo'], params['enablerepo'])
-        list_items(module, base, params['list'])
+            params['disablerepo'], params['enablerepo'],
+            params['metadata_expire'],
+            load_available_repos=params['list'] != 'installed')
+        list_items(
+            module, base, params['list'], names=params['list_names'],
+            repos=params['list_repos'], arches=params['list_arches'],
+            newest=params['list_newest'], fields=params['list_fields'],
+            offset=params['list_offset'], limit=params['list_limit'])
     else:
         # Note: base takes a long time to run so we want to check for failure
         # before running it.
         if not util.am_i_root():
             module.fail_json(msg="This command has to be run under the root user.")
+        # Start from the installed packages only and load the remote
+        # repository metadata when the request cannot be settled without it
         base = _base(
             module, params['conf_file'], params['disable_gpg_check'],
-            params['disablerepo'], params['enablerepo'])
+            params['disablerepo'], params['enablerepo'],
+            params['metadata_expire'], load_available_repos=False)
+        if _needs_available_repos(module, base, params['state'], params['name']):
+            base.fill_sack(load_system_repo=True, load_available_repos=True)
 
         ensure(module, base, params['state'], params['name'])
 
@@ -116,39 +116,76 @@ import os
 import re
 import sys
 
-def get_version(pacman_output):
-    """Take pacman -Qi or pacman -Si output and get the Version"""
-    lines = pacman_output.split('\n')
-    for line in lines:
-        if 'Version' in line:
-            return line.split(':')[1].strip()
-    return None
-
-def query_package(module, pacman_path, name, state="present"):
-    """Query the package status in both the local system and the repository. Returns a boolean to indicate if the package is installed, a second boolean to indicate if the package is up-to-date and a third boolean to indicate whether online information were available"""
-    if state == "present":
-        lcmd = "%s -Qi %s" % (pacman_path, name)
-        lrc, lstdout, lstderr = module.run_command(lcmd, check_rc=False)
-        if lrc != 0:
+def parse_local_info(pacman_output):
+    """Take the output of pacman -Qi for all installed packages and return a
+    dict of name -> version and a dict of provided name -> providing package"""
+    versions = {}
+    provides = {}
+    name = None
+    field = None
+    for line in pacman_output.split('\n'):
+        if not line.strip():
+            name = field = None
+            continue
+        if line[0].isspace():
+            # continuation of a wrapped field
+            value = line.strip()
+        elif ':' in line:
+            field, value = line.split(':', 1)
+            field = field.strip()
+            value = value.strip()
+        else:
+            continue
+        if field == 'Name':
+            name = value
+        elif field == 'Version' and name:
+            versions[name] = value
+        elif field == 'Provides' and name and value != 'None':
+            for provided in value.split():
+                provides.setdefault(re.split('[<>=]', provided)[0], name)
+    return versions, provides
+
+def build_package_index(module, pacman_path):
+    """Snapshot the installed packages and the sync repositories once, so the
+    state of every requested package can be answered with a lookup instead of
+    a pacman -Qi/-Si fork per package"""
+    index = dict(local={}, provides={}, repo={}, repo_ok=False)
+
+    rc, stdout, stderr = module.run_command("%s -Qi" % pacman_path, check_rc=False)
+    if rc == 0:
+        index['local'], index['provides'] = parse_local_info(stdout)
+
+    rc, stdout, stderr = module.run_command("%s -Sl" % pacman_path, check_rc=False)
+    if rc == 0:
+        index['repo_ok'] = True
+        for line in stdout.split('\n'):
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            repo, name, version = fields[:3]
+            # repositories are listed in pacman.conf order, the first wins
+            if name not in index['repo']:
+                index['repo'][name] = version
+            index['repo']['%s/%s' % (repo, name)] = version
+
+    return index
+
+def lookup_package(index, name):
+    """Query the package status from the package index. Returns a boolean to indicate if the package is installed, a second boolean to indicate if the package is up-to-date and a third boolean to indicate whether online information were available. Like pacman -Qi, a name that is not installed itself is resolved to the installed package providing it"""
+    repo_name = name
+    name = name.split('/')[-1]
+    if name not in index['local']:
+        name = index['provides'].get(name)
+        if name is None:
             # package is not installed locally
             return False, False, False
+        repo_name = name
 
-        # get the version installed locally (if any)
-        lversion = get_version(lstdout)
-
-        rcmd = "%s -Si %s" % (pacman_path, name)
-        rrc, rstdout, rstderr = module.run_command(rcmd, check_rc=False)
-        # get the version in the repository
-        rversion = get_version(rstdout)
-
-        if rrc == 0:
-            # Return True to indicate that the package is installed locally, and the result of the version number comparison
-            # to determine if the package is up-to-date.
-            return True, (lversion == rversion), False
-
-    # package is installed but cannot fetch remote Version. Last True stands for the error
+    if not index['repo_ok'] or repo_name not in index['repo']:
+        # package is installed but cannot fetch remote Version
         return True, True, True
 
+    return True, (index['local'][name] == index['repo'][repo_name]), False
 
 def update_package_db(module, pacman_path):
     if module.params["force"]:
@@ -181,7 +218,7 @@ def upgrade(module, pacman_path):
     else:
         module.exit_json(changed=False, msg='Nothing to upgrade')
 
-def remove_packages(module, pacman_path, packages):
+def remove_packages(module, pacman_path, packages, index):
     if module.params["recurse"] or module.params["force"]:
         if module.params["recurse"]:
             args = "Rs"
@@ -196,7 +233,7 @@ def remove_packages(module, pacman_path, packages):
     # Using a for loop incase of error, we can report the package that failed
     for package in packages:
         # Query the package first, to see if we even need to remove
-        installed, updated, unknown = query_package(module, pacman_path, package)
+        installed, updated, unknown = lookup_package(index, package)
         if not installed:
             continue
 
@@ -206,6 +243,7 @@ def remove_packages(module, pacman_path, packages):
         if rc != 0:
             module.fail_json(msg="failed to remove %s" % (package))
 
+        index['local'].pop(package.split('/')[-1], None)
         remove_c += 1
 
     if remove_c > 0:
@@ -215,14 +253,14 @@ def remove_packages(module, pacman_path, packages):
     module.exit_json(changed=False, msg="package(s) already absent")
 
 
-def install_packages(module, pacman_path, state, packages, package_files):
+def install_packages(module, pacman_path, state, packages, package_files, index):
     install_c = 0
     package_err = []
     message = ""
 
     for i, package in enumerate(packages):
         # if the package is installed and state == present or state == latest and is up-to-date then skip
-        installed, updated, latestError = query_package(module, pacman_path, package)
+        installed, updated, latestError = lookup_package(index, package)
         if latestError and state == 'latest':
             package_err.append(package)
 
@@ -240,6 +278,8 @@ def install_packages(module, pacman_path, state, packages, package_files):
         if rc != 0:
             module.fail_json(msg="failed to install %s" % (package))
 
+        if not package_files[i] and package in index['repo']:
+            index['local'][package.split('/')[-1]] = index['repo'][package]
         install_c += 1
 
     if state == 'latest' and len(package_err) > 0:
@@ -250,10 +290,10 @@ def install_packages(module, pacman_path, state, packages, package_files):
 
     module.exit_json(changed=False, msg="package(s) already installed. %s" % (message))
 
-def check_packages(module, pacman_path, packages, state):
+def check_packages(module, pacman_path, packages, state, index):
     would_be_changed = []
     for package in packages:
-        installed, updated, unknown = query_package(module, pacman_path, package)
+        installed, updated, unknown = lookup_package(index, package)
         if ((state in ["present", "latest"] and not installed) or
                 (state == "absent" and installed) or
                 (state == "latest" and not updated)):
@@ -270,16 +310,20 @@ def check_packages(module, pacman_path, packages, state):
 def expand_package_groups(module, pacman_path, pkgs):
     expanded = []
 
-    for pkg in pkgs:
-        cmd = "%s -Sgq %s" % (pacman_path, pkg)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    # Ask for all names at once; pacman prints a "group package" line for
+    # every member of the names that are groups and skips the others
+    groups = {}
+    cmd = "%s -Sg %s" % (pacman_path, " ".join(pkgs))
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) == 2:
+            groups.setdefault(fields[0], []).append(fields[1])
 
-        if rc == 0:
+    for pkg in pkgs:
+        if pkg in groups:
             # A group was found matching the name, so expand it
-            for name in stdout.split('\n'):
-                name = name.strip()
-                if name:
-                    expanded.append(name)
+            expanded.extend(groups[pkg])
         else:
             expanded.append(pkg)
 
@@ -333,13 +377,15 @@ def main():
             else:
                 pkg_files.append(None)
 
+        index = build_package_index(module, pacman_path)
+
         if module.check_mode:
-            check_packages(module, pacman_path, pkgs, p['state'])
+            check_packages(module, pacman_path, pkgs, p['state'], index)
 
         if p['state'] in ['present', 'latest']:
-            install_packages(module, pacman_path, p['state'], pkgs, pkg_files)
+            install_packages(module, pacman_path, p['state'], pkgs, pkg_files, index)
         elif p['state'] == 'absent':
-            remove_packages(module, pacman_path, pkgs)
+            remove_packages(module, pacman_path, pkgs, index)
 
 # import module snippets
 from ansible.module_utils.basic import *
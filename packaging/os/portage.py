@@ -185,13 +185,100 @@ import pipes
 import re
 
 
+VDB_PATH = '/var/db/pkg'
+WORLD_SETS_PATH = '/var/lib/portage/world_sets'
+
+# package-version directory names in the VDB, see PMS section 3.2
+VDB_ENTRY_RE = re.compile(
+    r'^(?P<pn>[\w+][\w+-]*?)-(?P<pv>\d+(\.\d+)*[a-z]?'
+    r'(_(alpha|beta|pre|rc|p)\d*)*(-r\d+)?)$')
+
+# atoms that can be answered from the VDB index: [=]category/name[-version]
+# or name, optionally with a slot; anything else is left to equery
+SIMPLE_ATOM_RE = re.compile(
+    r'^(?P<exact>=)?(?:(?P<cat>[\w+][\w+.-]*)/)?(?P<pn>[\w+][\w+.-]*)'
+    r'(?::(?P<slot>[\w+][\w+.-]*))?$')
+
+
 def query_package(module, package, action):
     if package.startswith('@'):
         return query_set(module, package, action)
     return query_atom(module, package, action)
 
 
+def get_vdb_index(module):
+    """
+    Return the installed packages as a dict mapping package names to a list
+    of (category, version, directory) tuples, read from the VDB only once
+    per run.
+    """
+    if getattr(module, 'vdb_index', None) is None:
+        index = {}
+        if os.path.isdir(VDB_PATH):
+            for category in os.listdir(VDB_PATH):
+                category_path = os.path.join(VDB_PATH, category)
+                if not os.path.isdir(category_path):
+                    continue
+                for entry in os.listdir(category_path):
+                    match = VDB_ENTRY_RE.match(entry)
+                    if entry.startswith('-MERGING-') or not match:
+                        continue
+                    index.setdefault(match.group('pn'), []).append(
+                        (category, match.group('pv'),
+                         os.path.join(category_path, entry)))
+        module.vdb_index = index
+    return module.vdb_index
+
+
+def read_slot(path):
+    try:
+        f = open(os.path.join(path, 'SLOT'))
+        try:
+            return f.read().strip().split('/')[0]
+        finally:
+            f.close()
+    except IOError:
+        return None
+
+
+def match_vdb_index(module, atom):
+    """
+    Match a simple atom against the VDB index. Returns True or False, or
+    None when the atom is too complex to be matched here.
+    """
+    match = SIMPLE_ATOM_RE.match(atom)
+    if not match:
+        return None
+
+    pn = match.group('pn')
+    version = None
+    entry = VDB_ENTRY_RE.match(pn)
+    if match.group('exact'):
+        # =category/name-version
+        if not entry or not match.group('cat'):
+            return None
+        pn, version = entry.group('pn'), entry.group('pv')
+    elif entry or '.' in pn:
+        # a version without an operator is not a valid atom, let equery
+        # report on it
+        return None
+
+    for category, pv, path in get_vdb_index(module).get(pn, []):
+        if match.group('cat') and category != match.group('cat'):
+            continue
+        if version and pv != version:
+            continue
+        if match.group('slot') and read_slot(path) != match.group('slot'):
+            continue
+        return True
+    return False
+
+
 def query_atom(module, atom, action):
+    installed = match_vdb_index(module, atom)
+    if installed is not None:
+        return installed
+
     cmd = '%s list %s' % (module.equery_path, atom)
 
     rc, out, err = module.run_command(cmd)
@@ -215,14 +302,21 @@ def query_set(module, set, action):
             module.fail_json(msg='set %s cannot be removed' % set)
         return False
 
-    world_sets_path = '/var/lib/portage/world_sets'
-    if not os.path.exists(world_sets_path):
-        return False
+    return set in get_world_sets(module)
 
-    cmd = 'grep %s %s' % (set, world_sets_path)
 
-    rc, out, err = module.run_command(cmd)
-    return rc == 0
+def get_world_sets(module):
+    """Return the sets recorded in world_sets, read only once per run."""
+    if getattr(module, 'world_sets', None) is None:
+        module.world_sets = frozenset()
+        if os.path.exists(WORLD_SETS_PATH):
+            f = open(WORLD_SETS_PATH)
+            try:
+                module.world_sets = frozenset(
+                    line.strip() for line in f if line.strip())
+            finally:
+                f.close()
+    return module.world_sets
 
 
 def sync_repositories(module, webrsync=False):
@@ -240,9 +334,10 @@ def sync_repositories(module, webrsync=False):
         module.fail_json(msg='could not sync package repositories')
 
 
-# Note: In the 3 functions below, equery is done one-by-one, but emerge is done
-# in one go. If that is not desirable, split the packages into multiple tasks
-# instead of joining them together with comma.
+# Note: In the 3 functions below, packages are looked up one-by-one in the
+# VDB index (equery is only run for atoms the index cannot answer), but emerge
+# is done in one go. If that is not desirable, split the packages into
+# multiple tasks instead of joining them together with comma.
 
 
 def emerge_packages(module, packages):
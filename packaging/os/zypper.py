@@ -26,7 +26,30 @@
 # You should have received a copy of the GNU General Public License
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 
-from xml.dom.minidom import parseString as parseXML
+import os
+import tempfile
+
+try:
+    from io import BytesIO
+except ImportError:
+    from StringIO import StringIO as BytesIO
+
+try:
+    unicode
+except NameError:
+    # python 3
+    unicode = str
+
+# xml.etree needs python 2.5, older pythons parse the whole output with minidom
+try:
+    try:
+        from xml.etree.cElementTree import iterparse
+    except ImportError:
+        from xml.etree.ElementTree import iterparse
+    HAS_ITERPARSE = True
+except ImportError:
+    from xml.dom.minidom import parseString as parseXML
+    HAS_ITERPARSE = False
 
 DOCUMENTATION = '''
 ---
@@ -83,6 +106,17 @@ options:
         required: false
         default: "no"
         choices: [ "yes", "no" ]
+    installed_cache:
+        version_added: "2.2"
+        description:
+          - Path of a file used to cache a snapshot of the installed packages,
+            read from the rpm database with a single C(rpm -qa). When set,
+            I(state=present) and I(state=absent) tasks for the C(package) type
+            take the installed state from this snapshot instead of running
+            C(zypper search). The snapshot is refreshed whenever the rpm
+            database changes.
+        required: false
+        default: null
 
 # informational: requirements for nodes
 requirements: 
@@ -114,6 +148,9 @@ EXAMPLES = '''
 
 # Apply all available patches
 - zypper: name=* state=latest type=patch
+
+# Check the installed packages against a cached rpmdb snapshot
+- zypper: name=nmap,tcpdump state=present installed_cache=/var/cache/ansible/zypper-installed
 '''
 
 
@@ -136,23 +173,109 @@ def get_want_state(m, names, remove=False):
     return packages_install, packages_remove, urls
 
 
+RPMDB_PATHS = ['/var/lib/rpm', '/usr/lib/sysimage/rpm']
+# Berkeley DB, NDB and sqlite backends
+RPMDB_FILES = ['Packages', 'Packages.db', 'rpmdb.sqlite']
+
+
 def get_installed_state(m, packages):
     "get installed state of packages"
 
+    if m.params['installed_cache'] and m.params['type'] == 'package':
+        installed = get_installed_snapshot(m)
+        if installed is not None:
+            state = {}
+            for name in packages:
+                if name in installed:
+                    state[name] = installed[name]
+            return state
+
     cmd = get_cmd(m, 'search')
     cmd.extend(['--match-exact', '--details', '--installed-only'])
     cmd.extend(packages)
     return parse_zypper_xml(m, cmd, fail_not_found=False)[0]
 
 
+def get_rpmdb_stamp():
+    """modification time, size and inode of the rpm package database, None
+    if not found; the __db.* environment files are left out as rpm rewrites
+    them on every query"""
+    for path in RPMDB_PATHS:
+        for name in RPMDB_FILES:
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+            return '%r %d %d' % (st.st_mtime, st.st_size, st.st_ino)
+    return None
+
+
+def parse_rpm_snapshot(lines):
+    "turn NAME<tab>EVR lines into the dict get_installed_state returns"
+    installed = {}
+    for line in lines:
+        fields = line.rstrip('\n').split('\t')
+        if len(fields) != 2:
+            continue
+        installed[fields[0]] = {'version': fields[1], 'oldversion': '',
+                                'installed': True, 'group': 'installed'}
+    return installed
+
+
+def get_installed_snapshot(m):
+    """installed packages from the snapshot cache, refreshed with a single
+    rpm -qa when the rpm database changed since it was written"""
+    path = os.path.expanduser(m.params['installed_cache'])
+    rpm_path = m.get_bin_path('rpm')
+    stamp = get_rpmdb_stamp()
+    if rpm_path is None or stamp is None:
+        return None
+
+    try:
+        f = open(path)
+        try:
+            if f.readline().rstrip('\n') == stamp:
+                return parse_rpm_snapshot(f)
+        finally:
+            f.close()
+    except IOError:
+        pass
+
+    cmd = [rpm_path, '-qa', '--qf', '%{NAME}\\t%|EPOCH?{%{EPOCH}:}|%{VERSION}-%{RELEASE}\\n']
+    rc, stdout, stderr = m.run_command(cmd, check_rc=False)
+    if rc != 0:
+        return None
+
+    # the database may have been changed by someone else while rpm ran
+    if get_rpmdb_stamp() == stamp:
+        write_rpm_snapshot(path, stamp, stdout)
+    return parse_rpm_snapshot(stdout.splitlines())
+
+
+def write_rpm_snapshot(path, stamp, rpmout):
+    "atomically replace the snapshot cache, an unwritable cache is ignored"
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        f = os.fdopen(fd, 'w')
+        try:
+            f.write(stamp + '\n')
+            f.write(rpmout)
+        finally:
+            f.close()
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
 def parse_zypper_xml(m, cmd, fail_not_found=True, packages=None):
     rc, stdout, stderr = m.run_command(cmd, check_rc=False)
 
-    dom = parseXML(stdout)
     if rc == 104:
         # exit code 104 is ZYPPER_EXIT_INF_CAP_NOT_FOUND (no packages found)
         if fail_not_found:
-            errmsg = dom.getElementsByTagName('message')[-1].childNodes[0].data
+            errmsg = parse_zypper_messages(stdout)[-1]
             m.fail_json(msg=errmsg, rc=rc, stdout=stdout, stderr=stderr, cmd=cmd)
         else:
             return {}, rc, stdout, stderr
@@ -161,18 +284,11 @@ def parse_zypper_xml(m, cmd, fail_not_found=True, packages=None):
         # 0: success
         # 106: signature verification failed
         # 103: zypper was upgraded, run same command again 
+        firstrun = False
         if packages is None:
             firstrun = True
             packages = {}
-        solvable_list = dom.getElementsByTagName('solvable')
-        for solvable in solvable_list:
-            name = solvable.getAttribute('name')
-            packages[name] = {}
-            packages[name]['version'] = solvable.getAttribute('edition')
-            packages[name]['oldversion'] = solvable.getAttribute('edition-old')
-            status = solvable.getAttribute('status')
-            packages[name]['installed'] = status == "installed"
-            packages[name]['group'] = solvable.parentNode.nodeName
+        parse_zypper_solvables(stdout, packages)
         if rc == 103 and firstrun:
             # if this was the first run and it failed with 103
             # run zypper again with the same command to complete update
@@ -182,6 +298,68 @@ def parse_zypper_xml(m, cmd, fail_not_found=True, packages=None):
     m.fail_json(msg='Zypper run command failed with return code %s.'%rc, rc=rc, stdout=stdout, stderr=stderr, cmd=cmd)
 
 
+def iter_zypper_xml(xmlout):
+    """incrementally parse zypper's --xmlout, yielding (element, parent tag)
+    for every closed element; the caller clears what it no longer needs"""
+    if isinstance(xmlout, unicode):
+        xmlout = xmlout.encode('utf-8')
+    stack = []
+    for event, elem in iterparse(BytesIO(xmlout), events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem.tag)
+        else:
+            stack.pop()
+            if stack:
+                yield elem, stack[-1]
+            else:
+                yield elem, None
+
+
+def parse_zypper_messages(xmlout):
+    "texts of all <message> elements"
+    messages = []
+    if not HAS_ITERPARSE:
+        for message in parseXML(xmlout).getElementsByTagName('message'):
+            if message.childNodes:
+                messages.append(message.childNodes[0].data)
+            else:
+                messages.append('')
+        return messages
+    for elem, parent in iter_zypper_xml(xmlout):
+        if elem.tag == 'message':
+            messages.append(elem.text or '')
+            elem.clear()
+    return messages
+
+
+def parse_zypper_solvables(xmlout, packages):
+    "add every <solvable> to packages while the output is being parsed"
+    if not HAS_ITERPARSE:
+        for solvable in parseXML(xmlout).getElementsByTagName('solvable'):
+            name = solvable.getAttribute('name')
+            packages[name] = {}
+            packages[name]['version'] = solvable.getAttribute('edition')
+            packages[name]['oldversion'] = solvable.getAttribute('edition-old')
+            status = solvable.getAttribute('status')
+            packages[name]['installed'] = status == "installed"
+            packages[name]['group'] = solvable.parentNode.nodeName
+        return packages
+    for elem, parent in iter_zypper_xml(xmlout):
+        if elem.tag == 'solvable':
+            name = elem.get('name', '')
+            packages[name] = {}
+            packages[name]['version'] = elem.get('edition', '')
+            packages[name]['oldversion'] = elem.get('edition-old', '')
+            status = elem.get('status', '')
+            packages[name]['installed'] = status == "installed"
+            packages[name]['group'] = parent
+            elem.clear()
+        elif parent is not None and elem.tag != 'message':
+            # drop finished containers so the tree never grows
+            elem.clear()
+    return packages
+
+
 def get_cmd(m, subcommand):
     "puts together the basic zypper command arguments with those passed to the module"
     is_install = subcommand in ['install', 'update', 'patch']
@@ -337,6 +515,7 @@ def main():
             disable_gpg_check = dict(required=False, default='no', type='bool'),
             disable_recommends = dict(required=False, default='yes', type='bool'),
             force = dict(required=False, default='no', type='bool'),
+            installed_cache = dict(required=False, default=None),
         ),
         supports_check_mode = True
     )
@@ -23,6 +23,18 @@ BINS = dict(
     ipv6='ip6tables',
 )
 
+SAVE_BINS = dict(
+    ipv4='iptables-save',
+    ipv6='ip6tables-save',
+)
+
+RESTORE_BINS = dict(
+    ipv4='iptables-restore',
+    ipv6='ip6tables-restore',
+)
+
+TABLES = ['filter', 'nat', 'mangle', 'raw', 'security']
+
 DOCUMENTATION = '''
 ---
 module: iptables
@@ -37,9 +49,9 @@ description:
     that are present in memory. This is the same as the behaviour of the
     "iptables" and "ip6tables" command which this module uses internally.
 notes:
-  - This module just deals with individual rules. If you need advanced
-    chaining of rules the recommended way is to template the iptables restore
-    file.
+  - This module just deals with individual rules, or a list of them with
+    I(rules). If you need advanced chaining of rules the recommended way is
+    to template the iptables restore file.
 options:
   table:
     description:
@@ -75,7 +87,9 @@ options:
       - "Chain to operate on. This option can either be the name of a user
         defined chain or any of the builtin chains: 'INPUT', 'FORWARD',
         'OUTPUT', 'PREROUTING', 'POSTROUTING', 'SECMARK', 'CONNSECMARK'"
-    required: true
+      - Required unless I(rules) is given, in which case it is the default
+        chain for the listed rules.
+    required: false
   protocol:
     description:
       - The protocol of the rule or of the packet to check. The specified
@@ -288,6 +302,24 @@ options:
         type/code pair, or one of the ICMP type names shown by the command
         'iptables -p icmp -h'"
     required: false
+  rules:
+    version_added: "2.2"
+    description:
+      - "A list of rules to reconcile in one pass. Each item is a hash
+        accepting the same keys as this module (C(chain), C(protocol),
+        C(jump), C(state), C(action), ...); keys that are not given default
+        to the module level value."
+      - "The current ruleset is read with a single C(iptables-save), indexed
+        per table and chain, and all needed additions and deletions are
+        committed in one atomic C(iptables-restore --noflush) transaction.
+        Only rules with values whose saved spelling can't be predicted
+        (host, service and user names, protocol numbers, DSCP marks) are
+        confirmed with C(iptables -C)."
+      - "The result lists the applied C(commands), prefixed with the
+        C(iptables) or C(ip6tables) binary, and the C(ip_version) of each
+        family the rules were reconciled for."
+    required: false
+    default: null
 '''
 
 EXAMPLES = '''
@@ -308,6 +340,15 @@ EXAMPLES = '''
 
 # Tag all outbound tcp packets with DSCP DiffServ class CS1
 - iptables: chain=OUTPUT jump=DSCP table=mangle set_dscp_mark_class=CS1 protocol=tcp
+
+# Reconcile a whole set of rules with one iptables-restore transaction
+- iptables:
+    chain: INPUT
+    rules:
+      - { protocol: tcp, destination_port: 22, jump: ACCEPT }
+      - { protocol: tcp, destination_port: 80, jump: ACCEPT }
+      - { source: 10.0.0.0/8, jump: DROP, state: absent }
+  become: yes
 '''
 
 
@@ -398,15 +439,361 @@ def remove_rule(iptables_path, module, params):
     module.run_command(cmd, check_rc=True)
 
 
+# Option spellings that iptables-save prints differently from how they
+# may have been given to iptables.
+FLAG_ALIASES = {
+    '--protocol': '-p',
+    '--source': '-s',
+    '--src': '-s',
+    '--destination': '-d',
+    '--dst': '-d',
+    '--match': '-m',
+    '--jump': '-j',
+    '--goto': '-g',
+    '--in-interface': '-i',
+    '--out-interface': '-o',
+    '--fragment': '-f',
+    '--source-port': '--sport',
+    '--destination-port': '--dport',
+    '--source-ports': '--sports',
+    '--destination-ports': '--dports',
+    '--ctstate': '--state',
+}
+
+PROTOCOL_NUMBERS = {
+    '1': 'icmp',
+    '6': 'tcp',
+    '17': 'udp',
+    '58': 'ipv6-icmp',
+    'icmpv6': 'ipv6-icmp',
+}
+
+# Matches iptables-save prints for a protocol whose match is implicit.
+IMPLICIT_MATCHES = {
+    'ipv6-icmp': 'icmp6',
+}
+
+# Rate units in the order libxt_limit prints them: saved name, the word
+# abbreviations are matched against and length in seconds.
+# XT_LIMIT_SCALE is the kernel's fixed point scale.
+LIMIT_RATES = (
+    ('day', 'day', 24 * 60 * 60),
+    ('hour', 'hour', 60 * 60),
+    ('min', 'minute', 60),
+    ('sec', 'second', 1),
+)
+
+XT_LIMIT_SCALE = 10000
+
+REJECT_TYPES = (
+    'icmp-net-unreachable', 'icmp-host-unreachable', 'icmp-port-unreachable',
+    'icmp-proto-unreachable', 'icmp-net-prohibited', 'icmp-host-prohibited',
+    'icmp-admin-prohibited', 'tcp-reset', 'icmp6-no-route',
+    'icmp6-adm-prohibited', 'icmp6-addr-unreachable', 'icmp6-port-unreachable',
+)
+
+PORT_FLAGS = ('--sport', '--dport', '--sports', '--dports')
+
+MULTIPORT_FLAGS = {
+    '--sport': '--sports',
+    '--dport': '--dports',
+}
+
+
+def split_rule(tokens):
+    """Group a rule's tokens into (flag, values, negated) tuples."""
+    groups = []
+    flag = None
+    values = []
+    negated = False
+    pending_negation = False
+    for token in tokens:
+        if token == '!':
+            pending_negation = True
+        elif token.startswith('-') and len(token) > 1 and not token[1].isdigit():
+            if flag is not None:
+                groups.append((flag, values, negated))
+            flag = FLAG_ALIASES.get(token, token)
+            values = []
+            negated = pending_negation
+            pending_negation = False
+        else:
+            if pending_negation and flag is not None:
+                negated = True
+                pending_negation = False
+            if token.startswith('!') and len(token) > 1:
+                negated = True
+                token = token[1:].strip()
+            values.append(token)
+    if flag is not None:
+        groups.append((flag, values, negated))
+    return groups
+
+
+def normalize_address(value, ip_version):
+    """Network address and prefix length as iptables-save prints them, None
+    for host names and masks that are not a prefix."""
+    if ip_version == 'ipv6':
+        family, bits = socket.AF_INET6, 128
+    else:
+        family, bits = socket.AF_INET, 32
+    if '/' in value:
+        address, mask = value.split('/', 1)
+    else:
+        address, mask = value, str(bits)
+    try:
+        number = int(binascii.hexlify(socket.inet_pton(family, address)), 16)
+        if mask.isdigit():
+            length = int(mask)
+        elif family == socket.AF_INET:
+            netmask = int(binascii.hexlify(socket.inet_pton(family, mask)), 16)
+            length = 0
+            while length < bits and netmask & (1 << (bits - 1 - length)):
+                length += 1
+        else:
+            return None
+    except (socket.error, ValueError):
+        return None
+    if length > bits:
+        return None
+    prefix = ((1 << bits) - 1) ^ ((1 << (bits - length)) - 1)
+    if mask.find('.') != -1 and netmask != prefix:
+        return None
+    packed = binascii.unhexlify('%0*x' % (bits // 4, number & prefix))
+    return '%s/%d' % (socket.inet_ntop(family, packed), length)
+
+
+def normalize_limit(value):
+    """Rate as iptables-save prints it, None if libxt_limit would reject it.
+
+    libxt_limit stores the rate as a scaled period and prints it back in
+    the largest unit that keeps it exact, so 60/min is saved as 1/sec.
+    """
+    if '/' in value:
+        rate, unit = value.split('/', 1)
+    else:
+        rate, unit = value, 'second'
+    seconds = None
+    for name, word, length in LIMIT_RATES:
+        if unit and word.startswith(unit.lower()):
+            seconds = length
+    if seconds is None or not rate.isdigit() or int(rate) == 0:
+        return None
+    period = XT_LIMIT_SCALE * seconds // int(rate)
+    if period == 0:
+        return None
+    i = 1
+    while i < len(LIMIT_RATES):
+        mult = XT_LIMIT_SCALE * LIMIT_RATES[i][2]
+        if period > mult or mult // period < mult % period:
+            break
+        i += 1
+    name, word, length = LIMIT_RATES[i - 1]
+    return '%d/%s' % (XT_LIMIT_SCALE * length // period, name)
+
+
+def canonical_rule(tokens, ip_version):
+    """Reduce a rule to an order-independent key.
+
+    Both construct_rule output and iptables-save lines map to the same key
+    for the common spellings (option aliases, implicit protocol matches,
+    address masks, state lists, limit rates and the default burst, multiport
+    port flags). Returns None when
+    the rule has values whose saved spelling can't be predicted (host,
+    service and user names, protocol numbers, DSCP marks, ...).
+    """
+    groups = split_rule(tokens)
+    protocol = None
+    multiport = False
+    for flag, values, negated in groups:
+        if flag == '-p' and values:
+            protocol = PROTOCOL_NUMBERS.get(values[0].lower(), values[0].lower())
+        elif flag == '-m' and 'multiport' in values:
+            multiport = True
+    key = []
+    for flag, values, negated in groups:
+        if flag == '-c':
+            continue
+        if flag == '-p':
+            if not values:
+                return None
+            if protocol in ('all', '0'):
+                continue
+            if protocol.isdigit():
+                return None
+            values = [protocol]
+        elif flag == '-m' and values and values[0] in (protocol, IMPLICIT_MATCHES.get(protocol)):
+            continue
+        elif flag in ('-s', '-d'):
+            values = [normalize_address(v, ip_version) for v in values]
+            if None in values:
+                return None
+            if values[-1].endswith('/0') and not negated:
+                # iptables-save leaves out the any address
+                continue
+        elif flag in PORT_FLAGS or flag in ('--uid-owner', '--icmp-type'):
+            if multiport:
+                # multiport only knows the plural spelling
+                flag = MULTIPORT_FLAGS.get(flag, flag)
+            for value in values:
+                if not value.replace(':', '').replace(',', '').replace('/', '').isdigit():
+                    return None
+        elif flag == '--reject-with':
+            for value in values:
+                if value not in REJECT_TYPES:
+                    return None
+        elif flag in ('--set-dscp', '--set-dscp-class'):
+            return None
+        elif flag == '--state':
+            states = ','.join(values).upper().split(',')
+            states.sort()
+            values = [','.join(states)]
+        elif flag == '--limit':
+            values = [normalize_limit(v) for v in values]
+            if None in values:
+                return None
+        elif flag == '--limit-burst' and values == ['5']:
+            continue
+        key.append((flag, tuple(values), negated))
+    key.sort()
+    return tuple(key)
+
+
+def parse_save_output(out):
+    """Index iptables-save output as {table: {chain: [rule tokens]}}."""
+    tables = {}
+    chains = None
+    for line in out.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or line == 'COMMIT':
+            continue
+        if line.startswith('*'):
+            chains = tables.setdefault(line[1:], {})
+        elif line.startswith(':') and chains is not None:
+            chains.setdefault(line[1:].split()[0], [])
+        elif line.startswith('-A ') and chains is not None:
+            tokens = shlex.split(line)
+            chains.setdefault(tokens[1], []).append(tokens[2:])
+    return tables
+
+
+def quote_restore_arg(arg):
+    if arg == '' or re.search(r'[\s"\'#]', arg):
+        return '"%s"' % arg.replace('\\', '\\\\').replace('"', '\\"')
+    return arg
+
+
+def rule_params(module, item):
+    """Merge one entry of the rules list over the module level options."""
+    if not isinstance(item, dict):
+        module.fail_json(msg="Each entry in rules must be a hash: %s" % item)
+    params = dict(module.params)
+    del params['rules']
+    for key, value in item.items():
+        if key not in params:
+            module.fail_json(msg="Unsupported option '%s' in rules entry: %s" % (key, item))
+        if key in ('match', 'ctstate') and isinstance(value, basestring):
+            value = [v.strip() for v in value.split(',')]
+        elif value is not None and not isinstance(value, list):
+            # like the str options of the argument spec, bools included
+            value = str(value)
+        params[key] = value
+    if not params['chain']:
+        module.fail_json(msg="No chain given for rules entry: %s" % item)
+    if params['set_dscp_mark'] and params['set_dscp_mark_class']:
+        module.fail_json(msg="set_dscp_mark and set_dscp_mark_class are mutually exclusive: %s" % item)
+    for key, choices in (('table', TABLES), ('state', ('present', 'absent')),
+                         ('action', ('append', 'insert')), ('ip_version', BINS.keys())):
+        if params[key] not in choices:
+            module.fail_json(msg="Invalid %s '%s' in rules entry: %s" % (key, params[key], item))
+    return params
+
+
+def reconcile_rules(module):
+    """Bring every entry of the rules option to its desired state.
+
+    Returns the commands that were (or, in check mode, would be) applied
+    and the IP versions the rules were reconciled for.
+    """
+    families = {}
+    for item in module.params['rules']:
+        params = rule_params(module, item)
+        families.setdefault(params['ip_version'], []).append(params)
+
+    applied = []
+    for ip_version, rules in families.items():
+        iptables_path = module.get_bin_path(BINS[ip_version], True)
+        save_path = module.get_bin_path(SAVE_BINS[ip_version], True)
+        rc, out, err = module.run_command([save_path], check_rc=True)
+        tables = parse_save_output(out)
+
+        index = {}
+        for table, chains in tables.items():
+            for chain, saved in chains.items():
+                counts = index.setdefault((table, chain), {})
+                for tokens in saved:
+                    key = canonical_rule(tokens, ip_version)
+                    if key is not None:
+                        counts[key] = counts.get(key, 0) + 1
+
+        commands = {}
+        order = []
+        for params in rules:
+            rule = construct_rule(params)
+            key = canonical_rule(rule, ip_version)
+            counts = index.setdefault((params['table'], params['chain']), {})
+            if key is None:
+                # Saved spelling we can't predict; ask the kernel once
+                key = tuple(rule)
+                if key not in counts:
+                    counts[key] = 0
+                    if params['chain'] in tables.get(params['table'], {}) and \
+                       check_present(iptables_path, module, params):
+                        counts[key] = 1
+            is_present = counts.get(key, 0) > 0
+            should_be_present = (params['state'] == 'present')
+            if is_present == should_be_present:
+                continue
+            if should_be_present:
+                if params['action'] == 'insert':
+                    action = '-I'
+                else:
+                    action = '-A'
+                counts[key] = counts.get(key, 0) + 1
+            else:
+                action = '-D'
+                counts[key] -= 1
+            line = ' '.join([quote_restore_arg(a) for a in [action, params['chain']] + rule])
+            if params['table'] not in commands:
+                commands[params['table']] = []
+                order.append(params['table'])
+            commands[params['table']].append(line)
+
+        if not order:
+            continue
+        restore = []
+        for table in order:
+            restore.append('*%s' % table)
+            restore.extend(commands[table])
+            restore.append('COMMIT')
+            applied.extend(['%s -t %s %s' % (BINS[ip_version], table, c) for c in commands[table]])
+        if not module.check_mode:
+            restore_path = module.get_bin_path(RESTORE_BINS[ip_version], True)
+            module.run_command([restore_path, '--noflush'], data='\n'.join(restore), check_rc=True)
+    versions = list(families.keys())
+    versions.sort()
+    return applied, versions
+
+
 def main():
     module = AnsibleModule(
         supports_check_mode=True,
         argument_spec=dict(
-            table=dict(required=False, default='filter', choices=['filter', 'nat', 'mangle', 'raw', 'security']),
+            table=dict(required=False, default='filter', choices=TABLES),
             state=dict(required=False, default='present', choices=['present', 'absent']),
             action=dict(required=False, default='append', type='str', choices=['append', 'insert']),
             ip_version=dict(required=False, default='ipv4', choices=['ipv4', 'ipv6']),
-            chain=dict(required=True, default=None, type='str'),
+            chain=dict(required=False, default=None, type='str'),
             protocol=dict(required=False, default=None, type='str'),
             source=dict(required=False, default=None, type='str'),
             to_source=dict(required=False, default=None, type='str'),
@@ -431,11 +818,20 @@ def main():
             uid_owner=dict(required=False, default=None, type='str'),
             reject_with=dict(required=False, default=None, type='str'),
             icmp_type=dict(required=False, default=None, type='str'),
+            rules=dict(required=False, default=None, type='list'),
         ),
         mutually_exclusive=(
             ['set_dscp_mark', 'set_dscp_mark_class'],
         ),
+        required_one_of=(
+            ['chain', 'rules'],
+        ),
     )
+    if module.params['rules'] is not None:
+        applied, versions = reconcile_rules(module)
+        module.exit_json(changed=bool(applied), commands=applied,
+                         ip_version=versions)
+
     args = dict(
         changed=False,
         failed=False,
@@ -473,6 +869,10 @@ def main():
     module.exit_json(**args)
 
 # import module snippets
+import binascii
+import re
+import shlex
+import socket
 from ansible.module_utils.basic import *
 
 if __name__ == '__main__':
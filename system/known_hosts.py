@@ -26,14 +26,16 @@ description:
    - The M(known_hosts) module lets you add or remove a host keys from the C(known_hosts) file.
    - Starting at Ansible 2.2, multiple entries per host are allowed, but only one for each key type supported by ssh.
      This is useful if you're going to want to use the M(git) module over ssh, for example.
-   - If you have a very large number of host keys to manage, you will find the M(template) module more useful.
+   - If you have a very large number of host keys to manage, you will find the M(template) module more useful,
+     or you can pass them all at once with the I(keys) option.
 version_added: "1.9"
 options:
   name:
     aliases: [ 'host' ]
     description:
       - The host to add or remove (must match a host specified in key)
-    required: true
+      - Required unless I(keys) is given.
+    required: false
     default: null
   key:
     description:
@@ -51,6 +53,16 @@ options:
     choices: [ "present", "absent" ]
     required: no
     default: present
+  keys:
+    description:
+      - A list of hashes with C(name), C(key) and optional C(state) keys, managed in a single pass over the
+        known_hosts file. C(state) defaults to the value of I(state).
+      - The file is parsed once, hashed host entries are matched in-process, and all changes are written with one
+        atomic replace, so C(ssh-keygen) is not run at all.
+      - Mutually exclusive with I(name) and I(key).
+    required: false
+    default: null
+    version_added: "2.2"
 requirements: [ ]
 author: "Matthew Vernon (@mcv21)"
 '''
@@ -61,6 +73,17 @@ EXAMPLES = '''
   known_hosts: path='/etc/ssh/ssh_known_hosts'
                name='foo.com.invalid'
                key="{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+
+# Seed many hosts in one pass over the file
+- known_hosts:
+    path: /etc/ssh/ssh_known_hosts
+    keys:
+      - name: foo.com.invalid
+        key: "{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+      - name: bar.com.invalid
+        key: "{{ lookup('file', 'pubkeys/bar.com.invalid') }}"
+      - name: old.com.invalid
+        state: absent
 '''
 
 # Makes sure public host keys are present or absent in the given known_hosts
@@ -72,15 +95,26 @@ EXAMPLES = '''
 #    key = line(s) to add to known_hosts file
 #    path = the known_hosts file to edit (default: ~/.ssh/known_hosts)
 #    state = absent|present (default: present)
+#    keys = list of name/key/state hashes, applied in one pass (bulk mode)
 
 import os
 import os.path
 import tempfile
 import errno
 import re
+import hmac
+import base64
+import fnmatch
+try:
+    from hashlib import sha1
+except ImportError:
+    import sha as sha1
+
 from ansible.module_utils.pycompat24 import get_exception
 from ansible.module_utils.basic import *
 
+HASH_MAGIC = '|1|'
+
 def enforce_state(module, params):
     """
     Add or remove key.
@@ -265,19 +299,273 @@ def normalize_known_hosts_key(key, host):
         d['key']=k[2]
     return d
 
+def parse_known_hosts_line(line):
+    '''parse_known_hosts_line(line) -> dict or None
+
+    Splits one known_hosts line into its marker, plain host patterns,
+    hashed host fields (as (salt, digest) pairs), key type and key.
+    Comments, blank and malformed lines give None.
+    '''
+    fields = line.split()
+    if not fields or fields[0][0] == '#':
+        return None
+    marker = None
+    if fields[0][0] == '@':
+        marker = fields.pop(0)
+    if len(fields) < 3:
+        return None
+    d = dict(options=marker, type=fields[1], key=fields[2], hosts=[], hashed=[])
+    for pattern in fields[0].split(','):
+        if not pattern:
+            # a,,b; an empty pattern matches nothing
+            continue
+        if pattern.startswith(HASH_MAGIC):
+            parts = pattern[len(HASH_MAGIC):].split('|')
+            try:
+                d['hashed'].append((base64.b64decode(parts[0]), base64.b64decode(parts[1])))
+            except (IndexError, TypeError, ValueError):
+                pass
+        else:
+            d['hosts'].append(pattern.lower())
+    return d
+
+def hash_matches(salt, digest, host):
+    '''Does the HMAC-SHA1 of host, keyed with salt, equal digest?'''
+    return hmac.new(salt, host.encode('utf-8'), sha1).digest() == digest
+
+def entry_matches(entry, host):
+    '''entry_matches(entry, host) -> Boolean
+
+    Matches host against a parsed line the way ssh does: hashed fields
+    by HMAC, plain patterns case-insensitively with * and ? wildcards.
+    A negated pattern (!pattern) that matches rules the line out.
+    '''
+    host = host.lower()
+    matched = False
+    for pattern in entry['hosts']:
+        negate = pattern[0] == '!'
+        if negate:
+            pattern = pattern[1:]
+        if pattern == host or (('*' in pattern or '?' in pattern) and fnmatch.fnmatchcase(host, pattern)):
+            if negate:
+                return False
+            matched = True
+    if matched:
+        return True
+    for salt, digest in entry['hashed']:
+        if hash_matches(salt, digest, host):
+            return True
+    return False
+
+def read_known_hosts(module, path):
+    '''read_known_hosts(module, path) -> (lines, entries)
+
+    Reads path once; entries[i] is the parsed form of lines[i] (or None).
+    A missing file gives two empty lists.
+    '''
+    try:
+        inf = open(path, 'r')
+    except IOError:
+        e = get_exception()
+        if e.errno == errno.ENOENT:
+            return [], []
+        module.fail_json(msg="Failed to read %s: %s" % (path, str(e)))
+    try:
+        lines = inf.readlines()
+    finally:
+        inf.close()
+    if lines and lines[-1][-1:] != '\n':
+        lines[-1] += '\n'
+    entries = [parse_known_hosts_line(l) for l in lines]
+    return lines, entries
+
+def index_known_hosts(entries, hosts):
+    '''index_known_hosts(entries, hosts) -> dict
+
+    Builds {host: {keytype: [line indexes]}} for the requested hosts in a
+    single walk over entries, keyed by the lowercased host names. Plain
+    hosts are looked up directly; hashed fields are only tested against
+    the requested hosts, reusing one keyed HMAC per salt.
+    '''
+    wanted = set([host.lower() for host in hosts])
+    index = {}
+    for host in wanted:
+        index[host] = {}
+
+    def add(host, i, entry):
+        index[host].setdefault(entry['type'], []).append(i)
+
+    for i, entry in enumerate(entries):
+        if entry is None:
+            continue
+        if entry['hosts']:
+            patterns = [p for p in entry['hosts'] if p[0] == '!' or '*' in p or '?' in p]
+            if patterns:
+                # Wildcards and negations need the full matcher
+                for host in wanted:
+                    if entry_matches(entry, host):
+                        add(host, i, entry)
+                continue
+            for pattern in entry['hosts']:
+                pattern = pattern.lower()
+                if pattern in wanted:
+                    add(pattern, i, entry)
+        for salt, digest in entry['hashed']:
+            keyed = hmac.new(salt, None, sha1)
+            for host in wanted:
+                h = keyed.copy()
+                h.update(host.encode('utf-8'))
+                if h.digest() == digest and i not in index[host].get(entry['type'], ()):
+                    add(host, i, entry)
+    return index
+
+def enforce_bulk_state(module, params):
+    """
+    Add or remove all keys in params['keys'] with a single read and
+    a single atomic write of the known_hosts file.
+    """
+
+    path = params.get("path")
+    default_state = params.get("state")
+
+    requests = []
+    for item in params["keys"]:
+        if not isinstance(item, dict) or not item.get('name'):
+            module.fail_json(msg="Each entry in keys must be a hash with at least a name: %s" % item)
+        state = item.get('state') or default_state
+        if state not in ('present', 'absent'):
+            module.fail_json(msg="Invalid state '%s' for host %s" % (state, item['name']))
+        key = item.get('key')
+        if key is None and state != 'absent':
+            module.fail_json(msg="No key specified when adding host %s" % item['name'])
+        new_entries = []
+        if key is not None:
+            for l in key.splitlines():
+                entry = parse_known_hosts_line(l)
+                if entry is None:
+                    continue
+                if not entry_matches(entry, item['name']):
+                    module.fail_json(msg="Host parameter %s does not match host field in supplied key" % item['name'])
+                entry['line'] = l.strip() + '\n'
+                new_entries.append(entry)
+            if not new_entries:
+                module.fail_json(msg="Could not parse key for host %s" % item['name'])
+        requests.append((item['name'], state, new_entries))
+
+    lines, entries = read_known_hosts(module, path)
+    index = index_known_hosts(entries, [r[0] for r in requests])
+
+    removed = set()
+    added = []
+    changed_hosts = []
+    for host, state, new_entries in requests:
+        # @cert-authority and @revoked lines are never replaced by a host
+        # key, the same as ssh-keygen -R leaves them alone; they are only
+        # touched when a key with the same marker is given
+        by_type = {}
+        marked = []
+        for keytype, positions in index[host.lower()].items():
+            for i in positions:
+                if entries[i]['options']:
+                    marked.append(i)
+                else:
+                    by_type.setdefault(keytype, []).append(i)
+        # Lines added earlier in this run are few; check them directly
+        for j, entry in enumerate(added):
+            if entry_matches(entry, host):
+                if entry['options']:
+                    marked.append(len(entries) + j)
+                else:
+                    by_type.setdefault(entry['type'], []).append(len(entries) + j)
+        changed = False
+        if state == 'absent' and not new_entries:
+            for positions in by_type.values():
+                for i in positions:
+                    changed = _drop(i, removed) or changed
+        for new in new_entries:
+            if new['options']:
+                same_key = [i for i in marked if _same_key(_entry_at(i, entries, added), new)]
+                if state == 'present':
+                    if [i for i in same_key if i not in removed]:
+                        continue
+                    added.append(new)
+                    changed = True
+                    continue
+                for i in same_key:
+                    changed = _drop(i, removed) or changed
+                continue
+            same_type = by_type.get(new['type'], [])
+            if state == 'present':
+                if [i for i in same_type if i not in removed and
+                        _same_key(_entry_at(i, entries, added), new)]:
+                    continue
+                added.append(new)
+                changed = True
+            for i in same_type:
+                changed = _drop(i, removed) or changed
+        if changed:
+            changed_hosts.append(host)
+
+    params['changed'] = bool(changed_hosts)
+    params['changed_hosts'] = changed_hosts
+    if not changed_hosts or module.check_mode:
+        return params
+
+    try:
+        outf = tempfile.NamedTemporaryFile(mode='w', dir=os.path.dirname(path))
+        for i, line in enumerate(lines):
+            if i not in removed:
+                outf.write(line)
+        for j, entry in enumerate(added):
+            if len(entries) + j not in removed:
+                outf.write(entry['line'])
+        outf.flush()
+        module.atomic_move(outf.name, path)
+    except (IOError, OSError):
+        e = get_exception()
+        module.fail_json(msg="Failed to write to file %s: %s" % (path, str(e)))
+
+    try:
+        outf.close()
+    except:
+        pass
+
+    return params
+
+def _entry_at(i, entries, added):
+    if i < len(entries):
+        return entries[i]
+    return added[i - len(entries)]
+
+def _same_key(a, b):
+    return (a['options'], a['type'], a['key']) == (b['options'], b['type'], b['key'])
+
+def _drop(i, removed):
+    '''Mark line i (original or added) as removed; True if it was live.'''
+    if i in removed:
+        return False
+    removed.add(i)
+    return True
+
 def main():
 
     module = AnsibleModule(
         argument_spec = dict(
-            name      = dict(required=True,  type='str', aliases=['host']),
+            name      = dict(required=False, type='str', aliases=['host']),
             key       = dict(required=False,  type='str'),
             path      = dict(default="~/.ssh/known_hosts", type='path'),
             state     = dict(default='present', choices=['absent','present']),
+            keys      = dict(required=False, type='list'),
             ),
+        mutually_exclusive = [['name', 'keys'], ['key', 'keys']],
+        required_one_of = [['name', 'keys']],
         supports_check_mode = True
         )
 
-    results = enforce_state(module,module.params)
+    if module.params['keys'] is not None:
+        results = enforce_bulk_state(module,module.params)
+    else:
+        results = enforce_state(module,module.params)
     module.exit_json(**results)
 
 main()
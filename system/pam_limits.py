@@ -37,21 +37,25 @@ options:
   domain:
     description:
       - A username, @groupname, wildcard, uid/gid range.
-    required: true
+      - Required unless C(limits) is given.
+    required: false
   limit_type:
     description:
       - Limit type, see C(man limits) for an explanation
-    required: true
+      - Required unless C(limits) is given.
+    required: false
     choices: [ "hard", "soft", "-" ]
   limit_item:
     description:
       - The limit to be set
-    required: true
+      - Required unless C(limits) is given.
+    required: false
     choices: [ "core", "data", "fsize", "memlock", "nofile", "rss", "stack", "cpu", "nproc", "as", "maxlogins", "maxsyslogins", "priority", "locks", "sigpending", "msgqueue", "nice", "rtprio", "chroot" ]
   value:
     description:
       - The value of the limit.
-    required: true
+      - Required unless C(limits) is given.
+    required: false
   backup:
     description:
       - Create a backup file including the timestamp information so you can get
@@ -85,6 +89,22 @@ options:
       - Comment associated with the limit.
     required: false
     default: ''
+  limits:
+    description:
+      - A list of hashes with C(domain), C(limit_type), C(limit_item), C(value) and optionally C(use_max),
+        C(use_min) and C(comment), which default to the module level values.
+      - C(dest) (and C(limits_dir) if given) are parsed once, every limit is applied in memory, and only the
+        files that actually changed are rewritten, once each. Limits that do not exist yet are added to C(dest).
+    required: false
+    default: null
+    version_added: "2.2"
+  limits_dir:
+    description:
+      - A directory whose C(*.conf) files are also searched for existing limits when C(limits) is used,
+        such as C(/etc/security/limits.d). Matching limits are updated in the file they are found in.
+    required: false
+    default: null
+    version_added: "2.2"
 '''
 
 EXAMPLES = '''
@@ -96,8 +116,151 @@ EXAMPLES = '''
 
 # Add or modify memlock, both soft and hard, limit for the user james with a comment.
 - pam_limits: domain=james limit_type=- limit_item=memlock value=unlimited comment="unlimited memory lock for james"
+
+# Set several limits with a single pass over limits.conf and limits.d
+- pam_limits:
+    limits_dir: /etc/security/limits.d
+    use_max: yes
+    limits:
+      - { domain: '*', limit_type: soft, limit_item: nofile, value: 64000 }
+      - { domain: '*', limit_type: hard, limit_item: nofile, value: 64000 }
+      - { domain: root, limit_type: '-', limit_item: core, value: 0, use_max: no }
 '''
 
+UNLIMITED = ['unlimited', 'infinity', '-1']
+
+def new_limit_value(value, actual_value, use_max, use_min):
+    """Value to write for an existing limit, honouring use_max/use_min."""
+    new_value = value
+    if use_max:
+        if value.isdigit() and actual_value.isdigit():
+            new_value = max(int(value), int(actual_value))
+        elif actual_value in UNLIMITED:
+            new_value = actual_value
+    if use_min:
+        if value.isdigit() and actual_value.isdigit():
+            new_value = min(int(value), int(actual_value))
+        elif value in UNLIMITED:
+            new_value = actual_value
+    return str(new_value)
+
+def format_limit(domain, limit_type, limit_item, value, comment):
+    if comment:
+        comment = "\t#" + comment
+    return domain + "\t" + limit_type + "\t" + limit_item + "\t" + value + comment + "\n"
+
+def parse_limits_file(path, index):
+    """Read path once, adding its limit lines to index.
+
+    index maps (domain, type, item) to a list of [path, line number,
+    value, comment] entries. Returns the raw lines of the file.
+    """
+    f = open(path, 'r')
+    try:
+        lines = f.readlines()
+    finally:
+        f.close()
+    space_pattern = re.compile(r'\s+')
+    for number, line in enumerate(lines):
+        if line.startswith('#'):
+            continue
+        fields = re.sub(space_pattern, ' ', line.split('#', 1)[0]).strip().split(' ')
+        if len(fields) != 4:
+            continue
+        try:
+            comment = line.split('#', 1)[1].rstrip('\n')
+        except IndexError:
+            comment = ''
+        key = (fields[0], fields[1], fields[2])
+        index.setdefault(key, []).append([path, number, fields[3], comment])
+    return lines
+
+def manage_limits(module, pam_types, pam_items):
+    """Apply every entry of the limits option with one read per file
+    and at most one write per changed file."""
+
+    params = module.params
+    limits_conf = params['dest']
+    if not os.path.isfile(limits_conf):
+        module.fail_json(msg="%s is not visible (check presence, access rights, use sudo)" % (limits_conf) )
+
+    paths = [limits_conf]
+    if params['limits_dir'] and os.path.isdir(params['limits_dir']):
+        conf_files = [os.path.join(params['limits_dir'], name) for name in os.listdir(params['limits_dir'])
+                      if name.endswith('.conf')]
+        conf_files.sort()
+        paths.extend(conf_files)
+
+    index = {}
+    contents = {}
+    for path in paths:
+        contents[path] = parse_limits_file(path, index)
+
+    changed_paths = {}
+    messages = []
+    for item in params['limits']:
+        if not isinstance(item, dict):
+            module.fail_json(msg="Each entry in limits must be a hash: %s" % item)
+        entry = dict(use_max=params['use_max'], use_min=params['use_min'], comment=params['comment'])
+        entry.update(item)
+        for key in ('domain', 'limit_type', 'limit_item', 'value'):
+            if entry.get(key) is None:
+                module.fail_json(msg="Missing %s in limits entry: %s" % (key, item))
+            entry[key] = str(entry[key])
+        if entry['limit_type'] not in pam_types or entry['limit_item'] not in pam_items:
+            module.fail_json(msg="Invalid limit_type or limit_item in limits entry: %s" % item)
+        use_max = module.boolean(entry['use_max'])
+        use_min = module.boolean(entry['use_min'])
+        if use_max and use_min:
+            module.fail_json(msg="Cannot use use_min and use_max at the same time: %s" % item)
+        value = entry['value']
+        if not (value in UNLIMITED or value.isdigit()):
+            module.fail_json(msg="Invalid value '%s' in limits entry. Refer to manual pages for more details." % value)
+
+        key = (entry['domain'], entry['limit_type'], entry['limit_item'])
+        if key not in index:
+            line = format_limit(key[0], key[1], key[2], value, entry['comment'] or '')
+            contents[limits_conf].append(line)
+            index[key] = [[limits_conf, len(contents[limits_conf]) - 1, value, entry['comment'] or '']]
+            changed_paths[limits_conf] = True
+            messages.append(line)
+            continue
+
+        for found in index[key]:
+            path, number, actual_value, old_comment = found
+            if value == actual_value:
+                continue
+            if not (actual_value in UNLIMITED or actual_value.isdigit()):
+                module.fail_json(msg="Invalid configuration of '%s'. Current value of %s is unsupported." % (path, key[2]))
+            new_value = new_limit_value(value, actual_value, use_max, use_min)
+            if new_value != actual_value:
+                line = format_limit(key[0], key[1], key[2], new_value, entry['comment'] or old_comment)
+                contents[path][number] = line
+                found[2] = new_value
+                changed_paths[path] = True
+                messages.append(line)
+
+    res_args = dict(changed=bool(changed_paths), msg=''.join(messages),
+                    changed_files=sorted(changed_paths.keys()))
+    backup_files = []
+    for path in res_args['changed_files']:
+        if not os.access(path, os.W_OK):
+            module.fail_json(msg="%s is not writable. Use sudo" % (path) )
+        if params['backup']:
+            backup_files.append(module.backup_local(path))
+        nf = tempfile.NamedTemporaryFile(mode='w', dir=os.path.dirname(path), delete = False)
+        nf.write(''.join(contents[path]))
+        nf.flush()
+        module.atomic_move(nf.name, path)
+        try:
+            nf.close()
+        except:
+            pass
+    if params['backup']:
+        res_args['backup_files'] = backup_files
+
+    module.exit_json(**res_args)
+
 def main():
 
     pam_items = [ 'core', 'data', 'fsize', 'memlock', 'nofile', 'rss', 'stack', 'cpu', 'nproc', 'as', 'maxlogins', 'maxsyslogins', 'priority', 'locks', 'sigpending', 'msgqueue', 'nice', 'rtprio', 'chroot' ]
@@ -109,18 +272,26 @@ def main():
     module = AnsibleModule(
         # not checking because of daisy chain to file module
         argument_spec = dict(
-            domain            = dict(required=True, type='str'),
-            limit_type        = dict(required=True, type='str', choices=pam_types),
-            limit_item        = dict(required=True, type='str', choices=pam_items),
-            value             = dict(required=True, type='str'),
+            domain            = dict(required=False, type='str'),
+            limit_type        = dict(required=False, type='str', choices=pam_types),
+            limit_item        = dict(required=False, type='str', choices=pam_items),
+            value             = dict(required=False, type='str'),
             use_max           = dict(default=False, type='bool'),
             use_min           = dict(default=False, type='bool'),
             backup            = dict(default=False, type='bool'),
             dest              = dict(default=limits_conf, type='str'),
-            comment           = dict(required=False, default='', type='str')
-        )
+            comment           = dict(required=False, default='', type='str'),
+            limits            = dict(required=False, default=None, type='list'),
+            limits_dir        = dict(required=False, default=None, type='str')
+        ),
+        mutually_exclusive = [ ['limits', 'domain'] ],
+        required_one_of = [ ['limits', 'domain'] ],
+        required_together = [ ['domain', 'limit_type', 'limit_item', 'value'] ]
     )
 
+    if module.params['limits'] is not None:
+        manage_limits(module, pam_types, pam_items)
+
     domain      =       module.params['domain']
     limit_type  =       module.params['limit_type']
     limit_item  =       module.params['limit_item']
@@ -207,24 +378,7 @@ def main():
                 nf.write(line)
                 continue
 
-            actual_value_unlimited = actual_value in ['unlimited', 'infinity', '-1']
-            value_unlimited = value in ['unlimited', 'infinity', '-1']
-
-            if use_max:
-                if value.isdigit() and actual_value.isdigit():
-                    new_value = max(int(value), int(actual_value))
-                elif actual_value_unlimited:
-                    new_value = actual_value
-                else:
-                    new_value = value
-
-            if use_min:
-                if value.isdigit() and actual_value.isdigit():
-                    new_value = min(int(value), int(actual_value))
-                elif value_unlimited:
-                    new_value = actual_value
-                else:
-                    new_value = value
+            new_value = new_limit_value(value, actual_value, use_max, use_min)
 
             # Change line only if value has changed
             if new_value != actual_value:
@@ -20,9 +20,19 @@
 
 import binascii
 import copy
+import email.utils
 import textwrap
 from datetime import datetime
 
+try:
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
 DOCUMENTATION = '''
 ---
 module: letsencrypt
@@ -49,6 +59,10 @@ description:
       protocol."
 requirements:
   - "python >= 2.6"
+  - "openssl"
+  - "python cryptography (optional), used in-process when installed to sign
+     ACME requests and read certificate dates; the CSR is always read with
+     openssl"
 options:
   account_key:
     description:
@@ -160,10 +174,23 @@ authorizations:
         type: dict
 '''
 
+# Authorization polling delays, in seconds
+POLL_MIN_INTERVAL = 1
+POLL_MAX_INTERVAL = 16
+POLL_MAX_RETRY_AFTER = 60
+
 def nopad_b64(data):
     return base64.urlsafe_b64encode(data).decode('utf8').replace("=", "")
 
 def simple_get(module,url):
+    result, _ = get_with_info(module,url)
+    return result
+
+def get_with_info(module,url):
+    '''
+    GET url and return the parsed response together with the response
+    info, which carries headers such as Replay-Nonce and Retry-After.
+    '''
     resp, info = fetch_url(module, url, method='GET')
 
     result = None
@@ -180,7 +207,24 @@ def simple_get(module,url):
 
     if info['status'] >= 400:
         module.fail_json(msg="ACME request failed: CODE: {0} RESULT:{1}".format(info['status'],result))
-    return result
+    return result, info
+
+def get_retry_after(info):
+    '''
+    Return the delay in seconds requested by a Retry-After header, either
+    as delta-seconds or as an HTTP date, or None if there is none.
+    '''
+    value = info.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
 
 def get_cert_days(module,cert_file):
     '''
@@ -191,6 +235,12 @@ def get_cert_days(module,cert_file):
     if not os.path.exists(_cert_file):
         return -1
 
+    if HAS_CRYPTOGRAPHY:
+        not_after = _read_cert_not_after(_cert_file)
+        if not_after is not None:
+            now = datetime.datetime.utcnow()
+            return (not_after - now).days
+
     openssl_bin = module.get_bin_path('openssl', True)
     openssl_cert_cmd = [openssl_bin, "x509", "-in", _cert_file, "-noout", "-text"]
     _, out, _ = module.run_command(openssl_cert_cmd,check_rc=True)
@@ -204,6 +254,36 @@ def get_cert_days(module,cert_file):
     now = datetime.datetime.utcnow()
     return (not_after - now).days
 
+def _read_cert_not_after(cert_file):
+    '''
+    Return the notAfter date (naive, UTC) of the first certificate in the
+    PEM or DER file cert_file, read in-process with cryptography. Returns
+    None if the file could not be parsed, so the caller can fall back
+    to openssl.
+    '''
+    try:
+        f = open(cert_file, 'rb')
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        if b'-----BEGIN' in data:
+            cert = x509.load_pem_x509_certificate(data, default_backend())
+        else:
+            cert = x509.load_der_x509_certificate(data, default_backend())
+        return cert.not_valid_after
+    except Exception:
+        return None
+
+def _int_to_bytes(num):
+    '''
+    Big-endian byte string of a positive integer, without leading zeros
+    '''
+    num_hex = "{0:x}".format(num)
+    if len(num_hex) % 2:
+        num_hex = "0{0}".format(num_hex)
+    return binascii.unhexlify(num_hex.encode("utf-8"))
+
 # function source: network/basics/uri.py
 def write_file(module, dest, content):
     '''
@@ -265,12 +345,20 @@ class ACMEDirectory(object):
     def __init__(self, module):
         self.module    = module
         self.directory_root = module.params['acme_directory']
+        self._nonces = []
 
-        self.directory = simple_get(self.module,self.directory_root)
+        self.directory, info = get_with_info(self.module,self.directory_root)
+        self.add_nonce(info)
 
     def __getitem__(self, key): return self.directory[key]
 
     def get_nonce(self,resource=None):
+        '''
+        Return an unused Replay-Nonce, preferring one harvested from an
+        earlier response over a new HEAD request.
+        '''
+        if self._nonces:
+            return self._nonces.pop()
         url = self.directory_root
         if resource is not None:
             url = resource
@@ -279,6 +367,14 @@ class ACMEDirectory(object):
             self.module.fail_json(msg="Failed to get replay-nonce, got status {0}".format(info['status']))
         return info['replay-nonce']
 
+    def add_nonce(self,info):
+        '''
+        Keep the fresh Replay-Nonce the server sent with a response, if any.
+        '''
+        nonce = info.get('replay-nonce')
+        if nonce:
+            self._nonces.append(nonce)
+
 class ACMEAccount(object):
     '''
     ACME account object. Handles the authorized communication with the
@@ -301,15 +397,29 @@ class ACMEAccount(object):
         if not os.path.exists(self.key):
             module.fail_json(msg="Account key %s not found" % (self.key))
 
-        self._openssl_bin = module.get_bin_path('openssl', True)
+        # The key is loaded once and used for every signature of this run;
+        # openssl is only needed when cryptography is missing or cannot
+        # read the key
+        self._private_key = None
+        if HAS_CRYPTOGRAPHY:
+            self._private_key = self._load_account_key(self.key)
+
+        if self._private_key is not None:
+            numbers = self._private_key.public_key().public_numbers()
+            pub_mod = _int_to_bytes(numbers.n)
+            pub_exp = _int_to_bytes(numbers.e)
+        else:
+            self._openssl_bin = module.get_bin_path('openssl', True)
+            pub_hex, pub_exp_hex = self._parse_account_key(self.key)
+            pub_mod = binascii.unhexlify(re.sub(r"(\s|:)", "", pub_hex).encode("utf-8"))
+            pub_exp = binascii.unhexlify(pub_exp_hex.encode("utf-8"))
 
-        pub_hex, pub_exp = self._parse_account_key(self.key)
         self.jws_header =  {
             "alg": "RS256",
             "jwk": {
-                "e": nopad_b64(binascii.unhexlify(pub_exp.encode("utf-8"))),
+                "e": nopad_b64(pub_exp),
                 "kty": "RSA",
-                "n": nopad_b64(binascii.unhexlify(re.sub(r"(\s|:)", "", pub_hex).encode("utf-8"))),
+                "n": nopad_b64(pub_mod),
             },
         }
         self.init_account()
@@ -323,6 +433,40 @@ class ACMEAccount(object):
         thumbprint = nopad_b64(hashlib.sha256(accountkey_json.encode('utf8')).digest())
         return "{0}.{1}".format(token, thumbprint)
 
+    def _load_account_key(self,key):
+        '''
+        Loads an unencrypted RSA key file in PEM format with cryptography.
+        Returns None if the key cannot be loaded that way.
+        '''
+        try:
+            f = open(key, 'rb')
+            try:
+                data = f.read()
+            finally:
+                f.close()
+            private_key = serialization.load_pem_private_key(data, password=None, backend=default_backend())
+        except Exception:
+            return None
+        if not hasattr(private_key.public_key().public_numbers(), 'n'):
+            # not an RSA key
+            return None
+        return private_key
+
+    def _sign(self,data):
+        '''
+        Returns the RS256 (RSASSA-PKCS1-v1_5 with SHA-256) signature of data
+        '''
+        if self._private_key is not None:
+            if hasattr(self._private_key, 'sign'):
+                return self._private_key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+            # cryptography < 1.4 only has the signer interface
+            signer = self._private_key.signer(padding.PKCS1v15(), hashes.SHA256())
+            signer.update(data)
+            return signer.finalize()
+        openssl_sign_cmd = [self._openssl_bin, "dgst", "-sha256", "-sign", self.key]
+        _, out, _ = self.module.run_command(openssl_sign_cmd,data=data,check_rc=True, binary_data=True)
+        return out
+
     def _parse_account_key(self,key):
         '''
         Parses an RSA key file in PEM format and returns the modulus
@@ -346,6 +490,14 @@ class ACMEAccount(object):
         the response as dictionary
         https://tools.ietf.org/html/draft-ietf-acme-acme-02#section-5.2
         '''
+        result, info = self._send_signed_request(url, payload)
+        if info['status'] == 400 and isinstance(result, dict) and result.get('type') == 'urn:acme:error:badNonce':
+            # a pooled nonce may have expired; the error response carries
+            # a fresh one, which get_nonce hands out next
+            result, info = self._send_signed_request(url, payload)
+        return result, info
+
+    def _send_signed_request(self, url, payload):
         protected = copy.deepcopy(self.jws_header)
         protected["nonce"] = self.directory.get_nonce()
 
@@ -355,22 +507,25 @@ class ACMEAccount(object):
         except Exception as e:
             self.module.fail_json(msg="Failed to encode payload / headers as JSON: {0}".format(e))
 
-        openssl_sign_cmd = [self._openssl_bin, "dgst", "-sha256", "-sign", self.key]
         sign_payload = "{0}.{1}".format(protected64, payload64).encode('utf8')
-        _, out, _ = self.module.run_command(openssl_sign_cmd,data=sign_payload,check_rc=True, binary_data=True)
 
         data = self.module.jsonify({
             "header": self.jws_header,
             "protected": protected64,
             "payload": payload64,
-            "signature": nopad_b64(out),
+            "signature": nopad_b64(self._sign(sign_payload)),
         })
 
         resp, info = fetch_url(self.module, url, data=data, method='POST')
+        self.directory.add_nonce(info)
         result = None
         try:
-            content = resp.read()
-            if info['content-type'].startswith('application/json'):
+            if resp is not None:
+                content = resp.read()
+            else:
+                # error responses, such as badNonce problems, come with the info
+                content = info.get('body')
+            if info.get('content-type', '').startswith(('application/json', 'application/problem+json')):
                 result = self.module.from_json(content.decode('utf8'))
             else:
                 result = content
@@ -619,10 +774,10 @@ class ACMEClient(object):
             data[type] = { 'resource': resource, 'resource_value': value }
         return data
 
-    def _validate_challenges(self,auth):
+    def _respond_to_challenges(self,auth):
         '''
-        Validate the authorization provided in the auth dict. Returns True
-        when the validation was successfull and False when it was not.
+        Tell the ACME server that the chosen challenge of the authorization
+        in the auth dict is ready to be validated.
         '''
         for challenge in auth['challenges']:
             if self.challenge != challenge['type']:
@@ -640,36 +795,62 @@ class ACMEClient(object):
             if info['status'] != 200:
                 self.module.fail_json(msg="Error validating challenge: CODE: {0} RESULT: {1}".format(info['status'], result))
 
-        status = ''
-
-        while status not in ['valid','invalid','revoked']:
-            result = simple_get(self.module,auth['uri'])
-            result['uri'] = auth['uri']
+    def _wait_for_authorizations(self,auths):
+        '''
+        Poll the given authorizations until each has a final status and
+        return a dict of status per authorization uri. All authorizations
+        are polled side by side, each on its own schedule: the delay starts
+        at POLL_MIN_INTERVAL and doubles up to POLL_MAX_INTERVAL, unless the
+        server asks for a specific one with Retry-After.
+        '''
+        due = {}
+        delays = {}
+        for auth in auths:
+            due[auth['uri']] = time.time()
+            delays[auth['uri']] = POLL_MIN_INTERVAL
+
+        statuses = {}
+        while due:
+            uri = min(due, key=due.get)
+            wait = due[uri] - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            result, info = get_with_info(self.module,uri)
+            self.directory.add_nonce(info)
+            result['uri'] = uri
             if self._add_or_update_auth(result):
                 self.changed = True
             # draft-ietf-acme-acme-02
             # "status (required, string): ...
             # If this field is missing, then the default value is "pending"."
-            if 'status' not in result:
-                status = 'pending'
-            else:
-                status = result['status']
-            time.sleep(2)
-
-        if status == 'invalid':
-            error_details = ''
-            # multiple challenges could have failed at this point, gather error
-            # details for all of them before failing
-            for challenge in result['challenges']:
-                if challenge['status'] == 'invalid':
-                    error_details += ' CHALLENGE: {0}'.format(challenge['type'])
-                    if 'error' in challenge:
-                        error_details += ' DETAILS: {0};'.format(challenge['error']['detail'])
-                    else:
-                        error_details += ';'
-            self.module.fail_json(msg="Authorization for {0} returned invalid: {1}".format(result['identifier']['value'],error_details))
-
-        return status == 'valid'
+            status = result.get('status', 'pending')
+
+            if status == 'invalid':
+                error_details = ''
+                # multiple challenges could have failed at this point, gather error
+                # details for all of them before failing
+                for challenge in result['challenges']:
+                    if challenge['status'] == 'invalid':
+                        error_details += ' CHALLENGE: {0}'.format(challenge['type'])
+                        if 'error' in challenge:
+                            error_details += ' DETAILS: {0};'.format(challenge['error']['detail'])
+                        else:
+                            error_details += ';'
+                self.module.fail_json(msg="Authorization for {0} returned invalid: {1}".format(result['identifier']['value'],error_details))
+
+            if status in ['valid','revoked']:
+                statuses[uri] = status
+                del due[uri]
+                continue
+
+            delay = get_retry_after(info)
+            if delay is None:
+                delay = delays[uri]
+                delays[uri] = min(delays[uri] * 2, POLL_MAX_INTERVAL)
+            due[uri] = time.time() + min(delay, POLL_MAX_RETRY_AFTER)
+
+        return statuses
 
     def _new_cert(self):
         '''
@@ -704,6 +885,7 @@ class ACMEClient(object):
         the challenge details for the choosen challenge type.
         '''
         data = {}
+        pending = []
         for domain in self.domains:
             auth = self._get_domain_auth(domain)
             if auth is None:
@@ -715,11 +897,18 @@ class ACMEClient(object):
                 # draft-ietf-acme-acme-02
                 # "status (required, string): ...
                 # If this field is missing, then the default value is "pending"."
-                self._validate_challenges(auth)
-                # _validate_challenges updates the global authrozation dict,
-                # so get the current version of the authorization we are working
-                # on to retrieve the challenge data
-                data[domain] = self._get_challenge_data(self._get_domain_auth(domain))
+                self._respond_to_challenges(auth)
+                pending.append(domain)
+
+        # The server validates all triggered challenges in parallel, so
+        # wait for them together instead of one domain after the other
+        if pending:
+            self._wait_for_authorizations([self._get_domain_auth(domain) for domain in pending])
+        for domain in pending:
+            # _wait_for_authorizations updates the global authrozation dict,
+            # so get the current version of the authorization we are working
+            # on to retrieve the challenge data
+            data[domain] = self._get_challenge_data(self._get_domain_auth(domain))
 
         return data
 